@@ -1,3 +1,139 @@
 """
 Application package initialization
+
+create_app() builds the website app. Heavy dependencies (the OpenAI client,
+SendGrid, Pillow) are imported on first use rather than at boot, and database
+connections opened while building the app are never shared with forked
+workers, so the app can be preloaded by gunicorn (`preload_app`).
 """
+import logging
+import os
+import sys
+import weakref
+
+from flask import Flask, request
+from flask.helpers import get_debug_flag
+
+from application.config.config import config
+from application.utils.logging_utils import log_pipeline
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger(__name__)
+
+# Engines built in this process; a forked child resets their pools so it
+# never reuses a connection the parent opened
+_engines = weakref.WeakSet()
+
+
+def reset_after_fork():
+    """
+    Drop connections inherited from a parent process
+
+    Runs in every forked child, and gunicorn's post_fork hook calls it too
+    (gunicorn.conf.py), so it is safe to run twice: the database pools start
+    empty, the OpenAI client is rebuilt on first use and the log listener is
+    restarted once.
+    """
+    for engine in list(_engines):
+        engine.dispose(close=False)
+    log_pipeline.after_fork()
+    # Only if the app loaded it - a fork hook shouldn't import anything
+    agent_module = sys.modules.get('career_agent')
+    if agent_module is not None and agent_module.career_agent is not None:
+        agent_module.career_agent.reset_client()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def create_app(config_name='default', overrides=None):
+    """
+    Create and configure the website app
+
+    Args:
+        config_name: Key of application.config.config ('development',
+            'production', 'testing' or 'default')
+        overrides: Optional dict of config values applied over the config class
+
+    Returns:
+        Flask: The configured app
+    """
+    from career_agent import init_career_agent
+    from application.commands import register_commands
+    from application.config.database import configure_sqlite_engines, init_sqlite_engines
+    from application.extensions import db, page_cache, shared_cache, site_assets
+    from application.utils.compression import compress_response
+    from application.utils.health import HealthMonitor
+    from application.utils.logging_utils import configure_logging
+    from application.utils.metrics import RequestMetrics
+    from application.views import BLUEPRINTS
+
+    app = Flask(
+        __name__,
+        static_folder=os.path.join(PROJECT_ROOT, 'static'),
+        template_folder=os.path.join(PROJECT_ROOT, 'templates'),
+        instance_path=os.path.join(PROJECT_ROOT, 'instance'),
+    )
+    config_class = config[config_name]
+    app.config.from_object(config_class)
+    app.config.update(overrides or {})
+    # `flask --debug run` sets FLASK_DEBUG before the app is built
+    if 'FLASK_DEBUG' in os.environ:
+        app.config['DEBUG'] = get_debug_flag()
+    if hasattr(config_class, 'init_app'):
+        config_class.init_app(app)
+
+    # Queued, formatted and written off the request thread
+    configure_logging(app)
+    # Early, so the timing covers the other hooks
+    RequestMetrics(app)
+
+    # Registered first so it runs after every other after_request hook has set headers
+    @app.after_request
+    def compress_dynamic_response(response):
+        """gzip/brotli for HTML and JSON; precompressed static files pass through untouched"""
+        if app.config['COMPRESS_RESPONSES']:
+            compress_response(request, response)
+        return response
+
+    # Single writer plus read-only pool for an SQLite file
+    configure_sqlite_engines(app.config)
+    db.init_app(app)
+    page_cache.init_app(app)
+    site_assets.init_app(app)
+    shared_cache.init_app(app)
+    HealthMonitor(app)
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+    register_commands(app)
+
+    # Cheap: the OpenAI client itself is created by the first chat request
+    init_career_agent(api_key=app.config['OPENAI_API_KEY'], answer_cache=shared_cache,
+                      answer_ttl=app.config['CHAT_CACHE_TTL'])
+
+    with app.app_context():
+        init_sqlite_engines(app, db.engines)
+        _engines.update(db.engines.values())
+        _warn_pending_migrations()
+        # Close the connection the check opened, so a preloading parent holds none
+        for engine in db.engines.values():
+            engine.dispose()
+
+    return app
+
+
+def _warn_pending_migrations():
+    # Migrations run once per deploy (`flask --app app migrate`), not in every
+    # worker - here we only warn if the database is behind the code
+    from application.extensions import db
+    from application.models import MIGRATIONS
+    from application.database import pending_migrations
+
+    try:
+        pending = pending_migrations(db.engine, MIGRATIONS)
+        if pending:
+            logger.warning(f"{len(pending)} database migrations pending - run 'flask --app app migrate'")
+    except Exception as e:
+        logger.error(f"Could not check database migrations: {str(e)}")
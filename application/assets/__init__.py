@@ -0,0 +1,24 @@
+"""
+Static asset build pipeline package
+"""
+from .images import ImageManifest, build_image_derivatives, IMAGE_SIZES
+from .fingerprint import AssetManifest, build_fingerprints, set_immutable
+from .precompress import BROTLI_AVAILABLE, precompress_files, send_static_file
+from .bundles import BUNDLES, BundleResolver, build_bundles
+from .critical import CRITICAL_CSS_BUDGET, CRITICAL_PAGES, CriticalCss, extract_critical_css
+from .report import build_size_report, format_size_report, over_budget
+from .freeze import FREEZE_PAGES, freeze_site
+from .hints import PreloadHints, page_hints, link_header
+from .extension import SiteAssets
+
+__all__ = [
+    'ImageManifest', 'build_image_derivatives', 'IMAGE_SIZES',
+    'AssetManifest', 'build_fingerprints', 'set_immutable',
+    'BROTLI_AVAILABLE', 'precompress_files', 'send_static_file',
+    'BUNDLES', 'BundleResolver', 'build_bundles',
+    'CRITICAL_CSS_BUDGET', 'CRITICAL_PAGES', 'CriticalCss', 'extract_critical_css',
+    'build_size_report', 'format_size_report', 'over_budget',
+    'FREEZE_PAGES', 'freeze_site',
+    'PreloadHints', 'page_hints', 'link_header',
+    'SiteAssets',
+]
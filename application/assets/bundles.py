@@ -0,0 +1,152 @@
+"""
+Per-page asset bundles
+
+Scripts that always load together are concatenated and minified into one
+bundle per page (plus a shared core bundle); the stylesheet is minified. The
+bundles are written to static/dist/bundles/ and then fingerprinted and
+precompressed like any other static file.
+"""
+import os
+import posixpath
+import re
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+from .fingerprint import CSS_URL_RE
+
+# Optional minifier imports - bundles are only concatenated without them
+try:
+    import rjsmin
+    RJSMIN_AVAILABLE = True
+except ImportError:
+    RJSMIN_AVAILABLE = False
+
+try:
+    import rcssmin
+    RCSSMIN_AVAILABLE = True
+except ImportError:
+    RCSSMIN_AVAILABLE = False
+
+BUNDLE_DIR = 'dist/bundles'
+
+# Bundle name -> source files (relative to static), in load order
+BUNDLES = {
+    'site.css': ('css/style.css',),
+    'core.js': (
+        'js/utils.js',
+        'js/floating-formulas.js',
+        'js/chat-widget.js',
+        'js/theme-switcher.js',
+        'js/game-modals.js',
+        'js/mobile-nav.js',
+    ),
+    'router.js': ('js/spa-router.js',),
+    'home.js': ('js/carousel.js',),
+    'games.js': (
+        'js/typing-game.js',
+        'js/guess-output-game.js',
+        'js/bigo-game.js',
+        'js/neural-network-game.js',
+        'js/blockchain-game.js',
+    ),
+    'cat-cafe.js': ('js/cat-cafe-game.js',),
+    'admin.js': ('js/admin-feed.js',),
+}
+
+
+def minify_css(css):
+    """Minify a stylesheet, with a conservative fallback when rcssmin isn't installed"""
+    if RCSSMIN_AVAILABLE:
+        return rcssmin.cssmin(css)
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    """Minify a script; returned unchanged when rjsmin isn't installed"""
+    return rjsmin.jsmin(js) if RJSMIN_AVAILABLE else js
+
+
+def absolutize_css_urls(css, filename, static_url_path='/static'):
+    """Make relative url() references root-relative so the CSS can move to another directory"""
+    prefix = static_url_path.rstrip('/') + '/'
+
+    def replace(match):
+        quote, url = match.groups()
+        url = url.strip()
+        if re.match(r'^([a-z][a-z0-9+.-]*:|//|/|#)', url, re.I):
+            return match.group(0)
+        return f"url({quote}{prefix}{posixpath.normpath(posixpath.join(posixpath.dirname(filename), url))}{quote})"
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def build_bundles(static_folder, bundles=None, static_url_path='/static'):
+    """
+    Concatenate and minify each bundle into static/dist/bundles/
+
+    Returns:
+        dict: Mapping of bundle path (relative to static) to
+        {'source': combined source size, 'minified': bundle size}
+    """
+    bundles = BUNDLES if bundles is None else bundles
+    output_dir = os.path.join(static_folder, BUNDLE_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    report = {}
+
+    for name, sources in bundles.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+                content = f.read()
+            if name.endswith('.css'):
+                content = absolutize_css_urls(content, source, static_url_path)
+            parts.append(content)
+
+        if name.endswith('.css'):
+            combined = '\n'.join(parts)
+            minified = minify_css(combined)
+        else:
+            # A leading semicolon guards against files that end without one
+            combined = '\n;'.join(parts)
+            minified = minify_js(combined)
+
+        with open(os.path.join(output_dir, name), 'w', encoding='utf-8') as f:
+            f.write(minified)
+        report[f'{BUNDLE_DIR}/{name}'] = {'source': len(combined.encode('utf-8')),
+                                          'minified': len(minified.encode('utf-8'))}
+
+    # Drop bundles that are no longer configured
+    for name in set(os.listdir(output_dir)) - set(bundles):
+        os.remove(os.path.join(output_dir, name))
+
+    return report
+
+
+class BundleResolver:
+    """
+    Template helper that lists the URLs to load for a bundle
+
+    Uses the built bundle when it's in the fingerprint manifest, otherwise
+    (development, or no build yet) the individual source files.
+    """
+
+    def __init__(self, asset_manifest, bundles=None):
+        self.asset_manifest = asset_manifest
+        self.bundles = BUNDLES if bundles is None else bundles
+
+    def is_built(self, name):
+        bundle_path = f'{BUNDLE_DIR}/{name}'
+        return self.asset_manifest.resolve(bundle_path) != bundle_path
+
+    def urls(self, name):
+        if self.is_built(name):
+            return [url_for('static', filename=self.asset_manifest.resolve(f'{BUNDLE_DIR}/{name}'))]
+        return [url_for('static', filename=source) for source in self.bundles[name]]
+
+    def scripts(self, name):
+        """<script> tags for a JavaScript bundle"""
+        return Markup(''.join(f'<script src="{escape(url)}"></script>' for url in self.urls(name)))
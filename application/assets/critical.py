@@ -0,0 +1,264 @@
+"""
+Critical CSS extraction
+
+For each page, keeps the stylesheet rules that can apply to elements in its
+first viewport, so that part renders fully styled from an inline <style>
+while the full stylesheet loads without blocking. The first viewport is the
+markup up to the page's fold: the header and navigation, then the first
+section of the page content, or everything before an element marked
+`data-fold` where a template has one. Hidden elements, and whatever follows
+the content (chat widget, modals), are left out, as are rules that only apply
+after user interaction (:hover, :focus, ...).
+"""
+import os
+import re
+from html.parser import HTMLParser
+
+from markupsafe import Markup
+
+from .bundles import minify_css
+from .manifest import JsonManifest, write_json
+
+CRITICAL_MANIFEST = 'dist/critical.json'
+
+# Pages that get inline critical CSS
+CRITICAL_PAGES = ('/', '/projects', '/games', '/cat-cafe', '/about', '/contact')
+
+# Inline CSS allowed per page, minified; the build fails above it
+CRITICAL_CSS_BUDGET = 12 * 1024
+
+# Swapped by the SPA router; its first FOLD_SECTIONS children are above the fold
+CONTENT_ID = 'spa-content'
+FOLD_SECTIONS = 1
+# A template marks its first element below the fold with this attribute
+FOLD_MARKER = 'data-fold'
+
+VOID_ELEMENTS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+                           'source', 'track', 'wbr'))
+
+# Pseudo-classes that can't match on first paint
+INTERACTION_PSEUDO_CLASSES = ('hover', 'focus', 'focus-within', 'focus-visible', 'active', 'visited', 'checked')
+
+GROUPING_AT_RULES = ('@media', '@supports')
+KEYFRAMES_RE = re.compile(r'^@(?:-webkit-)?keyframes\s+([\w-]+)')
+PSEUDO_RE = re.compile(r'::?([\w-]+)(\((?:[^()]|\([^()]*\))*\))?')
+ATTRIBUTE_RE = re.compile(r'\[\s*([\w-]+)\s*(?:([~|^$*]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([^\]\s]*)))?\s*[iIsS]?\s*\]')
+
+
+def parse_blocks(css):
+    """
+    Split a stylesheet into top-level (prelude, body) pairs
+
+    Statement at-rules (@import, @charset) have a body of None.
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    blocks = []
+    depth = 0
+    start = body_start = 0
+    prelude = ''
+    quote = None
+    i = 0
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                prelude = css[start:i].strip()
+                body_start = i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[body_start:i]))
+                start = i + 1
+        elif char == ';' and depth == 0:
+            blocks.append((css[start:i].strip(), None))
+            start = i + 1
+        i += 1
+    return blocks
+
+
+def _split_top_level(text, separators):
+    """Split on separator characters outside brackets and quotes, keeping the separators"""
+    parts, current, depth, quote = [], '', 0, None
+    for char in text:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth == 0 and char in separators:
+            parts.append(current)
+            parts.append(char)
+            current = ''
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _is_hidden(attributes):
+    style = attributes.get('style', '').replace(' ', '').lower()
+    return 'hidden' in attributes or 'display:none' in style
+
+
+class DocumentIndex(HTMLParser):
+    """The visible elements of an HTML document's first viewport as (tag, classes, attributes) tuples"""
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.elements = []
+        # Open elements as (tag, hidden)
+        self._open = []
+        self._content_depth = None
+        self._sections = 0
+        self._marked = FOLD_MARKER in html
+        self._folded = False
+        self.feed(html)
+        self.close()
+
+    def _start(self, tag, attrs, closes):
+        if self._folded:
+            return
+        attributes = {name: value or '' for name, value in attrs}
+        if FOLD_MARKER in attributes:
+            self._folded = True
+            return
+        if self._content_depth is not None and len(self._open) == self._content_depth + 1:
+            self._sections += 1
+            if not self._marked and self._sections > FOLD_SECTIONS:
+                self._folded = True
+                return
+
+        hidden = _is_hidden(attributes) or bool(self._open and self._open[-1][1])
+        if not hidden:
+            self.elements.append((tag, frozenset(attributes.get('class', '').split()), attributes))
+        if attributes.get('id') == CONTENT_ID and self._content_depth is None:
+            self._content_depth = len(self._open)
+        if not closes and tag not in VOID_ELEMENTS:
+            self._open.append((tag, hidden))
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, closes=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, closes=True)
+
+    def handle_endtag(self, tag):
+        if self._folded or not any(open_tag == tag for open_tag, _ in self._open):
+            return
+        while self._open.pop()[0] != tag:
+            pass
+        # Past the content: the rest of the document is below the fold
+        if self._content_depth is not None and len(self._open) == self._content_depth:
+            self._folded = True
+
+    def matches(self, compound):
+        """Whether any element matches a compound selector (no combinators)"""
+        for pseudo, _ in PSEUDO_RE.findall(compound):
+            if pseudo in INTERACTION_PSEUDO_CLASSES:
+                return False
+        compound = PSEUDO_RE.sub('', compound)
+        attributes = [(name, op, a or b or c) for name, op, a, b, c in ATTRIBUTE_RE.findall(compound)]
+        compound = ATTRIBUTE_RE.sub('', compound)
+        tag_match = re.match(r'[a-zA-Z][\w-]*', compound)
+        tag = tag_match.group(0).lower() if tag_match else None
+        classes = set(re.findall(r'\.([\w-]+)', compound))
+        ids = re.findall(r'#([\w-]+)', compound)
+
+        for element_tag, element_classes, element_attrs in self.elements:
+            if tag and element_tag != tag:
+                continue
+            if not classes <= element_classes:
+                continue
+            if ids and element_attrs.get('id') != ids[0]:
+                continue
+            if all(_attribute_matches(element_attrs, *attribute) for attribute in attributes):
+                return True
+        return False
+
+    def matches_selector_list(self, selector_list):
+        """Whether any selector in a comma-separated list can match"""
+        for selector in _split_top_level(selector_list, ','):
+            if selector == ',' or not selector.strip():
+                continue
+            compounds = [part.strip() for part in _split_top_level(selector, ' >+~')
+                         if part.strip() and part not in ' >+~']
+            if all(self.matches(compound) for compound in compounds):
+                return True
+        return False
+
+
+def _attribute_matches(attrs, name, op, value):
+    if name not in attrs:
+        return False
+    actual = attrs[name]
+    if not op:
+        return True
+    return {
+        '=': actual == value,
+        '~=': value in actual.split(),
+        '|=': actual == value or actual.startswith(value + '-'),
+        '^=': actual.startswith(value),
+        '$=': actual.endswith(value),
+        '*=': value in actual,
+    }[op]
+
+
+def _select(blocks, document, keyframes):
+    selected = []
+    for prelude, body in blocks:
+        if body is None:
+            if prelude.startswith(('@import', '@charset')):
+                selected.append(f'{prelude};')
+        elif prelude.startswith(GROUPING_AT_RULES):
+            inner = _select(parse_blocks(body), document, keyframes)
+            if inner:
+                selected.append(f'{prelude}{{{inner}}}')
+        elif KEYFRAMES_RE.match(prelude):
+            keyframes.append((KEYFRAMES_RE.match(prelude).group(1), f'{prelude}{{{body}}}'))
+        elif prelude.startswith('@'):
+            selected.append(f'{prelude}{{{body}}}')
+        elif document.matches_selector_list(prelude):
+            selected.append(f'{prelude}{{{body}}}')
+    return ''.join(selected)
+
+
+def extract_critical_css(css, html):
+    """
+    Rules from `css` needed to render the first viewport of `html` before the full stylesheet loads
+
+    Keyframes are kept only when a selected rule refers to them.
+    """
+    keyframes = []
+    critical = _select(parse_blocks(css), DocumentIndex(html), keyframes)
+    used = [text for name, text in keyframes if re.search(rf'(?<![\w-]){re.escape(name)}(?![\w-])', critical)]
+    return minify_css(critical + ''.join(used))
+
+
+class CriticalCss(JsonManifest):
+    """Per-endpoint critical CSS written by the build, for inlining in <head>"""
+
+    def __init__(self, static_folder, enabled=True):
+        super().__init__(os.path.join(static_folder, CRITICAL_MANIFEST))
+        self.enabled = enabled
+
+    def write(self, critical):
+        """Store critical CSS by endpoint and start serving it"""
+        write_json(self.path, critical)
+        self.reload()
+
+    def for_endpoint(self, endpoint):
+        """Critical CSS for a page, or '' when none was built (the page then links the stylesheet)"""
+        if not self.enabled:
+            return ''
+        return Markup(self.entries.get(endpoint, ''))
@@ -0,0 +1,92 @@
+"""
+Flask integration of the built assets
+
+Wires the manifests written by `flask build-images` / `flask build-assets`
+into an app: fingerprinted static URLs, immutable caching, precompressed
+static files, bundle and image template helpers, inline critical CSS and
+preload Link headers.
+"""
+from flask import request
+
+from application.utils.http_utils import is_spa_request
+
+from .bundles import BundleResolver
+from .critical import CriticalCss
+from .fingerprint import AssetManifest, set_immutable
+from .hints import PreloadHints
+from .images import ImageManifest
+from .precompress import send_static_file
+
+
+class SiteAssets:
+    """
+    Asset manifests and request hooks for one app
+
+    Manifests are loaded from the app's static folder in init_app(); in debug
+    mode fingerprinting and critical CSS are off and image manifests reload.
+    """
+
+    def __init__(self, app=None):
+        self.image_manifest = None
+        self.asset_manifest = None
+        self.bundles = None
+        self.critical_css = None
+        self.preload_hints = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Load the manifests and register the template globals and hooks"""
+        self.image_manifest = ImageManifest(app.static_folder, auto_reload=app.debug)
+        self.asset_manifest = AssetManifest(app.static_folder, enabled=not app.debug)
+        self.bundles = BundleResolver(self.asset_manifest)
+        self.critical_css = CriticalCss(app.static_folder, enabled=not app.debug)
+        self.preload_hints = PreloadHints(auto_reload=app.debug)
+
+        app.jinja_env.globals.update(
+            responsive_image=self.image_manifest.picture,
+            image_url=self.image_manifest.url,
+            image_set=self.image_manifest.image_set,
+            bundle_urls=self.bundles.urls,
+            bundle_scripts=self.bundles.scripts,
+            critical_css=lambda: self.critical_css.for_endpoint(request.endpoint),
+        )
+
+        # Serve precompressed .br/.gz siblings written by `flask build-assets`
+        app.view_functions['static'] = send_static_file
+
+        app.url_defaults(self.fingerprint_static_url)
+        app.after_request(self.cache_static_assets)
+        app.before_request(self.send_early_hints)
+        app.after_request(self.add_preload_links)
+        app.extensions['site_assets'] = self
+
+    def fingerprint_static_url(self, endpoint, values):
+        """Make url_for('static', ...) point at the fingerprinted copy of a file"""
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.asset_manifest.resolve(values['filename'])
+
+    def cache_static_assets(self, response):
+        """Content-addressed static files never change, so let browsers keep them"""
+        if request.endpoint == 'static' and response.status_code == 200:
+            filename = (request.view_args or {}).get('filename')
+            if filename in self.asset_manifest.hashed_paths or filename in self.image_manifest.paths:
+                set_immutable(response)
+        return response
+
+    def send_early_hints(self):
+        """Send 103 Early Hints before rendering, on servers that expose wsgi.early_hints"""
+        if request.method == 'GET' and request.endpoint and not is_spa_request():
+            self.preload_hints.send_early_hints(request.environ, request.endpoint)
+
+    def add_preload_links(self, response):
+        """Advertise a full page's stylesheets, scripts and third-party origins in a Link header"""
+        if (request.method != 'GET' or response.status_code != 200 or response.mimetype != 'text/html'
+                or response.direct_passthrough or is_spa_request() or request.endpoint is None):
+            return response
+        link = self.preload_hints.get(request.endpoint)
+        if link is None or self.preload_hints.auto_reload:
+            link = self.preload_hints.learn(request.endpoint, response.get_data(as_text=True))
+        if link:
+            response.headers['Link'] = link
+        return response
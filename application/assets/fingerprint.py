@@ -0,0 +1,194 @@
+"""
+Content-hashed static asset URLs
+
+A build step copies every static file to dist/static/ under a name that
+includes a hash of its content (css/style.css -> dist/static/css/style.<hash>.css)
+and records the mapping in a manifest. url_for('static') resolves through the
+manifest, so a deploy changes the URL of every modified file and the hashed
+files can be cached forever. The files of the previous few builds are kept, so
+pages rendered or cached before a deploy (and workers still running the old
+release) keep resolving.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+
+from .manifest import JsonManifest, read_json, write_json
+from .precompress import COMPRESSED_SUFFIXES
+
+FINGERPRINT_DIR = 'dist/static'
+MANIFEST_NAME = 'assets.json'
+# Hashed paths of earlier builds, newest first
+HISTORY_NAME = 'assets-history.json'
+HASH_LENGTH = 12
+
+# Earlier builds whose hashed files survive a rebuild
+KEEP_BUILDS = 2
+
+# Directories under static/ that hold build output rather than sources
+EXCLUDED_DIRS = ('dist',)
+
+# Build output that is fingerprinted like a source (written before this step)
+BUILD_INPUTS = ('dist/bundles',)
+
+IMMUTABLE_MAX_AGE = 31536000
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def static_sources(static_folder):
+    """Static-relative paths of every source file and build input, using forward slashes"""
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder).replace(os.sep, '/')
+        if rel_root == '.':
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+            rel_root = ''
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        sources.extend(posixpath.join(rel_root, name) for name in files if not name.startswith('.'))
+    for build_input in BUILD_INPUTS:
+        input_dir = os.path.join(static_folder, build_input)
+        if os.path.isdir(input_dir):
+            sources.extend(posixpath.join(build_input, name) for name in os.listdir(input_dir)
+                           if os.path.isfile(os.path.join(input_dir, name)))
+    return sorted(sources)
+
+
+def hashed_name(filename, data):
+    """dist path for a file with the given content"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, ext = posixpath.splitext(filename)
+    if stem.startswith('dist/'):
+        stem = stem[len('dist/'):]
+    return f"{FINGERPRINT_DIR}/{stem}.{digest}{ext}"
+
+
+def rewrite_css_urls(css, filename, manifest, static_url_path='/static'):
+    """
+    Point url() references in a stylesheet at fingerprinted files
+
+    Relative references stay relative (dist/static mirrors the source layout);
+    root-relative /static/ references stay absolute.
+    """
+    prefix = static_url_path.rstrip('/') + '/'
+
+    def replace(match):
+        quote, url = match.groups()
+        path, suffix = re.match(r'([^?#]*)(.*)', url.strip()).groups()
+        if path.startswith(prefix):
+            target = manifest.get(path[len(prefix):])
+            new_url = prefix + target if target else None
+        elif path and not re.match(r'^([a-z][a-z0-9+.-]*:|//|/)', path, re.I):
+            source = posixpath.normpath(posixpath.join(posixpath.dirname(filename), path))
+            target = manifest.get(source)
+            new_url = posixpath.relpath(target, posixpath.dirname(manifest[filename])) if target else None
+        else:
+            new_url = None
+        return f"url({quote}{new_url}{suffix}{quote})" if new_url else match.group(0)
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def build_fingerprints(static_folder, static_url_path='/static'):
+    """
+    Copy every static file to its content-hashed name and write the manifest
+
+    Stylesheets are processed last so their url() references can be rewritten
+    to the hashed names of the files they point at. Hashed files that neither
+    this build nor the last KEEP_BUILDS builds reference are removed.
+
+    Returns:
+        dict: Mapping of source path to hashed path
+    """
+    sources = static_sources(static_folder)
+    manifest = {}
+    for filename in sorted(sources, key=lambda name: name.endswith('.css')):
+        with open(os.path.join(static_folder, filename), 'rb') as f:
+            data = f.read()
+        if filename.endswith('.css'):
+            # Hash the rewritten content; relative rewrites only depend on the
+            # directory, so a provisional name is enough to compute them
+            manifest[filename] = hashed_name(filename, b'')
+            data = rewrite_css_urls(data.decode('utf-8'), filename, manifest, static_url_path).encode('utf-8')
+        manifest[filename] = hashed_name(filename, data)
+
+        output_path = os.path.join(static_folder, manifest[filename])
+        if not os.path.exists(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+
+    manifest_path = os.path.join(static_folder, FINGERPRINT_DIR, MANIFEST_NAME)
+    history = _record_history(static_folder, read_json(manifest_path), manifest)
+    _remove_stale(static_folder, set(manifest.values()).union(*history))
+    write_json(manifest_path, manifest)
+    return manifest
+
+
+def _record_history(static_folder, previous, manifest):
+    """Push the replaced build onto the history and return the builds to keep"""
+    path = os.path.join(static_folder, FINGERPRINT_DIR, HISTORY_NAME)
+    builds = read_json(path).get('builds', [])
+    if previous and previous != manifest:
+        builds.insert(0, sorted(previous.values()))
+    builds = builds[:KEEP_BUILDS]
+    write_json(path, {'builds': builds})
+    return builds
+
+
+def _remove_stale(static_folder, keep):
+    output_root = os.path.join(static_folder, FINGERPRINT_DIR)
+    for root, _, files in os.walk(output_root):
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if rel_path.endswith(COMPRESSED_SUFFIXES):
+                rel_path = rel_path[:-3]
+            if rel_path not in keep and name not in (MANIFEST_NAME, HISTORY_NAME):
+                os.remove(path)
+    for root, dirs, files in os.walk(output_root, topdown=False):
+        if root != output_root and not os.listdir(root):
+            shutil.rmtree(root)
+
+
+class AssetManifest(JsonManifest):
+    """
+    Resolves static filenames to their fingerprinted names
+
+    When disabled (development) filenames pass through unchanged, so edits
+    show up without a build.
+    """
+
+    def __init__(self, static_folder, enabled=True):
+        super().__init__(os.path.join(static_folder, FINGERPRINT_DIR, MANIFEST_NAME))
+        self.enabled = enabled
+        self._hashed = None
+
+    def load(self, data):
+        self._hashed = None
+        return data
+
+    def resolve(self, filename):
+        """Fingerprinted name for a static file, or the name itself if unknown"""
+        if not self.enabled:
+            return filename
+        return self.entries.get(filename, filename)
+
+    @property
+    def hashed_paths(self):
+        """Static-relative paths of every fingerprinted file"""
+        entries = self.entries
+        if self._hashed is None:
+            self._hashed = frozenset(entries.values())
+        return self._hashed
+
+
+def set_immutable(response):
+    """Cache headers for content-addressed responses: cache for a year, never revalidate"""
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
@@ -0,0 +1,95 @@
+"""
+Static pre-render ("freeze") of the public pages
+
+Renders each public route in both variants (full page and SPA fragment) into
+a directory tree, together with the fingerprinted assets and their
+precompressed siblings, so a front proxy or CDN can serve them without Python.
+
+Layout:
+    <output>/index.html, <output>/index.spa.html       -> /
+    <output>/about/index.html, .../index.spa.html      -> /about
+    <output>/static/dist/...                           -> hashed assets
+"""
+import os
+import shutil
+
+from .fingerprint import FINGERPRINT_DIR
+from .images import OUTPUT_DIR as IMAGE_OUTPUT_DIR
+from .precompress import precompress_files
+
+FREEZE_PAGES = ('/', '/about', '/projects', '/games', '/cat-cafe')
+
+# Request headers that select each variant, and the file name it is written to
+VARIANTS = (
+    ('index.html', {}),
+    ('index.spa.html', {'X-SPA-Request': 'true', 'X-Requested-With': 'XMLHttpRequest'}),
+)
+
+# Written into the output so a later freeze knows it may replace the directory
+MARKER_FILE = '.frozen'
+
+
+def page_directory(route):
+    """Output directory for a route, relative to the output root"""
+    return route.strip('/')
+
+
+def _prepare_output(output_dir):
+    if os.path.exists(output_dir) and os.listdir(output_dir):
+        if not os.path.exists(os.path.join(output_dir, MARKER_FILE)):
+            raise RuntimeError(f"{output_dir} is not empty and wasn't created by freeze; refusing to overwrite it")
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+    open(os.path.join(output_dir, MARKER_FILE), 'w').close()
+
+
+def _copy_built_assets(static_folder, output_dir, static_url_path):
+    """Copy hashed files, image derivatives and their compressed siblings (not the manifests)"""
+    copied = 0
+    static_output = os.path.join(output_dir, static_url_path.strip('/'))
+    for build_dir in (FINGERPRINT_DIR, IMAGE_OUTPUT_DIR):
+        source_root = os.path.join(static_folder, build_dir)
+        for root, _, files in os.walk(source_root):
+            for name in files:
+                if name.endswith('.json'):
+                    continue
+                source = os.path.join(root, name)
+                target = os.path.join(static_output, os.path.relpath(source, static_folder))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+                copied += 1
+    return copied
+
+
+def freeze_site(app, output_dir, routes=FREEZE_PAGES):
+    """
+    Render public pages and copy the built assets into output_dir
+
+    Args:
+        app: The Flask application (assets should be built first)
+        output_dir: Directory to write; replaced if it holds a previous freeze
+        routes: Routes to render
+
+    Returns:
+        dict: {'pages': [written page paths], 'assets': number of asset files copied}
+    """
+    _prepare_output(output_dir)
+    client = app.test_client()
+    pages = []
+
+    for route in routes:
+        directory = os.path.join(output_dir, page_directory(route))
+        os.makedirs(directory, exist_ok=True)
+        for filename, headers in VARIANTS:
+            response = client.get(route, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {route} returned {response.status_code}")
+            page_path = os.path.join(page_directory(route), filename) if page_directory(route) else filename
+            with open(os.path.join(output_dir, page_path), 'wb') as f:
+                f.write(response.get_data())
+            pages.append(page_path.replace(os.sep, '/'))
+
+    precompress_files(output_dir, pages)
+    assets = _copy_built_assets(app.static_folder, output_dir, app.static_url_path)
+    return {'pages': pages, 'assets': assets}
+
@@ -0,0 +1,110 @@
+"""
+Preload / preconnect hints for each page's critical assets
+
+The hints are learned from a page's own <head> the first time it is rendered
+(preconnect origins, stylesheets and scripts), then sent as a Link header on
+every later response for that endpoint. Servers and CDNs that support it turn
+the header into 103 Early Hints; when the WSGI server exposes
+environ['wsgi.early_hints'], a 103 is also sent before the view runs.
+"""
+from html.parser import HTMLParser
+
+# Enough for the shell's origins, stylesheets and scripts without flooding the connection
+MAX_HINTS = 10
+
+
+class _HeadAssets(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hints = []
+        self._seen = set()
+        self._noscript = 0
+
+    def _add(self, url, rel, as_type=None, crossorigin=None):
+        if url in self._seen:
+            return
+        self._seen.add(url)
+        self.hints.append((url, rel, as_type, crossorigin))
+
+    def handle_endtag(self, tag):
+        if tag == 'noscript':
+            self._noscript = max(self._noscript - 1, 0)
+
+    def handle_starttag(self, tag, attrs):
+        # Fallbacks inside <noscript> are never fetched by the browsers the hints are for
+        if tag == 'noscript':
+            self._noscript += 1
+        if self._noscript:
+            return
+        attrs = dict(attrs)
+        crossorigin = attrs.get('crossorigin', '') or 'anonymous' if 'crossorigin' in attrs else None
+        rel = attrs.get('rel')
+        if tag == 'link' and attrs.get('href'):
+            if rel == 'preconnect':
+                self._add(attrs['href'], 'preconnect', crossorigin=crossorigin)
+            elif rel == 'stylesheet' or (rel == 'preload' and attrs.get('as') == 'style'):
+                self._add(attrs['href'], 'preload', 'style', crossorigin)
+        elif tag == 'script' and attrs.get('src'):
+            self._add(attrs['src'], 'preload', 'script', crossorigin)
+
+
+def page_hints(html, max_hints=MAX_HINTS):
+    """
+    Preconnect and preload hints for the assets a page loads, in document order
+
+    Preconnects come first, then stylesheets, then scripts; <noscript>
+    fallbacks are ignored.
+
+    Returns:
+        list: (url, rel, as, crossorigin) tuples
+    """
+    parser = _HeadAssets()
+    parser.feed(html)
+    order = {('preconnect', None): 0, ('preload', 'style'): 1, ('preload', 'script'): 2}
+    hints = sorted(parser.hints, key=lambda hint: order[(hint[1], hint[2])])
+    return hints[:max_hints]
+
+
+def link_header(hints):
+    """Format hints as a Link header value"""
+    links = []
+    for url, rel, as_type, crossorigin in hints:
+        link = f'<{url}>; rel={rel}'
+        if as_type:
+            link += f'; as={as_type}'
+        if crossorigin:
+            link += f'; crossorigin={crossorigin}' if crossorigin != 'anonymous' else '; crossorigin'
+        links.append(link)
+    return ', '.join(links)
+
+
+class PreloadHints:
+    """
+    Per-endpoint Link headers learned from rendered pages
+
+    With auto_reload (development) hints are re-learned from every response.
+    """
+
+    def __init__(self, auto_reload=False):
+        self.auto_reload = auto_reload
+        self._links = {}
+
+    def get(self, endpoint):
+        """Link header value for an endpoint, if it has been learned"""
+        return self._links.get(endpoint)
+
+    def learn(self, endpoint, html):
+        """Record the hints for an endpoint from its full-page HTML"""
+        if endpoint in self._links and not self.auto_reload:
+            return self._links[endpoint]
+        self._links[endpoint] = link_header(page_hints(html)) or None
+        return self._links[endpoint]
+
+    def send_early_hints(self, environ, endpoint):
+        """Send a 103 Early Hints response if the server supports it and hints are known"""
+        early_hints = environ.get('wsgi.early_hints')
+        link = self.get(endpoint)
+        if callable(early_hints) and link:
+            early_hints([('Link', link)])
+            return True
+        return False
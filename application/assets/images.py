@@ -0,0 +1,236 @@
+"""
+Responsive image derivatives
+
+A build step resizes each source image in static/images to the sizes the
+templates display it at (1x and 2x), encodes AVIF, WebP and PNG versions and
+records them in a manifest. Templates render <picture> markup from the manifest
+and fall back to the original file when derivatives haven't been built.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+from .manifest import JsonManifest, read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Optional Pillow - only needed by the build step, so it is imported there
+PIL_AVAILABLE = importlib.util.find_spec('PIL') is not None
+
+# Source image -> CSS pixel widths it's displayed at
+IMAGE_SIZES = {
+    'images/profile_photo.PNG': (180,),
+    'images/cat_paw_no_background.png': (58, 100),
+    'images/cat_no_background.png': (50,),
+    'images/cat.png': (240, 478),
+    'images/cat_cafe.png': (640, 1023),
+    'images/yarn_ball_pink.png': (50, 70),
+    'images/yarn_ball_blue.png': (70,),
+    'images/yarn_ball_purple.png': (70,),
+    'images/yarn_ball_orange.png': (70,),
+    'images/yarn_ball_green.png': (70,),
+    'images/yarn_ball_yellow.png': (70,),
+}
+
+DENSITIES = (1, 2)
+OUTPUT_DIR = 'dist/images'
+MANIFEST_NAME = 'manifest.json'
+
+# Preferred first; the last format is the <img> fallback
+FORMATS = ('avif', 'webp', 'png')
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'png': 'image/png'}
+SAVE_OPTIONS = {
+    'avif': {'format': 'AVIF', 'quality': 55},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+
+
+def derivative_widths(display_widths, source_width):
+    """Pixel widths to generate: each display width at every density, never upscaled"""
+    return sorted({min(width * density, source_width) for width in display_widths for density in DENSITIES})
+
+
+def _source_hash(path, display_widths):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(repr((tuple(display_widths), DENSITIES, SAVE_OPTIONS)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _available_formats():
+    from PIL import features
+
+    return [fmt for fmt in FORMATS if fmt == 'png' or features.check(fmt)]
+
+
+def build_image_derivatives(static_folder, sizes=None, force=False):
+    """
+    Generate resized derivatives for every configured source image
+
+    Sources whose content (and size configuration) is unchanged since the last
+    build are skipped, so the step is cheap to run on every deploy.
+
+    Args:
+        static_folder: Path to the app's static folder
+        sizes: Mapping of source path (relative to static) to display widths
+        force: Rebuild everything regardless of the manifest
+
+    Returns:
+        dict: Lists of 'built' and 'skipped' source paths
+    """
+    if not PIL_AVAILABLE:
+        raise RuntimeError('Pillow is required to build image derivatives (pip install Pillow)')
+
+    sizes = IMAGE_SIZES if sizes is None else sizes
+    output_dir = os.path.join(static_folder, OUTPUT_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = read_json(manifest_path)
+    formats = _available_formats()
+    result = {'built': [], 'skipped': []}
+
+    for source, display_widths in sizes.items():
+        source_path = os.path.join(static_folder, source)
+        source_hash = _source_hash(source_path, display_widths)
+        entry = manifest.get(source)
+        if not force and entry and entry['hash'] == source_hash and _outputs_exist(static_folder, entry):
+            result['skipped'].append(source)
+            continue
+
+        if entry:
+            _remove_outputs(static_folder, entry)
+        manifest[source] = _build_one(static_folder, source, source_hash, display_widths, formats)
+        result['built'].append(source)
+        logger.info(f"Built image derivatives for {source}")
+
+    # Forget sources that are no longer configured
+    for source in set(manifest) - set(sizes):
+        _remove_outputs(static_folder, manifest.pop(source))
+
+    write_json(manifest_path, manifest)
+
+    return result
+
+
+def _build_one(static_folder, source, source_hash, display_widths, formats):
+    from PIL import Image
+
+    stem = os.path.splitext(os.path.basename(source))[0].lower()
+    with Image.open(os.path.join(static_folder, source)) as image:
+        image.load()
+        source_width, source_height = image.size
+        variants = {fmt: [] for fmt in formats}
+
+        for width in derivative_widths(display_widths, source_width):
+            height = round(source_height * width / source_width)
+            resized = image.resize((width, height), Image.LANCZOS) if width != source_width else image.copy()
+            for fmt in formats:
+                path = f"{OUTPUT_DIR}/{stem}-{source_hash[:8]}-{width}w.{fmt}"
+                frame = resized if fmt != 'webp' or resized.mode in ('RGB', 'RGBA') else resized.convert('RGBA')
+                frame.save(os.path.join(static_folder, path), **SAVE_OPTIONS[fmt])
+                variants[fmt].append([width, height, path])
+
+    return {'hash': source_hash, 'width': source_width, 'height': source_height, 'variants': variants}
+
+
+def _outputs_exist(static_folder, entry):
+    return all(os.path.exists(os.path.join(static_folder, path))
+               for variants in entry['variants'].values() for _, _, path in variants)
+
+
+def _remove_outputs(static_folder, entry):
+    for variants in entry['variants'].values():
+        for _, _, path in variants:
+            try:
+                os.remove(os.path.join(static_folder, path))
+            except FileNotFoundError:
+                pass
+
+
+class ImageManifest(JsonManifest):
+    """Read side of the derivative manifest, used by the template helpers"""
+
+    def __init__(self, static_folder, auto_reload=False):
+        super().__init__(os.path.join(static_folder, OUTPUT_DIR, MANIFEST_NAME), auto_reload)
+        self._paths = None
+
+    def load(self, data):
+        self._paths = None
+        return data
+
+    @property
+    def paths(self):
+        """Static-relative paths of every derivative (all content-addressed)"""
+        entries = self.entries
+        if self._paths is None:
+            self._paths = frozenset(path for entry in entries.values()
+                                    for variants in entry['variants'].values() for _, _, path in variants)
+        return self._paths
+
+    def url(self, filename, width, fmt='webp'):
+        """
+        URL of the smallest derivative at least `width` pixels wide
+
+        Falls back to PNG, then to the original file if nothing was built.
+        """
+        entry = self.entries.get(filename)
+        variants = entry and (entry['variants'].get(fmt) or entry['variants'].get('png'))
+        if not variants:
+            return url_for('static', filename=filename)
+        path = next((path for w, _, path in variants if w >= width), variants[-1][2])
+        return url_for('static', filename=path)
+
+    def image_set(self, filename, width):
+        """CSS image-set() value for a background image displayed `width` pixels wide"""
+        entry = self.entries.get(filename)
+        if not entry:
+            return Markup(f"url('{url_for('static', filename=filename)}')")
+        candidates = [f"url('{self.url(filename, width, fmt)}') type('{MIME_TYPES[fmt]}')"
+                      for fmt in FORMATS if fmt in entry['variants']]
+        return Markup(f"image-set({', '.join(candidates)})")
+
+    def picture(self, filename, width, height=None, alt='', sizes=None, **attrs):
+        """
+        <picture> markup for an image displayed `width` CSS pixels wide
+
+        Args:
+            filename: Source path relative to the static folder
+            width: Display width in CSS pixels
+            height: Display height (defaults to the source aspect ratio)
+            alt: Alternative text
+            sizes: sizes attribute (defaults to the fixed display width)
+            **attrs: Extra <img> attributes; use class_ for class
+        """
+        entry = self.entries.get(filename)
+        if height is None:
+            height = round(entry['height'] * width / entry['width']) if entry else width
+
+        img_attrs = {'alt': alt, 'width': width, 'height': height, 'decoding': 'async'}
+        img_attrs.update({key.rstrip('_'): value for key, value in attrs.items()})
+
+        if not entry:
+            return Markup(f'<img src="{escape(url_for("static", filename=filename))}"{_attributes(img_attrs)}>')
+
+        sizes = sizes or f'{width}px'
+        sources = []
+        for fmt in FORMATS[:-1]:
+            if fmt in entry['variants']:
+                sources.append(f'<source type="{MIME_TYPES[fmt]}" '
+                               f'srcset="{escape(self._srcset(entry, fmt))}" sizes="{escape(sizes)}">')
+
+        img_attrs = {'src': self.url(filename, width, 'png'), 'srcset': self._srcset(entry, 'png'),
+                     'sizes': sizes, **img_attrs}
+        return Markup(f'<picture>{"".join(sources)}<img{_attributes(img_attrs)}></picture>')
+
+    def _srcset(self, entry, fmt):
+        return ', '.join(f"{url_for('static', filename=path)} {width}w" for width, _, path in entry['variants'][fmt])
+
+
+def _attributes(attrs):
+    return ''.join(f' {name}="{escape(value)}"' for name, value in attrs.items() if value is not None)
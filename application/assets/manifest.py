@@ -0,0 +1,59 @@
+"""
+Build manifest loading shared by the asset helpers
+"""
+import json
+import os
+
+
+def read_json(path):
+    """Load a JSON manifest, treating a missing or corrupt file as empty"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_json(path, data):
+    """Write a manifest atomically so running workers never read a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class JsonManifest:
+    """
+    Read side of a build manifest
+
+    The manifest is read once; with auto_reload (development) it's re-read
+    whenever the file changes.
+    """
+
+    def __init__(self, path, auto_reload=False):
+        self.path = path
+        self.auto_reload = auto_reload
+        self._entries = None
+        self._mtime = None
+
+    @property
+    def entries(self):
+        if self._entries is None or (self.auto_reload and self._current_mtime() != self._mtime):
+            self._mtime = self._current_mtime()
+            self._entries = self.load(read_json(self.path))
+        return self._entries
+
+    def reload(self):
+        """Forget the cached manifest, e.g. after a build in the same process"""
+        self._entries = None
+
+    def load(self, data):
+        """Hook for subclasses to post-process the raw manifest"""
+        return data
+
+    def _current_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
@@ -0,0 +1,118 @@
+"""
+Precompressed static files
+
+A build step writes maximum-level .gz and .br siblings next to text assets;
+the static view picks the best one the client accepts, so nothing is
+compressed per request.
+"""
+import gzip
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+# Optional brotli import - gzip siblings are still built without it
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSED_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.html', '.txt', '.xml', '.map')
+MIN_SIZE = 1024
+
+# Keep a compressed sibling only if it saves at least this fraction
+MIN_SAVING = 0.05
+
+
+def _compressors():
+    compressors = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if BROTLI_AVAILABLE:
+        compressors['.br'] = lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+    return compressors
+
+
+def precompress_files(static_folder, filenames):
+    """
+    Write .gz/.br siblings for compressible files
+
+    Intended for content-hashed files, so an existing sibling is never stale
+    and is left alone.
+
+    Returns:
+        dict: Mapping of filename to {'identity': size, '.gz': size, '.br': size}
+        for every file that has compressed siblings
+    """
+    compressors = _compressors()
+    report = {}
+    for filename in filenames:
+        if not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        path = os.path.join(static_folder, filename)
+        size = os.path.getsize(path)
+        if size < MIN_SIZE:
+            continue
+
+        data = None
+        sizes = {'identity': size}
+        for suffix, compress in compressors.items():
+            if not os.path.exists(path + suffix):
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                compressed = compress(data)
+                if len(compressed) > size * (1 - MIN_SAVING):
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+            sizes[suffix] = os.path.getsize(path + suffix)
+        if len(sizes) > 1:
+            report[filename] = sizes
+    return report
+
+
+def negotiate_encoding(accept_encodings, available):
+    """
+    Choose the Content-Encoding to serve from those with a sibling on disk
+
+    Prefers the client's highest quality value, then br over gzip.
+    Returns None for identity.
+    """
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def send_static_file(filename):
+    """
+    Static view that serves a precompressed sibling when the client accepts it
+
+    Falls back to the regular file (with Flask's usual 404 handling) when no
+    sibling exists.
+    """
+    static_folder = current_app.static_folder
+    max_age = current_app.get_send_file_max_age(filename)
+    path = safe_join(static_folder, filename)
+    available = {encoding: suffix for encoding, suffix in ENCODINGS
+                 if path and os.path.isfile(path + suffix)}
+    if not available:
+        return send_from_directory(static_folder, filename, max_age=max_age)
+
+    encoding = negotiate_encoding(request.accept_encodings, available)
+    if encoding is None:
+        response = send_from_directory(static_folder, filename, max_age=max_age)
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(static_folder, filename + available[encoding],
+                                       mimetype=mimetype, max_age=max_age)
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
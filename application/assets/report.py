@@ -0,0 +1,122 @@
+"""
+Per-route asset size report
+
+Renders each page and adds up the HTML and the local stylesheets and scripts
+it loads, both as stored and as transferred (the smallest precompressed
+sibling; the HTML gzipped), and the inline critical CSS it carries. The report
+is kept next to the build output and compared with the previous build so size
+regressions show up in the build log; pages whose inline CSS exceeds the
+budget fail the build.
+"""
+import gzip
+import os
+from html.parser import HTMLParser
+
+from .critical import CRITICAL_CSS_BUDGET
+from .manifest import read_json, write_json
+from .precompress import COMPRESSED_SUFFIXES
+
+REPORT_NAME = 'dist/size-report.json'
+
+
+class _AssetLinks(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.urls = []
+        self.inline_css = 0
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'style':
+            self._in_style = True
+        elif tag == 'script' and attrs.get('src'):
+            self.urls.append(attrs['src'])
+        elif tag == 'link' and attrs.get('href') and (
+                attrs.get('rel') == 'stylesheet' or (attrs.get('rel') == 'preload' and attrs.get('as') == 'style')):
+            self.urls.append(attrs['href'])
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.inline_css += len(data.encode('utf-8'))
+
+
+def inline_css_size(html):
+    """Bytes of CSS in a page's <style> elements"""
+    parser = _AssetLinks()
+    parser.feed(html)
+    return parser.inline_css
+
+
+def page_assets(html, static_url_path='/static'):
+    """Static-relative paths of the local stylesheets and scripts a page loads"""
+    parser = _AssetLinks()
+    parser.feed(html)
+    prefix = static_url_path.rstrip('/') + '/'
+    paths = []
+    for url in parser.urls:
+        path = url.split('?', 1)[0]
+        if path.startswith(prefix) and path[len(prefix):] not in paths:
+            paths.append(path[len(prefix):])
+    return paths
+
+
+def _transfer_size(path):
+    sizes = [os.path.getsize(path)]
+    sizes.extend(os.path.getsize(path + suffix) for suffix in COMPRESSED_SUFFIXES if os.path.exists(path + suffix))
+    return min(sizes)
+
+
+def measure_page(static_folder, html, static_url_path='/static'):
+    """Bytes a page costs: {'html', 'inline_css', 'css', 'js', 'transfer'}"""
+    html_bytes = html.encode('utf-8')
+    sizes = {'html': len(html_bytes), 'inline_css': inline_css_size(html), 'css': 0, 'js': 0,
+             'transfer': len(gzip.compress(html_bytes, compresslevel=6, mtime=0))}
+    for filename in page_assets(html, static_url_path):
+        path = os.path.join(static_folder, filename)
+        if not os.path.isfile(path):
+            continue
+        kind = 'css' if filename.endswith('.css') else 'js'
+        sizes[kind] += os.path.getsize(path)
+        sizes['transfer'] += _transfer_size(path)
+    return sizes
+
+
+def build_size_report(static_folder, pages, static_url_path='/static'):
+    """
+    Measure rendered pages and store the report
+
+    Args:
+        static_folder: Path to the app's static folder
+        pages: Mapping of route to rendered HTML
+
+    Returns:
+        tuple: (report, previous report) mapping route to sizes
+    """
+    path = os.path.join(static_folder, REPORT_NAME)
+    previous = read_json(path)
+    report = {route: measure_page(static_folder, html, static_url_path) for route, html in pages.items()}
+    write_json(path, report)
+    return report, previous
+
+
+def format_size_report(report, previous=None):
+    """Report table lines, with the change since the previous build"""
+    previous = previous or {}
+    lines = [f"{'Route':<12}{'HTML':>10}{'Inline':>10}{'CSS':>10}{'JS':>10}{'Transfer':>12}  Change"]
+    for route, sizes in report.items():
+        before = previous.get(route, {}).get('transfer')
+        change = '' if before is None else f"{sizes['transfer'] - before:+,d} B"
+        lines.append(f"{route:<12}{sizes['html'] / 1024:>8.1f}KB{sizes.get('inline_css', 0) / 1024:>8.1f}KB"
+                     f"{sizes['css'] / 1024:>8.1f}KB{sizes['js'] / 1024:>8.1f}KB"
+                     f"{sizes['transfer'] / 1024:>10.1f}KB  {change}")
+    return lines
+
+
+def over_budget(report, budget=CRITICAL_CSS_BUDGET):
+    """Routes whose inline critical CSS exceeds `budget` bytes"""
+    return [route for route, sizes in report.items() if sizes.get('inline_css', 0) > budget]
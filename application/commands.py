@@ -0,0 +1,152 @@
+"""
+Flask CLI commands (`flask --app app <command>`)
+"""
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from application.assets import (
+    BROTLI_AVAILABLE, CRITICAL_CSS_BUDGET, CRITICAL_PAGES, build_bundles, build_fingerprints,
+    build_image_derivatives, build_size_report, extract_critical_css, format_size_report, freeze_site, over_budget,
+    precompress_files
+)
+from application.database import backfill_previews, collapse_duplicate_emails, compress_existing_rows
+from application.extensions import db, page_cache, site_assets
+from application.models import SEARCH_INDEXES, ContactMessage, InboundEmail, init_db
+from application.utils.text_utils import make_preview
+
+
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Apply pending database migrations (run once per deploy)"""
+    applied = init_db()
+    for migration in applied:
+        click.echo(f"Applied {migration.version}: {migration.name}")
+    if not applied:
+        click.echo("Database is up to date")
+
+
+@click.command('compress-bodies')
+@with_appcontext
+def compress_bodies_command():
+    """Compress message bodies stored before compression was enabled"""
+    for model in (InboundEmail, ContactMessage):
+        rewritten = compress_existing_rows(db.session, model)
+        click.echo(f"{model.__tablename__}: compressed {rewritten} rows")
+    click.echo("Run VACUUM on the database file to reclaim the freed pages")
+
+
+@click.command('dedup-emails')
+@with_appcontext
+def dedup_emails_command():
+    """Backfill inbound email dedup keys and delete duplicate deliveries"""
+    keyed, deleted = collapse_duplicate_emails(
+        db.session, InboundEmail, lambda email: email.compute_dedup_key()
+    )
+    click.echo(f"inbound_email: keyed {keyed} rows, deleted {deleted} duplicates")
+
+
+@click.command('backfill-previews')
+@with_appcontext
+def backfill_previews_command():
+    """Fill list previews for messages stored before previews were recorded"""
+    for model, source in ((InboundEmail, 'text_content'), (ContactMessage, 'message')):
+        updated = backfill_previews(db.session, model, source, make_preview)
+        click.echo(f"{model.__tablename__}: backfilled {updated} previews")
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Recreate the full-text search indexes from the message tables"""
+    for search_index in SEARCH_INDEXES.values():
+        indexed = search_index.rebuild(db.session)
+        click.echo(f"{search_index.table_name}: indexed {indexed} rows")
+
+
+@click.command('build-images')
+@click.option('--force', is_flag=True, help='Rebuild derivatives even if sources are unchanged')
+@with_appcontext
+def build_images_command(force):
+    """Generate resized AVIF/WebP/PNG derivatives of the site images"""
+    result = build_image_derivatives(current_app.static_folder, force=force)
+    for source in result['built']:
+        click.echo(f"Built {source}")
+    click.echo(f"{len(result['built'])} built, {len(result['skipped'])} unchanged")
+
+
+def render_pages(app, routes):
+    """Render pages as a first-time visitor gets them"""
+    client = app.test_client()
+    return {route: client.get(route).get_data(as_text=True) for route in routes}
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Bundle, fingerprint and precompress static assets, then extract critical CSS"""
+    app = current_app._get_current_object()
+    for filename, sizes in build_bundles(app.static_folder, static_url_path=app.static_url_path).items():
+        click.echo(f"Bundled {filename}: {sizes['source'] / 1024:.1f}KB -> {sizes['minified'] / 1024:.1f}KB")
+
+    manifest = build_fingerprints(app.static_folder, app.static_url_path)
+    site_assets.asset_manifest.reload()
+    click.echo(f"Fingerprinted {len(manifest)} static files")
+
+    report = precompress_files(app.static_folder, manifest.values())
+    for filename, sizes in sorted(report.items()):
+        compressed = ', '.join(f"{suffix[1:]} {size / 1024:.1f}KB" for suffix, size in sizes.items() if suffix != 'identity')
+        click.echo(f"  {filename}: {sizes['identity'] / 1024:.1f}KB -> {compressed}")
+    if not BROTLI_AVAILABLE:
+        click.echo("brotli is not installed; only gzip variants were written")
+
+    # Critical CSS comes from the built stylesheet, so its url()s are already hashed
+    with open(os.path.join(app.static_folder, manifest['dist/bundles/site.css']), encoding='utf-8') as f:
+        stylesheet = f.read()
+    adapter = app.url_map.bind('localhost')
+    critical = {adapter.match(route)[0]: extract_critical_css(stylesheet, html)
+                for route, html in render_pages(app, CRITICAL_PAGES).items()}
+    site_assets.critical_css.write(critical)
+    page_cache.clear()
+    click.echo(f"Extracted critical CSS for {len(critical)} pages")
+
+    size_report, previous = build_size_report(app.static_folder, render_pages(app, CRITICAL_PAGES), app.static_url_path)
+    for line in format_size_report(size_report, previous):
+        click.echo(line)
+    oversized = over_budget(size_report)
+    if oversized:
+        raise click.ClickException(f"Inline critical CSS over the {CRITICAL_CSS_BUDGET / 1024:.0f}KB budget: "
+                                   f"{', '.join(oversized)}")
+
+
+@click.command('freeze')
+@click.option('--output', default='build/site', type=click.Path(file_okay=False),
+              help='Directory to write the pre-rendered site to')
+@with_appcontext
+def freeze_command(output):
+    """Pre-render the public pages and built assets for serving without Python"""
+    asset_manifest = site_assets.asset_manifest
+    if not asset_manifest.enabled or not asset_manifest.entries:
+        raise click.ClickException("Run 'flask --app app build-assets' first (outside debug mode)")
+    try:
+        result = freeze_site(current_app._get_current_object(), output)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for page in result['pages']:
+        click.echo(f"Rendered {page}")
+    click.echo(f"Froze {len(result['pages'])} pages and {result['assets']} asset files into {output}")
+
+
+COMMANDS = (
+    migrate_command, compress_bodies_command, dedup_emails_command, backfill_previews_command,
+    rebuild_search_index_command, build_images_command, build_assets_command, freeze_command,
+)
+
+
+def register_commands(app):
+    """Add the CLI commands to an app"""
+    for command in COMMANDS:
+        app.cli.add_command(command)
@@ -2,5 +2,11 @@
 Configuration management package
 """
 from .config import Config, DevelopmentConfig, ProductionConfig, TestingConfig
+from .database import (READ_BIND, RoutingSession, configure_sqlite_engines,
+                       init_sqlite_engines, apply_pragmas, is_sqlite_file)
 
-__all__ = ['Config', 'DevelopmentConfig', 'ProductionConfig', 'TestingConfig']
+__all__ = [
+    'Config', 'DevelopmentConfig', 'ProductionConfig', 'TestingConfig',
+    'READ_BIND', 'RoutingSession', 'configure_sqlite_engines',
+    'init_sqlite_engines', 'apply_pragmas', 'is_sqlite_file',
+]
@@ -14,9 +14,23 @@ class Config:
     # Database
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite tuning applied to every connection (see application/config/database.py)
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms to wait for a lock
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),  # readers never block the writer
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),  # fsync at checkpoints; safe with WAL
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),  # bytes
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -16000)),  # negative means KiB
+    }
+    # Read-only connections per worker; 0 sends reads through the writer
+    SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', 4))
+    # Seconds a request waits for its worker's single writer connection
+    SQLITE_WRITE_TIMEOUT = int(os.environ.get('SQLITE_WRITE_TIMEOUT', 30))
+
     # API Keys
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
+    SENDGRID_API_HOST = os.environ.get('SENDGRID_API_HOST', 'https://api.sendgrid.com')
 
     # Email settings
     NOTIFICATION_EMAIL = os.environ.get('NOTIFICATION_EMAIL', 'josefin.rui.hao@gmail.com')
@@ -31,6 +45,47 @@ class Config:
     # Application settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request size
 
+    # Health probes: seconds between background runs (0 probes on request), and thresholds
+    HEALTH_CHECK_INTERVAL = int(os.environ.get('HEALTH_CHECK_INTERVAL', 30))
+    HEALTH_MIN_FREE_DISK_MB = int(os.environ.get('HEALTH_MIN_FREE_DISK_MB', 100))
+    HEALTH_PROBE_TIMEOUT = 3
+
+    # Logging pipeline (application/utils/logging_utils.py)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 'json' or 'text'
+    # Records per second allowed per logger (and its children), at any level
+    LOG_RATE_LIMITS = {
+        'application.views.webhooks': 20,
+        'application.views.api': 20,
+        'career_agent': 20,
+    }
+    # Fraction of requests whose INFO/DEBUG records are kept, per logger
+    LOG_SAMPLING = {
+        'application.views.api': 0.25,  # one line per chat query
+    }
+
+    # Request metrics (application/utils/metrics.py): fraction of requests run
+    # under cProfile, and how many of the slowest profiles to keep
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+
+    # Cache shared by the workers on this host (application/utils/shared_cache.py);
+    # the file defaults to instance/shared_cache.sqlite3
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH')
+    SHARED_CACHE_MAX_MB = int(os.environ.get('SHARED_CACHE_MAX_MB', 64))
+    SHARED_CACHE_MAX_ENTRIES = int(os.environ.get('SHARED_CACHE_MAX_ENTRIES', 10000))
+    # Seconds a chat answer is reused for the same question; 0 turns it off
+    CHAT_CACHE_TTL = int(os.environ.get('CHAT_CACHE_TTL', 3600))
+
+    # Admin live feed (/admin/feed/stream): seconds between keepalives, each of
+    # which also checks for rows committed by other workers, and seconds a
+    # stream holds its thread before the browser reconnects
+    ADMIN_FEED_KEEPALIVE = int(os.environ.get('ADMIN_FEED_KEEPALIVE', 15))
+    ADMIN_FEED_MAX_SECONDS = int(os.environ.get('ADMIN_FEED_MAX_SECONDS', 300))
+
+    # Turn off when a proxy in front already compresses responses
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() != 'false'
+
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -38,6 +93,7 @@ class DevelopmentConfig(Config):
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///josefinhao-dev.db'
     SQLALCHEMY_ECHO = True  # Log SQL queries in development
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
 
 
 class ProductionConfig(Config):
@@ -60,6 +116,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'  # In-memory database for tests
     WTF_CSRF_ENABLED = False  # Disable CSRF for testing
+    HEALTH_CHECK_INTERVAL = 0  # No background thread; probes run when asked
+    LOG_FORMAT = 'text'
+    LOG_SAMPLING = {}
+    CHAT_CACHE_TTL = 0  # Tests opt in with their own cache
 
 
 # Configuration dictionary
@@ -0,0 +1,151 @@
+"""
+SQLite engine layer
+
+Every connection is tuned on connect from the SQLITE_PRAGMAS config (WAL,
+busy timeout, synchronous=NORMAL, mmap and page cache size). For a database
+file the app gets two engines:
+
+- the default engine is the single writer: a pool of one connection whose
+  transactions start with BEGIN IMMEDIATE, so writes in a worker queue for
+  the connection and writes across workers queue on the SQLite lock (up to
+  busy_timeout) instead of failing with "database is locked" mid-transaction
+- the READ_BIND engine is a pool of read-only connections; under WAL they
+  read a consistent snapshot without blocking the writer or each other
+
+RoutingSession sends plain SELECTs to the read engine and everything else -
+flushes, DML, explicit connections and any read after a write in the same
+transaction - to the writer. In-memory databases keep a single engine.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select, TextClause
+from flask_sqlalchemy.session import Session
+
+# Bind key of the read-only engine
+READ_BIND = 'read'
+
+# Set once per database file and connection; readers inherit the journal mode
+_WRITER_ONLY_PRAGMAS = ('journal_mode',)
+
+
+def is_sqlite_file(uri):
+    """Whether a database URI points at an SQLite file (not an in-memory database)"""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def configure_sqlite_engines(config):
+    """
+    Limit the default engine of an SQLite file to a single writer connection
+
+    Call before db.init_app(). Leaves other databases and in-memory SQLite alone.
+    """
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri or not is_sqlite_file(uri):
+        return
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 1,
+        'max_overflow': 0,
+        'pool_timeout': config['SQLITE_WRITE_TIMEOUT'],
+        **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
+
+def apply_pragmas(engine, pragmas, read_only=False):
+    """
+    Tune every new connection of an engine
+
+    The engine also takes over transaction control from the sqlite3 driver:
+    writer transactions begin IMMEDIATE (taking the write lock up front, so
+    busy_timeout applies rather than a deadlock error on lock upgrade) and
+    reader transactions begin DEFERRED with PRAGMA query_only set.
+
+    Args:
+        engine: SQLAlchemy engine for an SQLite database
+        pragmas: Dict of pragma name to value, applied in order
+        read_only: Whether this is a read-only engine
+    """
+    # busy_timeout first, so changing the journal mode waits for other workers
+    ordered = sorted(pragmas.items(), key=lambda item: item[0] != 'busy_timeout')
+    if read_only:
+        ordered = [item for item in ordered if item[0] not in _WRITER_ONLY_PRAGMAS]
+        ordered.append(('query_only', 'ON'))
+    begin = 'BEGIN' if read_only else 'BEGIN IMMEDIATE'
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        # Without this the driver opens transactions on its own, lazily
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in ordered:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin_transaction(connection):
+        connection.exec_driver_sql(begin)
+
+
+def init_sqlite_engines(app, engines):
+    """
+    Install the pragmas and add the read-only engine
+
+    Call inside an app context after db.init_app(), before any connection is
+    opened. The read engine is added to db.engines under READ_BIND but not to
+    SQLALCHEMY_BINDS: no tables belong to it, it is the same database.
+
+    Returns:
+        bool: Whether reads are split from writes
+    """
+    if not is_sqlite_file(app.config['SQLALCHEMY_DATABASE_URI']):
+        return False
+    pragmas = app.config['SQLITE_PRAGMAS']
+    writer = engines[None]
+    apply_pragmas(writer, pragmas)
+
+    read_pool_size = app.config['SQLITE_READ_POOL_SIZE']
+    if read_pool_size <= 0:
+        return False
+    # The writer's URL already has the path resolved against the instance folder
+    reader = create_engine(writer.url, pool_size=read_pool_size, max_overflow=0,
+                           echo=app.config.get('SQLALCHEMY_ECHO', False))
+    apply_pragmas(reader, pragmas, read_only=True)
+    engines[READ_BIND] = reader
+    return True
+
+
+def _is_read(clause):
+    if isinstance(clause, Select):
+        return True
+    if isinstance(clause, TextClause):
+        words = clause.text.split(None, 1)
+        return bool(words) and words[0].upper() in ('SELECT', 'WITH')
+    return False
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from the read-only engine when one is configured
+
+    A transaction that has written (or asked for a connection without passing
+    bind_arguments={'read_only': True}) keeps using the writer until it ends,
+    so it sees its own uncommitted rows.
+    """
+
+    _writing = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, read_only=False, **kwargs):
+        if bind is None and not self._writing and not self._flushing and (read_only or _is_read(clause)):
+            engines = self._db.engines
+            if READ_BIND in engines:
+                return engines[READ_BIND]
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if READ_BIND in self._db.engines and engine is not self._db.engines[READ_BIND]:
+            self._writing = True
+        return engine
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _end_write(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
@@ -0,0 +1,18 @@
+"""
+Database helpers package
+"""
+from .types import CompressedText
+from .maintenance import compress_existing_rows, collapse_duplicate_emails, backfill_previews
+from .schema import add_column_if_missing
+from .pagination import Page, keyset_page, keyset_statement, encode_cursor, decode_cursor
+from .search import SearchIndex, build_match_query, html_to_text
+from .migrations import Migration, run_migrations, pending_migrations, migration_applied_at
+
+__all__ = [
+    'CompressedText',
+    'compress_existing_rows', 'collapse_duplicate_emails', 'backfill_previews',
+    'add_column_if_missing',
+    'Page', 'keyset_page', 'keyset_statement', 'encode_cursor', 'decode_cursor',
+    'SearchIndex', 'build_match_query', 'html_to_text',
+    'Migration', 'run_migrations', 'pending_migrations', 'migration_applied_at',
+]
@@ -0,0 +1,159 @@
+"""
+Batch maintenance jobs for existing database rows
+"""
+import logging
+
+from sqlalchemy import select, type_coerce, update
+from sqlalchemy.types import LargeBinary, Text
+
+from .types import CompressedText, compress_text
+
+logger = logging.getLogger(__name__)
+
+
+def compress_existing_rows(session, model, batch_size=200):
+    """
+    Compress uncompressed values in every CompressedText column of a model
+
+    Only values that compress_text would store compressed are rewritten, so
+    a second run over the same rows changes nothing.
+
+    Rows are walked in primary key order and committed one batch at a time,
+    so the job can run against a live database without holding a long write lock.
+
+    Args:
+        session: SQLAlchemy session
+        model: Mapped model class with CompressedText columns
+        batch_size: Number of rows read per batch
+
+    Returns:
+        int: Number of rows actually changed
+    """
+    table = model.__table__
+    columns = [column for column in table.columns if isinstance(column.type, CompressedText)]
+    if not columns:
+        return 0
+
+    # Read the raw stored values, bypassing decompression
+    raw_columns = [type_coerce(column, Text).label(column.name) for column in columns]
+    last_id = 0
+    rewritten = 0
+
+    while True:
+        rows = session.execute(
+            select(table.c.id, *raw_columns)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        for row in rows:
+            values = {}
+            for column in columns:
+                value = getattr(row, column.name)
+                if not isinstance(value, str):
+                    continue
+                # Values under the threshold or that don't shrink are already in their final form
+                compressed = compress_text(value, column.type.threshold, column.type.level)
+                if isinstance(compressed, bytes):
+                    # Written as is, so the column type doesn't compress it a second time
+                    values[column.name] = type_coerce(compressed, LargeBinary)
+            if values:
+                session.execute(update(table).where(table.c.id == row.id).values(**values))
+                rewritten += 1
+
+        session.commit()
+        last_id = rows[-1].id
+        logger.info(f"Compressed {table.name} rows up to id {last_id} ({rewritten} rewritten)")
+
+    return rewritten
+
+
+def collapse_duplicate_emails(session, model, key_func, batch_size=200):
+    """
+    Backfill dedup keys for existing rows and delete duplicates
+
+    Rows without a dedup_key are walked in primary key order. Each row gets
+    its key unless another row already holds it, in which case the row is a
+    retried delivery and is deleted. Safe to run while the unique index exists.
+
+    Args:
+        session: SQLAlchemy session
+        model: Mapped model class with a dedup_key column
+        key_func: Callable returning the dedup key for a model instance
+        batch_size: Number of rows processed per transaction
+
+    Returns:
+        tuple: (rows keyed, rows deleted)
+    """
+    last_id = 0
+    keyed = deleted = 0
+
+    while True:
+        rows = session.execute(
+            select(model)
+            .where(model.id > last_id, model.dedup_key.is_(None))
+            .order_by(model.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not rows:
+            break
+
+        for row in rows:
+            key = key_func(row)
+            if session.execute(select(model.id).where(model.dedup_key == key)).first():
+                session.delete(row)
+                deleted += 1
+            else:
+                row.dedup_key = key
+                keyed += 1
+            # Flush per row so later rows in the batch see this key
+            session.flush()
+
+        session.commit()
+        last_id = rows[-1].id
+        logger.info(f"Deduplicated {model.__tablename__} up to id {last_id} ({keyed} keyed, {deleted} deleted)")
+
+    return keyed, deleted
+
+
+def backfill_previews(session, model, source_attr, preview_func, batch_size=200):
+    """
+    Fill the preview column for rows stored before previews were recorded
+
+    Args:
+        session: SQLAlchemy session
+        model: Mapped model class with a preview column
+        source_attr: Name of the body attribute the preview is built from
+        preview_func: Callable turning a body into a preview
+        batch_size: Number of rows processed per transaction
+
+    Returns:
+        int: Number of rows updated
+    """
+    last_id = 0
+    updated = 0
+
+    while True:
+        rows = session.execute(
+            select(model.id, getattr(model, source_attr))
+            .where(model.id > last_id, model.preview.is_(None))
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        for row_id, body in rows:
+            preview = preview_func(body)
+            if preview is not None:
+                session.execute(update(model).where(model.id == row_id).values(preview=preview))
+                updated += 1
+
+        session.commit()
+        last_id = rows[-1][0]
+
+    logger.info(f"Backfilled {updated} {model.__tablename__} previews")
+    return updated
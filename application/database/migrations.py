@@ -0,0 +1,83 @@
+"""
+Lightweight versioned schema migrations
+
+Migrations are plain functions taking a connection. Each one runs in its own
+transaction and is recorded in the schema_migrations table, so it's applied
+exactly once per database. Run them once per deploy, not from worker startup.
+
+Migrations must be idempotent (CREATE ... IF NOT EXISTS, add_column_if_missing):
+the sqlite3 driver commits DDL immediately, so a migration that fails halfway
+is retried from the start on the next run.
+"""
+import logging
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple('Migration', ['version', 'name', 'upgrade'])
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def applied_versions(connection):
+    """Return the set of migration versions already applied"""
+    if not inspect(connection).has_table(schema_migrations.name):
+        return set()
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def migration_applied_at(connection, version):
+    """When a migration was applied to the database, or None if it hasn't been"""
+    if not inspect(connection).has_table(schema_migrations.name):
+        return None
+    return connection.execute(
+        select(schema_migrations.c.applied_at).where(schema_migrations.c.version == version)
+    ).scalar()
+
+
+def pending_migrations(engine, migrations):
+    """Return migrations not yet applied to the database, in version order"""
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in sorted(migrations, key=lambda m: m.version)
+            if migration.version not in applied]
+
+
+def run_migrations(engine, migrations):
+    """
+    Apply pending migrations in version order
+
+    Args:
+        engine: SQLAlchemy engine
+        migrations: Iterable of Migration
+
+    Returns:
+        list: Migrations applied by this call
+    """
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError('Duplicate migration versions')
+
+    with engine.begin() as connection:
+        _metadata.create_all(connection)
+
+    applied = []
+    for migration in pending_migrations(engine, migrations):
+        logger.info(f"Applying migration {migration.version}: {migration.name}")
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(insert(schema_migrations).values(
+                version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+            ))
+        applied.append(migration)
+
+    return applied
@@ -0,0 +1,86 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode the sort key of the last row on a page as an opaque URL-safe token"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        tuple: (datetime, int), or None if the cursor is missing or malformed
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        timestamp, row_id = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_statement(statement, time_column, id_column, cursor=None, limit=25):
+    """
+    Restrict a select() to the rows after a cursor, newest first
+
+    Unlike OFFSET pagination, every page costs the same: the cursor becomes a
+    (time, id) range condition that an index on those columns can seek to.
+
+    Args:
+        statement: select() of the model
+        time_column: Timestamp column to sort by
+        id_column: Primary key column used as a tie breaker
+        cursor: Cursor from a previous page's next_cursor
+        limit: Maximum rows to return
+
+    Returns:
+        Select: the paged statement
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        statement = statement.where(tuple_(time_column, id_column) < position)
+    return statement.order_by(time_column.desc(), id_column.desc()).limit(limit)
+
+
+def keyset_page(session, statement, time_column, id_column, cursor=None, per_page=25):
+    """
+    Fetch one page of rows, newest first, starting after a cursor
+
+    Args:
+        session: SQLAlchemy session
+        statement: select() of the model
+        time_column: Timestamp column to sort by
+        id_column: Primary key column used as a tie breaker
+        cursor: Cursor from a previous page's next_cursor
+        per_page: Maximum rows per page
+
+    Returns:
+        Page: items and the cursor for the following page (None on the last page)
+    """
+    # Fetch one extra row to know whether there is a next page
+    paged = keyset_statement(statement, time_column, id_column, cursor, per_page + 1)
+    rows = session.execute(paged).scalars().all()
+    if len(rows) <= per_page:
+        return Page(rows, None)
+
+    rows = rows[:per_page]
+    last = rows[-1]
+    timestamp = getattr(last, time_column.key)
+    if timestamp is None:
+        # Undated rows sort last and can't be a position; migrations backfill them
+        return Page(rows, None)
+    return Page(rows, encode_cursor(timestamp, getattr(last, id_column.key)))
@@ -0,0 +1,28 @@
+"""
+Schema helpers for tables created before a column existed
+"""
+from sqlalchemy import inspect, text
+
+
+def add_column_if_missing(connection, table_name, column_name, column_ddl):
+    """
+    Add a column to an existing table
+
+    db.create_all() only creates missing tables, so columns added to a model
+    later have to be added to existing databases explicitly.
+
+    Args:
+        connection: SQLAlchemy connection inside a transaction
+        table_name: Table to alter
+        column_name: Column to add
+        column_ddl: SQL type and constraints, e.g. 'VARCHAR(64)'
+
+    Returns:
+        bool: True if the column was added
+    """
+    columns = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    if column_name in columns:
+        return False
+
+    connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}'))
+    return True
@@ -0,0 +1,196 @@
+"""
+Full-text search over stored messages using SQLite FTS5
+"""
+import logging
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Snippet highlight markers - control characters that never occur in message
+# text, swapped for <mark> tags after the snippet has been HTML-escaped
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(query):
+    """
+    Turn free-form user input into a safe FTS5 MATCH expression
+
+    Each word becomes a quoted term and all terms must match, so FTS5
+    operators and stray quotes in the input can't cause syntax errors. The
+    last word is matched as a prefix, so partially typed words still find
+    results without widening every term.
+
+    Returns:
+        str: MATCH expression, or None if the input has no searchable words
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def html_to_text(html):
+    """Crude tag stripper for indexing HTML-only emails"""
+    return ' '.join(_TAG_RE.sub(' ', html).split()) if html else ''
+
+
+class SearchIndex:
+    """
+    FTS5 index mirroring the searchable fields of one model
+
+    The index table stores its own copy of subject, sender and body, keyed by
+    the source row id, and is kept in sync from the ORM write path inside the
+    same transaction. Triggers aren't an option because bodies are stored
+    compressed and SQL can't read them.
+    """
+
+    COLUMNS = ('subject', 'sender', 'body')
+
+    def __init__(self, table_name, model, document_func, watched_attrs):
+        """
+        Args:
+            table_name: Name of the FTS5 virtual table
+            model: Mapped model class being indexed
+            document_func: Callable mapping a model instance to a dict of COLUMNS
+            watched_attrs: Model attributes whose changes require reindexing
+        """
+        self.table_name = table_name
+        self.model = model
+        self.document_func = document_func
+        self.watched_attrs = watched_attrs
+        self.enabled = None  # Unknown until the table is created or first looked up
+
+        event.listen(model, 'after_insert', self._after_insert)
+        event.listen(model, 'after_update', self._after_update)
+        event.listen(model, 'after_delete', self._after_delete)
+
+    def is_enabled(self, connection):
+        """Whether the index table exists (looked up once per process)"""
+        if self.enabled is None:
+            self.enabled = inspect(connection).has_table(self.table_name)
+        return self.enabled
+
+    def create(self, connection):
+        """Create the virtual table if needed; disables the index if FTS5 is unavailable"""
+        self.enabled = True
+        try:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table_name} "
+                f"USING fts5({', '.join(self.COLUMNS)}, tokenize='porter unicode61', prefix='2 3')"
+            ))
+        except OperationalError as e:
+            logger.warning(f"Full-text search disabled for {self.table_name}: {e}")
+            self.enabled = False
+
+    def index(self, connection, target):
+        """Replace the indexed document for a model instance"""
+        if not self.is_enabled(connection):
+            return
+        document = self.document_func(target)
+        connection.execute(text(f"DELETE FROM {self.table_name} WHERE rowid = :id"), {'id': target.id})
+        connection.execute(
+            text(f"INSERT INTO {self.table_name} (rowid, {', '.join(self.COLUMNS)}) "
+                 f"VALUES (:id, {', '.join(':' + column for column in self.COLUMNS)})"),
+            {'id': target.id, **{column: document.get(column) or '' for column in self.COLUMNS}}
+        )
+
+    def remove(self, connection, row_id):
+        """Drop a row from the index"""
+        if self.is_enabled(connection):
+            connection.execute(text(f"DELETE FROM {self.table_name} WHERE rowid = :id"), {'id': row_id})
+
+    def rebuild(self, session, batch_size=500):
+        """
+        Recreate the index from the source table
+
+        Returns:
+            int: Number of rows indexed
+        """
+        connection = session.connection()
+        connection.execute(text(f"DROP TABLE IF EXISTS {self.table_name}"))
+        self.create(connection)
+        if not self.enabled:
+            return 0
+
+        last_id = 0
+        indexed = 0
+        while True:
+            rows = session.execute(
+                select(self.model).where(self.model.id > last_id).order_by(self.model.id).limit(batch_size)
+            ).scalars().all()
+            if not rows:
+                break
+            for row in rows:
+                self.index(session.connection(), row)
+            indexed += len(rows)
+            last_id = rows[-1].id
+            session.commit()
+            session.expunge_all()
+
+        connection = session.connection()
+        connection.execute(text(f"INSERT INTO {self.table_name} ({self.table_name}) VALUES ('optimize')"))
+        session.commit()
+        logger.info(f"Rebuilt {self.table_name} with {indexed} rows")
+        return indexed
+
+    def search(self, session, query, limit=20, offset=0):
+        """
+        Ranked search with highlighted snippets
+
+        Args:
+            session: SQLAlchemy session
+            query: Free-form user search text
+            limit: Maximum results
+            offset: Results to skip (for paging)
+
+        Returns:
+            list: Dicts with id, subject, sender, snippet (HTML-safe Markup) and rank
+        """
+        match = build_match_query(query)
+        # read_only lets the app's routing session answer from a read-only connection
+        if not match or not self.is_enabled(session.connection(bind_arguments={'read_only': True})):
+            return []
+
+        rows = session.execute(
+            text(f"SELECT rowid, subject, sender, "
+                 f"snippet({self.table_name}, -1, :start, :end, '…', 16) AS snippet, rank "
+                 f"FROM {self.table_name} WHERE {self.table_name} MATCH :match "
+                 f"ORDER BY rank LIMIT :limit OFFSET :offset"),
+            {'match': match, 'start': _HIGHLIGHT_START, 'end': _HIGHLIGHT_END,
+             'limit': limit, 'offset': offset}
+        ).all()
+
+        return [{
+            'id': row.rowid,
+            'subject': row.subject,
+            'sender': row.sender,
+            'snippet': highlight(row.snippet),
+            'rank': row.rank,
+        } for row in rows]
+
+    def _after_insert(self, mapper, connection, target):
+        self.index(connection, target)
+
+    def _after_update(self, mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[attr].history.has_changes() for attr in self.watched_attrs):
+            self.index(connection, target)
+
+    def _after_delete(self, mapper, connection, target):
+        self.remove(connection, target.id)
+
+
+def highlight(snippet):
+    """Escape a raw FTS5 snippet and turn the highlight markers into <mark> tags"""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>'))
@@ -0,0 +1,90 @@
+"""
+Custom SQLAlchemy column types
+"""
+import zlib
+
+from sqlalchemy.types import Text, TypeDecorator
+
+# Compressed values are stored as BLOBs starting with this header, followed by
+# a one-byte format version. 0xFF never starts a valid UTF-8 string, so plain
+# text that happens to be stored as bytes can't be mistaken for a compressed value.
+COMPRESSED_MAGIC = b'\xffCT'
+FORMAT_ZLIB = 1
+
+DEFAULT_THRESHOLD = 1024  # Bytes - shorter values are stored as plain text
+DEFAULT_LEVEL = 6
+
+
+def compress_text(value, threshold=DEFAULT_THRESHOLD, level=DEFAULT_LEVEL):
+    """
+    Compress a string for storage
+
+    Args:
+        value: Text to store
+        threshold: Minimum encoded size in bytes before compression is attempted
+        level: zlib compression level (1-9)
+
+    Returns:
+        bytes with a versioned header if compression paid off, otherwise the original string
+    """
+    if value is None:
+        return None
+
+    raw = value.encode('utf-8')
+    if len(raw) < threshold:
+        return value
+
+    compressed = COMPRESSED_MAGIC + bytes([FORMAT_ZLIB]) + zlib.compress(raw, level)
+    if len(compressed) >= len(raw):
+        return value
+    return compressed
+
+
+def decompress_text(value):
+    """
+    Decode a stored value back into a string
+
+    Accepts plain strings (rows written before compression was enabled or
+    below the threshold) as well as compressed BLOBs.
+    """
+    if value is None or isinstance(value, str):
+        return value
+
+    value = bytes(value)
+    if not is_compressed(value):
+        return value.decode('utf-8')
+
+    version = value[len(COMPRESSED_MAGIC)]
+    payload = value[len(COMPRESSED_MAGIC) + 1:]
+    if version == FORMAT_ZLIB:
+        return zlib.decompress(payload).decode('utf-8')
+
+    raise ValueError(f'Unsupported compressed text format version: {version}')
+
+
+def is_compressed(value):
+    """Return True if a raw stored value carries the compressed header"""
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:len(COMPRESSED_MAGIC)]) == COMPRESSED_MAGIC
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column that transparently zlib-compresses large values
+
+    The column is still declared as TEXT, so existing tables need no schema
+    change: SQLite stores compressed values as BLOBs and short values as plain
+    text, and both read back as str.
+    """
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, level=DEFAULT_LEVEL, **kwargs):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+        self.level = level
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value, self.threshold, self.level)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
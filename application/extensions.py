@@ -0,0 +1,25 @@
+"""
+Extension instances shared by the application factory, models and views
+
+Created unbound at import time and attached to an app in create_app(), so
+models and blueprints can import them without importing the app.
+"""
+from flask_sqlalchemy import SQLAlchemy
+
+from application.assets import SiteAssets
+from application.config.database import RoutingSession
+from application.utils.http_utils import is_spa_request
+from application.utils.render_cache import RenderCache
+from application.utils.shared_cache import SharedCache
+
+# Reads go to the read-only SQLite engine when create_app() configures one
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Rendered bodies of the static marketing pages, keyed by endpoint and SPA/full variant
+page_cache = RenderCache(variant=lambda: 'spa' if is_spa_request() else 'page')
+
+# Built asset manifests and the static/preload hooks that use them
+site_assets = SiteAssets()
+
+# Cross-worker key-value cache (one SQLite file per host), e.g. chat answers
+shared_cache = SharedCache()
@@ -3,5 +3,7 @@ Database models package
 """
 from .contact_message import ContactMessage
 from .inbound_email import InboundEmail
+from .search import SEARCH_INDEXES
+from .migrations import MIGRATIONS, dedup_keys_added_at, init_db
 
-__all__ = ['ContactMessage', 'InboundEmail']
+__all__ = ['ContactMessage', 'InboundEmail', 'SEARCH_INDEXES', 'MIGRATIONS', 'dedup_keys_added_at', 'init_db']
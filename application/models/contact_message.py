@@ -2,16 +2,11 @@
 Contact Message Model
 """
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 
-# Database instance will be injected
-db = None
-
-
-def init_db(database):
-    """Initialize database instance"""
-    global db
-    db = database
+from application.database import CompressedText
+from application.extensions import db
+from application.utils.text_utils import make_preview
 
 
 class ContactMessage(db.Model):
@@ -22,12 +17,18 @@ class ContactMessage(db.Model):
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     subject = db.Column(db.String(200), nullable=False)
-    message = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    message = db.Column(CompressedText, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Dashboard sort key
+    preview = db.Column(db.String(200))  # Kept in sync with message for list views
 
     def __repr__(self):
         return f'<ContactMessage {self.id}: {self.subject}>'
 
+    @validates('message')
+    def _update_preview(self, key, value):
+        self.preview = make_preview(value)
+        return value
+
     def to_dict(self):
         """Convert model to dictionary"""
         return {
@@ -2,16 +2,12 @@
 Inbound Email Model
 """
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 
-# Database instance will be injected
-db = None
-
-
-def init_db(database):
-    """Initialize database instance"""
-    global db
-    db = database
+from application.database import CompressedText
+from application.extensions import db
+from application.utils.text_utils import make_preview
+from application.utils.webhook_utils import inbound_email_content_key
 
 
 class InboundEmail(db.Model):
@@ -22,13 +18,30 @@ class InboundEmail(db.Model):
     from_email = db.Column(db.String(200), nullable=False)
     to_email = db.Column(db.String(200), nullable=False)
     subject = db.Column(db.String(500), nullable=False)
-    text_content = db.Column(db.Text)
-    html_content = db.Column(db.Text)
-    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    text_content = db.Column(CompressedText)
+    html_content = db.Column(CompressedText)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Dashboard sort key
+    dedup_key = db.Column(db.String(64), unique=True, index=True)  # Message-ID or content hash
+    preview = db.Column(db.String(200))  # Kept in sync with text_content for list views
 
     def __repr__(self):
         return f'<InboundEmail {self.id}: {self.subject}>'
 
+    @validates('text_content')
+    def _update_preview(self, key, value):
+        self.preview = make_preview(value)
+        return value
+
+    def compute_dedup_key(self):
+        """Dedup key for rows stored before keys were recorded (no headers kept)"""
+        return inbound_email_content_key({
+            'from': self.from_email,
+            'to': self.to_email,
+            'subject': self.subject,
+            'text': self.text_content or '',
+            'html': self.html_content or ''
+        })
+
     def to_dict(self):
         """Convert model to dictionary"""
         return {
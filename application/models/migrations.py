@@ -0,0 +1,97 @@
+"""
+Schema migrations for the website database, applied by `flask --app app migrate`
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from application.database import (
+    Migration, add_column_if_missing, backfill_previews, migration_applied_at, run_migrations
+)
+from application.extensions import db
+from application.utils.text_utils import make_preview
+
+from .contact_message import ContactMessage
+from .inbound_email import InboundEmail
+from .search import SEARCH_INDEXES
+
+logger = logging.getLogger(__name__)
+
+
+def _create_tables(conn):
+    # Creates the current schema on a fresh database; later migrations are
+    # written to be no-ops when their change is already present
+    db.metadata.create_all(bind=conn)
+
+
+def _add_inbound_email_dedup_key(conn):
+    add_column_if_missing(conn, 'inbound_email', 'dedup_key', 'VARCHAR(64)')
+    conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_inbound_email_dedup_key ON inbound_email (dedup_key)'))
+
+
+def _add_previews(conn):
+    add_column_if_missing(conn, 'inbound_email', 'preview', 'VARCHAR(200)')
+    add_column_if_missing(conn, 'contact_message', 'preview', 'VARCHAR(200)')
+    with Session(bind=conn) as session:
+        backfill_previews(session, InboundEmail, 'text_content', make_preview)
+        backfill_previews(session, ContactMessage, 'message', make_preview)
+
+
+def _create_search_indexes(conn):
+    with Session(bind=conn) as session:
+        for search_index in SEARCH_INDEXES.values():
+            search_index.rebuild(session)
+
+
+def _add_time_indexes(conn):
+    # Dashboard lists page by (time, id) newest first; id is the rowid, which
+    # SQLite appends to every index, so one column covers the sort
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_inbound_email_received_at ON inbound_email (received_at)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_contact_message_created_at ON contact_message (created_at)'))
+
+
+def _backfill_timestamps(conn):
+    # Rows can predate the column defaults. Lists sort and page by time, so
+    # each undated row takes the time of the nearest dated row before it
+    # (by id, which is arrival order), else the one after it, else now.
+    for table, column in (('inbound_email', 'received_at'), ('contact_message', 'created_at')):
+        conn.execute(text(
+            f"UPDATE {table} SET {column} = COALESCE("
+            f"(SELECT prior.{column} FROM {table} AS prior WHERE prior.id < {table}.id "
+            f"AND prior.{column} IS NOT NULL ORDER BY prior.id DESC LIMIT 1), "
+            f"(SELECT later.{column} FROM {table} AS later WHERE later.id > {table}.id "
+            f"AND later.{column} IS NOT NULL ORDER BY later.id LIMIT 1), "
+            f"CURRENT_TIMESTAMP) WHERE {column} IS NULL"
+        ))
+
+
+MIGRATIONS = [
+    Migration(1, 'create tables', _create_tables),
+    Migration(2, 'inbound email dedup key', _add_inbound_email_dedup_key),
+    Migration(3, 'message previews', _add_previews),
+    Migration(4, 'full-text search indexes', _create_search_indexes),
+    Migration(5, 'time-ordered indexes', _add_time_indexes),
+    Migration(6, 'backfill missing timestamps', _backfill_timestamps),
+]
+
+# The migration that added inbound_email.dedup_key
+DEDUP_KEY_VERSION = 2
+
+
+def dedup_keys_added_at(connection):
+    """
+    When inbound emails started being stored with dedup keys
+
+    Rows received earlier were backfilled with content keys whatever their
+    Message-ID. None when the migration wasn't recorded (the schema was
+    created with the column), so no row predates it.
+    """
+    return migration_applied_at(connection, DEDUP_KEY_VERSION)
+
+
+def init_db():
+    """Initialize the database by applying pending migrations (needs an app context)"""
+    applied = run_migrations(db.engine, MIGRATIONS)
+    logger.info(f"Database initialized successfully ({len(applied)} migrations applied)")
+    return applied
@@ -0,0 +1,28 @@
+"""
+Full-text search indexes over the message tables, kept in sync on every ORM write
+"""
+from application.database import SearchIndex, html_to_text
+
+from .contact_message import ContactMessage
+from .inbound_email import InboundEmail
+
+SEARCH_INDEXES = {
+    'emails': SearchIndex(
+        'inbound_email_fts', InboundEmail,
+        lambda email: {
+            'subject': email.subject,
+            'sender': email.from_email,
+            'body': email.text_content or html_to_text(email.html_content)
+        },
+        watched_attrs=('subject', 'from_email', 'text_content', 'html_content')
+    ),
+    'messages': SearchIndex(
+        'contact_message_fts', ContactMessage,
+        lambda message: {
+            'subject': message.subject,
+            'sender': f'{message.name} <{message.email}>',
+            'body': message.message
+        },
+        watched_attrs=('subject', 'name', 'email', 'message')
+    ),
+}
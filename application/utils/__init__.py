@@ -2,6 +2,19 @@
 Utility functions package
 """
 from .email_utils import send_contact_notification
-from .auth_utils import requires_auth, verify_admin_credentials
+from .auth_utils import requires_auth, verify_admin_credentials, CredentialCache, FailureThrottle
+from .webhook_utils import inbound_email_dedup_key, inbound_email_content_key, normalize_inbound_email
+from .text_utils import make_preview
+from .render_cache import RenderCache
+from .http_utils import is_spa_request, body_etag, collection_etag, is_not_modified
+from .compression import compress_response
+from .logging_utils import JsonFormatter, SamplingFilter, LogPipeline, current_request_id
+from .shared_cache import SharedCache
+from .live_feed import Broadcaster
 
-__all__ = ['send_contact_notification', 'requires_auth', 'verify_admin_credentials']
+__all__ = ['send_contact_notification', 'requires_auth', 'verify_admin_credentials', 'CredentialCache',
+           'FailureThrottle', 'inbound_email_dedup_key', 'inbound_email_content_key',
+           'normalize_inbound_email', 'make_preview', 'RenderCache', 'is_spa_request',
+           'body_etag', 'collection_etag', 'is_not_modified', 'compress_response',
+           'JsonFormatter', 'SamplingFilter', 'LogPipeline', 'current_request_id', 'SharedCache',
+           'Broadcaster']
@@ -1,19 +1,145 @@
 """
 Authentication utility functions
 """
+import hashlib
+import hmac
+import json
+import math
 import os
 import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
 from functools import wraps
 from flask import request, jsonify, session
 from werkzeug.security import check_password_hash
 
 logger = logging.getLogger(__name__)
 
+
+class CredentialCache:
+    """
+    Short-lived memory of credentials that verified successfully
+
+    Password hashes are slow on purpose, and scripted clients that send Basic
+    auth without keeping the session cookie would pay for one on every call.
+    Entries are HMAC-SHA256 digests under a random per-process key, so neither
+    the password nor anything that can be guessed offline is kept. Only
+    successes are stored, each for `ttl` seconds from its verification (a hit
+    does not extend it), and the oldest entries are dropped beyond `max_size`.
+    """
+
+    def __init__(self, max_size=64, ttl=300, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, parts):
+        return hmac.new(self._key, json.dumps(parts).encode('utf-8'), hashlib.sha256).digest()
+
+    def contains(self, *parts):
+        """Whether these credentials verified within the last `ttl` seconds"""
+        digest = self._digest(parts)
+        with self._lock:
+            expires = self._entries.get(digest)
+            if expires is None:
+                return False
+            if expires <= self._clock():
+                del self._entries[digest]
+                return False
+            return True
+
+    def add(self, *parts):
+        """Remember credentials that just verified"""
+        digest = self._digest(parts)
+        with self._lock:
+            self._entries[digest] = self._clock() + self.ttl
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FailureThrottle:
+    """
+    Per-username lockout after repeated failed logins
+
+    After `max_failures` failures within `window` seconds, further attempts
+    for that username are refused without checking the password until the
+    oldest of those failures leaves the window. At most `max_tracked`
+    usernames are remembered, least recently failed dropped first - except
+    that a username that is locked out is kept until its lockout ends, so
+    failures for other names can't push it out.
+    """
+
+    def __init__(self, max_failures=5, window=300, max_tracked=1024, clock=time.monotonic):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_tracked = max_tracked
+        self._clock = clock
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remaining(self, failures, now):
+        if not failures or len(failures) < self.max_failures:
+            return 0
+        return failures[0] + self.window - now
+
+    def retry_after(self, username):
+        """Seconds until `username` may try again (0 when not locked out)"""
+        with self._lock:
+            remaining = self._remaining(self._failures.get(username), self._clock())
+            return math.ceil(remaining) if remaining > 0 else 0
+
+    def record_failure(self, username):
+        with self._lock:
+            now = self._clock()
+            failures = self._failures.pop(username, None) or deque(maxlen=self.max_failures)
+            failures.append(now)
+            self._failures[username] = failures
+            excess = len(self._failures) - self.max_tracked
+            if excess > 0:
+                evictable = [name for name, tracked in self._failures.items()
+                             if self._remaining(tracked, now) <= 0]
+                for name in evictable[:excess]:
+                    del self._failures[name]
+
+    def reset(self, username):
+        with self._lock:
+            self._failures.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._failures.clear()
+
+
+# Per worker process
+credential_cache = CredentialCache()
+failure_throttle = FailureThrottle()
+
+
+def _credential_settings():
+    # Part of every cache key, so changing the admin password invalidates the cache
+    return [os.environ.get('ADMIN_USERNAME', 'admin'), os.environ.get('ADMIN_PASSWORD_HASH'),
+            os.environ.get('ADMIN_PASSWORD')]
+
+
 # Simple authentication decorator for admin routes
 def requires_auth(f):
     """
     Decorator to require authentication for admin routes
     Uses basic auth or session-based auth
+
+    Credentials that verified recently are accepted from credential_cache
+    without hashing the password again - even while failure_throttle has the
+    username locked out by someone else's guesses.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -26,10 +152,26 @@ def requires_auth(f):
         if not auth:
             return jsonify({'error': 'Authentication required'}), 401
 
+        username = (auth.username or '')[:256]
+        credentials = (username, auth.password or '', *_credential_settings())
+        if credential_cache.contains(*credentials):
+            session['authenticated'] = True
+            return f(*args, **kwargs)
+
+        retry_after = failure_throttle.retry_after(username)
+        if retry_after:
+            logger.warning(f"Throttled authentication attempt for user: {username}")
+            return jsonify({'error': 'Too many failed attempts'}), 429, {'Retry-After': str(retry_after)}
+
         if verify_admin_credentials(auth.username, auth.password):
+            credential_cache.add(*credentials)
+            failure_throttle.reset(username)
             session['authenticated'] = True
             return f(*args, **kwargs)
 
+        # Only the admin username can ever verify, so only guesses at it are counted
+        if username == os.environ.get('ADMIN_USERNAME', 'admin'):
+            failure_throttle.record_failure(username)
         logger.warning(f"Failed authentication attempt for user: {auth.username}")
         return jsonify({'error': 'Invalid credentials'}), 401
 
@@ -0,0 +1,190 @@
+"""
+Dynamic response compression
+
+Compresses HTML and JSON bodies with brotli or gzip at moderate levels (the
+maximum levels are kept for the precompressed static files). Server-Sent
+Events are compressed event by event with a flush after each one, so a single
+compressor keeps its window across the whole stream and every event reaches
+the client as soon as it is yielded.
+"""
+import zlib
+
+# Optional brotli import - gzip is used alone without it
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = (
+    'text/html', 'text/plain', 'text/css', 'text/xml', 'text/javascript', 'text/event-stream',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+# Below this the headers outweigh the saving
+MIN_SIZE = 1024
+
+# Dynamic bodies are compressed on every request: fast levels with most of the ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Order of preference. Flushing after every small event costs brotli more
+# framing than gzip, so event streams prefer gzip (see bench_compression)
+BODY_ENCODINGS = ('br', 'gzip')
+STREAM_ENCODINGS = ('gzip', 'br')
+
+
+def choose_encoding(accept_encodings, preference=BODY_ENCODINGS):
+    """
+    Pick a Content-Encoding from the client's Accept-Encoding
+
+    Prefers the client's highest quality value, then the order of preference.
+    Returns None for identity.
+    """
+    best, best_quality = None, 0
+    for encoding in preference:
+        if encoding == 'br' and not BROTLI_AVAILABLE:
+            continue
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class StreamCompressor:
+    """
+    One compressor for a whole stream, flushed after every chunk
+
+    The flush ends each chunk on a byte boundary the client can decode
+    immediately, while later chunks still refer back to earlier ones.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+        else:
+            # wbits 16+ writes the gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        """Compress a chunk and flush it"""
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        """End the stream"""
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_body(data, encoding):
+    """Compress a complete body in one call"""
+    if encoding == 'br':
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _weaken_etag(response):
+    # The encoded bytes differ from the identity body, so a strong validator no
+    # longer applies; conditional requests compare weakly and still match
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def _compressed_or_none(data, encoding):
+    # None when the body is too small or doesn't shrink
+    if len(data) < MIN_SIZE:
+        return None
+    compressed = compress_body(data, encoding)
+    return compressed if len(compressed) < len(data) else None
+
+
+def _stored_variant(data, variants, encoding):
+    # Compressed once per encoding; a race between threads only repeats the work
+    if encoding not in variants:
+        variants[encoding] = _compressed_or_none(data, encoding)
+    return variants[encoding]
+
+
+def prepare_stored_response(request, response, variants):
+    """
+    Attach the compressed copies of a stored body, and set its validators
+
+    `variants` maps an encoding to the compressed body (None where it didn't
+    pay off), filled the first time each encoding is asked for, so a body
+    served many times is compressed once per encoding. compress_response
+    sends the copy at the end of the request, after the other hooks have seen
+    the plain body. Vary and the weak ETag are set here, before
+    make_conditional, so a 304 carries the validators of the 200 it stands in for.
+    """
+    response.compressed_variants = variants
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or response.cache_control.no_transform:
+        return
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is not None and _stored_variant(response.get_data(), variants, encoding) is not None:
+        _weaken_etag(response)
+
+
+def compress_response(request, response):
+    """
+    Compress a response for the client, if worthwhile
+
+    A response prepared by prepare_stored_response is sent from its stored
+    compressed copies. Skips responses that already have a Content-Encoding
+    (precompressed static files), file passthroughs, non-200 statuses, incompressible types, bodies
+    under MIN_SIZE and responses marked Cache-Control: no-transform.
+    text/event-stream responses are compressed event by event, preferring
+    gzip; other streamed responses are left alone.
+
+    Returns:
+        Response: The same response, compressed in place when applicable
+    """
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.cache_control.no_transform):
+        return response
+
+    streamed = response.is_streamed
+    if streamed and response.mimetype != 'text/event-stream':
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings, STREAM_ENCODINGS if streamed else BODY_ENCODINGS)
+    if encoding is None:
+        return response
+
+    if streamed:
+        response.response = _compress_stream(response.response, StreamCompressor(encoding))
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        data = response.get_data()
+        variants = getattr(response, 'compressed_variants', None)
+        compressed = (_compressed_or_none(data, encoding) if variants is None
+                      else _stored_variant(data, variants, encoding))
+        if compressed is None:
+            return response
+        response.set_data(compressed)
+        _weaken_etag(response)
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -1,18 +1,15 @@
 """
 Email utility functions
 """
+import importlib.util
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Optional SendGrid import
-try:
-    from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail, Email as SGEmail, To, Content
-    SENDGRID_AVAILABLE = True
-except ImportError:
+# Optional SendGrid - imported on the first notification rather than at boot
+SENDGRID_AVAILABLE = importlib.util.find_spec('sendgrid') is not None
+if not SENDGRID_AVAILABLE:
     logger.warning("SendGrid module not installed. Email notifications will be disabled.")
-    SENDGRID_AVAILABLE = False
 
 
 def send_contact_notification(app, name, email, subject, message):
@@ -38,6 +35,9 @@ def send_contact_notification(app, name, email, subject, message):
         return False
 
     try:
+        from sendgrid import SendGridAPIClient
+        from sendgrid.helpers.mail import Mail, Email as SGEmail, To, Content
+
         email_body = _build_notification_email(name, email, subject, message)
 
         mail = Mail(
@@ -47,7 +47,7 @@ def send_contact_notification(app, name, email, subject, message):
             html_content=Content('text/html', email_body)
         )
 
-        sg = SendGridAPIClient(app.config['SENDGRID_API_KEY'])
+        sg = SendGridAPIClient(app.config['SENDGRID_API_KEY'], host=app.config['SENDGRID_API_HOST'])
         response = sg.send(mail)
 
         logger.info(f"Contact notification email sent successfully. Status code: {response.status_code}")
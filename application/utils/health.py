@@ -0,0 +1,202 @@
+"""
+Dependency health probes, refreshed in the background
+
+A HealthMonitor thread in each worker process probes the database, the
+OpenAI circuit breaker, SendGrid and free disk space every
+HEALTH_CHECK_INTERVAL seconds and keeps the latest result of each. The health
+endpoints only read those results, so a load balancer polling them never
+triggers database queries or outbound connections.
+"""
+import logging
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+ProbeResult = namedtuple('ProbeResult', ['ok', 'latency_ms', 'checked_at', 'detail'])
+
+
+class ProbeFailed(Exception):
+    """Raised by a probe whose dependency is unhealthy; the message is reported"""
+
+
+class HealthMonitor:
+    """
+    Background-refreshed dependency probes for one app
+
+    Probes are callables taking the app and returning a detail dict (or
+    raising). Critical probes decide readiness; the others are reported
+    only. A result older than `stale_after` counts as failing.
+    """
+
+    def __init__(self, app=None):
+        self._probes = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the standard probes and start the thread with the first request"""
+        self.app = app
+        self.interval = app.config['HEALTH_CHECK_INTERVAL']
+        self.stale_after = 3 * self.interval if self.interval else None
+
+        self.add_probe('database', probe_database, critical=True)
+        self.add_probe('disk', probe_disk, critical=True)
+        self.add_probe('openai', probe_openai)
+        self.add_probe('sendgrid', probe_sendgrid)
+
+        app.before_request(self.ensure_running)
+        app.extensions['health_monitor'] = self
+
+    def add_probe(self, name, probe, critical=False):
+        self._probes[name] = (probe, critical)
+
+    def ensure_running(self):
+        """Start the probe thread in this process (again, after a fork)"""
+        if not self.interval or (self._pid == os.getpid() and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name='health-monitor', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, stop):
+        while not stop.is_set():
+            self.refresh()
+            stop.wait(self.interval)
+
+    def refresh(self):
+        """Run every probe once and store the results"""
+        for name, (probe, _) in self._probes.items():
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    detail = probe(self.app) or {}
+                ok = True
+            except Exception as e:
+                detail = {'error': str(e) or type(e).__name__}
+                ok = False
+                if not isinstance(e, ProbeFailed):
+                    logger.warning(f"Health probe {name} failed: {detail['error']}")
+            # Replaced whole, so readers never see a half-written dict
+            self._results = {**self._results,
+                             name: ProbeResult(ok, (time.perf_counter() - started) * 1000, time.time(), detail)}
+
+    def results(self):
+        """
+        Latest result of every probe, with its age
+
+        Probes that have not run yet in this process are run inline first
+        (a worker's first health request, or HEALTH_CHECK_INTERVAL = 0).
+        """
+        if len(self._results) < len(self._probes):
+            with self._lock:
+                if len(self._results) < len(self._probes):
+                    self.refresh()
+
+        now = time.time()
+        checks = {}
+        for name, result in self._results.items():
+            age = now - result.checked_at
+            stale = self.stale_after is not None and age > self.stale_after
+            checks[name] = {
+                'ok': result.ok and not stale,
+                'critical': self._probes[name][1],
+                'latency_ms': round(result.latency_ms, 2),
+                'age_s': round(age, 1),
+                'stale': stale,
+                **result.detail,
+            }
+        return checks
+
+    def readiness(self):
+        """
+        Returns:
+            tuple: (ready, checks) - ready when every critical check is ok
+        """
+        checks = self.results()
+        return all(check['ok'] for check in checks.values() if check['critical']), checks
+
+    def liveness(self):
+        """Whether this process can answer at all, plus the probe thread's state"""
+        running = self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+        last = max((result.checked_at for result in self._results.values()), default=None)
+        return {
+            'monitor_running': running,
+            'last_probe_age_s': round(time.time() - last, 1) if last else None,
+        }
+
+
+def probe_database(app):
+    """A query on the read connection, plus table names, message count and pending migrations"""
+    from application.config.database import READ_BIND
+    from application.database import pending_migrations
+    from application.extensions import db
+    from application.models import MIGRATIONS
+
+    engine = db.engines.get(READ_BIND, db.engine)
+    with engine.connect() as connection:
+        tables = inspect(connection).get_table_names()
+        message_count = (connection.execute(text('SELECT count(*) FROM contact_message')).scalar()
+                         if 'contact_message' in tables else None)
+    pending = pending_migrations(engine, MIGRATIONS)
+    if pending:
+        raise ProbeFailed(f"{len(pending)} migrations pending")
+    return {'tables': tables, 'contact_message_count': message_count}
+
+
+def probe_disk(app):
+    """Free space where the database lives (SQLite needs room for its journal)"""
+    from application.extensions import db
+
+    path = db.engine.url.database if db.engine.url.get_backend_name() == 'sqlite' else None
+    directory = os.path.dirname(path) if path and path != ':memory:' else app.instance_path
+    usage = shutil.disk_usage(directory if os.path.isdir(directory) else app.root_path)
+    free_mb = usage.free // (1024 * 1024)
+    detail = {'free_mb': free_mb, 'used_percent': round(100 * usage.used / usage.total, 1)}
+    if free_mb < app.config['HEALTH_MIN_FREE_DISK_MB']:
+        raise ProbeFailed(f"{free_mb}MB free, below {app.config['HEALTH_MIN_FREE_DISK_MB']}MB")
+    return detail
+
+
+def probe_openai(app):
+    """Circuit breaker state of the career agent (no request is made)"""
+    agent_module = sys.modules.get('career_agent')
+    agent = agent_module.career_agent if agent_module else None
+    if agent is None or not agent.api_key:
+        return {'configured': False}
+    breaker = agent.breaker.to_dict()
+    if breaker['state'] == 'open':
+        raise ProbeFailed(f"circuit open after {breaker['consecutive_failures']} failures")
+    return {'configured': True, **breaker}
+
+
+def probe_sendgrid(app):
+    """TCP reachability of the SendGrid API, when notifications are configured"""
+    if not app.config.get('SENDGRID_API_KEY'):
+        return {'configured': False}
+    url = urlsplit(app.config['SENDGRID_API_HOST'])
+    address = (url.hostname, url.port or (443 if url.scheme == 'https' else 80))
+    with socket.create_connection(address, timeout=app.config['HEALTH_PROBE_TIMEOUT']):
+        pass
+    return {'configured': True}
@@ -0,0 +1,64 @@
+"""
+HTTP request and caching utility functions
+"""
+import hashlib
+
+from flask import request
+from werkzeug.http import is_resource_modified
+
+
+def is_spa_request():
+    """
+    Check if the request is from the SPA router (AJAX request)
+    Returns True if this is an SPA/AJAX request, False otherwise
+    """
+    return (
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest' or
+        request.headers.get('X-SPA-Request') == 'true'
+    )
+
+
+def body_etag(body):
+    """
+    Strong ETag value for a response body
+
+    BLAKE2b with a 128-bit digest: far cheaper than rendering, and meant to be
+    computed once per cached body rather than per request.
+
+    Args:
+        body: Encoded response body
+
+    Returns:
+        str: Hex digest (unquoted)
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def collection_etag(*state):
+    """
+    ETag value for a list derived from a summary of its rows
+
+    Args:
+        *state: Values that change whenever the list does, e.g. row count and newest timestamp
+
+    Returns:
+        str: Hex digest (unquoted)
+    """
+    return hashlib.blake2b(repr(state).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def is_not_modified(request, etag=None, last_modified=None):
+    """
+    Check If-None-Match / If-Modified-Since against the current validators
+
+    Args:
+        request: The current request
+        etag: Current ETag value, if any
+        last_modified: Current Last-Modified datetime, if any
+
+    Returns:
+        bool: True if the client's copy is current and a 304 should be sent
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
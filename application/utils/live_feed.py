@@ -0,0 +1,59 @@
+"""
+In-process fan-out of new admin feed items
+
+Handlers publish a summary of each row right after they commit it, and every
+open admin stream in the same worker wakes up to send it. Streams wait on a
+condition variable, so an idle dashboard uses no CPU and runs no queries
+between keepalives.
+
+Each worker process has its own broadcaster. A row committed by another
+worker reaches a stream through the stream's periodic catch-up query (see
+the admin feed views).
+"""
+import threading
+from collections import deque
+
+
+class Broadcaster:
+    """
+    The most recent events in a bounded ring, with a condition to wait on
+
+    Every event gets a sequence number. A subscriber remembers the last one
+    it has seen and asks for anything newer. If it fell so far behind that the
+    ring dropped events it hadn't seen, `wait` says so, and the subscriber
+    catches up from the database instead.
+    """
+
+    def __init__(self, size=256):
+        self._events = deque(maxlen=size)
+        self._sequence = 0
+        self._condition = threading.Condition()
+
+    @property
+    def sequence(self):
+        """Sequence number of the latest event; subscribe by waiting after it"""
+        with self._condition:
+            return self._sequence
+
+    def publish(self, kind, item):
+        with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, kind, item))
+            self._condition.notify_all()
+
+    def wait(self, after, timeout):
+        """
+        Events published after sequence `after`, waiting up to `timeout` seconds for one
+
+        Returns:
+            tuple: ([(sequence, kind, item), ...] oldest first, True if some were dropped unseen)
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > after, timeout)
+            events = [event for event in self._events if event[0] > after]
+            missed = self._sequence - after > len(events)
+        return events, missed
+
+
+# Per worker process
+feed_broadcaster = Broadcaster()
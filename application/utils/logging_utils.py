@@ -0,0 +1,259 @@
+"""
+Non-blocking logging pipeline
+
+The root logger gets a single QueueHandler. On the calling (request) thread
+a record is only stamped with the request id, checked against the per-logger
+rate limits and sampling, and put on a queue. A QueueListener thread does
+the formatting (JSON or text) and the writing.
+
+Configured from LOG_FORMAT, LOG_LEVEL, LOG_RATE_LIMITS and LOG_SAMPLING.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Accept a caller's request id only if it looks like one
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def current_request_id():
+    """The id of the request being handled, or None outside a request"""
+    if has_request_context():
+        return g.get('request_id')
+    return None
+
+
+def assign_request_id():
+    """before_request: reuse the caller's X-Request-ID (e.g. from the proxy) or make one"""
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+
+
+def send_request_id(response):
+    """after_request: echo the id so clients can quote it"""
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _RateLimit:
+    """Token bucket: `rate` records per second, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+    def allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drops records from high-volume loggers before they are queued
+
+    Rules apply to a logger and its children (the most specific name wins).
+
+    Args:
+        rate_limits: Logger name to records per second (bursts of twice that);
+            applies at every level. The next record let through carries a
+            `suppressed` count of what was dropped.
+        sampling: Logger name to the fraction of records below WARNING to
+            keep. Decided per request id, so a sampled request keeps all of
+            its lines.
+    """
+
+    def __init__(self, rate_limits=None, sampling=None):
+        super().__init__()
+        self.sampling = dict(sampling or {})
+        self._limits = {name: _RateLimit(rate, 2 * rate) for name, rate in (rate_limits or {}).items()}
+        self._rules = {}
+        self._lock = threading.Lock()
+
+    def _rules_for(self, name):
+        rules = self._rules.get(name)
+        if rules is None:
+            rules = (_most_specific(name, self._limits), _most_specific(name, self.sampling))
+            self._rules[name] = rules
+        return rules
+
+    def filter(self, record):
+        limit_name, sample_name = self._rules_for(record.name)
+
+        if sample_name is not None and record.levelno < logging.WARNING:
+            fraction = self.sampling[sample_name]
+            key = getattr(record, 'request_id', None) or f'{record.created}'
+            if zlib.crc32(key.encode()) % 10000 >= fraction * 10000:
+                return False
+
+        if limit_name is not None:
+            limit = self._limits[limit_name]
+            with self._lock:
+                if not limit.allow():
+                    return False
+                if limit.suppressed:
+                    record.suppressed = limit.suppressed
+                    limit.suppressed = 0
+        return True
+
+
+def _most_specific(name, rules):
+    while name:
+        if name in rules:
+            return name
+        name = name.rpartition('.')[0]
+    return None
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread
+
+    Only the request id is added and the message interpolated here (arguments
+    may be mutated after the call returns); exception tracebacks are rendered
+    by the listener.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def handle(self, record):
+        # Stamped before filtering, so sampling can key on it
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id()
+        return super().handle(record)
+
+
+class _StderrHandler(logging.StreamHandler):
+    # Looks sys.stderr up on every write, so it follows redirection (e.g. test capture)
+    def __init__(self):
+        super().__init__()
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class LogPipeline:
+    """The queue, its handler on the root logger and the listener thread writing to `stream`"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.handler = None
+        self.listener = None
+        # Process the listener thread runs in
+        self._pid = None
+
+    def configure(self, level='INFO', fmt='json', rate_limits=None, sampling=None):
+        """Install (or replace) the pipeline on the root logger"""
+        self.stop()
+        output = logging.StreamHandler(self.stream) if self.stream else _StderrHandler()
+        output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        self.handler = RequestQueueHandler(queue.SimpleQueue())
+        self.handler.addFilter(SamplingFilter(rate_limits, sampling))
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(level)
+
+        self.listener = logging.handlers.QueueListener(self.handler.queue, output, respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def stop(self):
+        """Write out everything queued so far and remove the handler"""
+        if self.listener is not None:
+            self.listener.stop()
+            logging.getLogger().removeHandler(self.handler)
+            self.listener = self.handler = None
+
+    def after_fork(self):
+        """
+        Give a forked child its own queue and listener
+
+        The parent's listener thread doesn't exist in the child, and its queue
+        may have been mid-operation at the fork. Runs once per process: a
+        second call (gunicorn's post_fork after the fork hook) does nothing.
+        """
+        if self.listener is None or self._pid == os.getpid():
+            return
+        for log_filter in self.handler.filters:
+            log_filter._lock = threading.Lock()
+        self.handler.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *self.listener.handlers,
+                                                       respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+
+
+log_pipeline = LogPipeline()
+# Flush the queue on exit (runs before logging's own shutdown)
+atexit.register(log_pipeline.stop)
+
+
+def configure_logging(app):
+    """Install the logging pipeline from the app config and correlate records with requests"""
+    log_pipeline.configure(
+        level=app.config['LOG_LEVEL'],
+        fmt=app.config['LOG_FORMAT'],
+        rate_limits=app.config['LOG_RATE_LIMITS'],
+        sampling=app.config['LOG_SAMPLING'],
+    )
+    app.before_request(assign_request_id)
+    app.after_request(send_request_id)
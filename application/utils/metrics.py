@@ -0,0 +1,268 @@
+"""
+Per-endpoint request latency and sampled profiles
+
+RequestMetrics times every request from before_request until its response
+is closed (so a streamed chat answer counts in full) and records it in a
+per-endpoint LatencyHistogram next to a count of status codes.
+
+With PROFILE_SAMPLE_RATE above zero, that fraction of requests also runs
+under cProfile; the slowest PROFILE_KEEP of them are kept and served,
+with the histograms, from the admin performance endpoints.
+"""
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+from application.utils.logging_utils import current_request_id
+
+# 2^5 sub-buckets per power of two: values are kept to within about 3%
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def bucket_index(value):
+    """Bucket of a non-negative integer: exact below SUB_BUCKETS, then log-linear"""
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_bounds(index):
+    """(lowest, highest) value that falls in bucket `index`"""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = index // SUB_BUCKETS - 1
+    lowest = (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of durations in microseconds
+
+    Bucket widths grow with the value (log-linear), so memory stays small
+    over any range while percentiles keep a fixed relative precision.
+    Buckets are a sparse index-to-count dict: merging histograms from
+    several workers is adding their counts (see `merge` and `from_dict`).
+    Not locked; RequestMetrics serialises access.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds):
+        value = int(seconds * 1_000_000)
+        index = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the `fraction` quantile, in microseconds"""
+        if not self.count:
+            return 0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self):
+        """Count, mean, percentiles and max in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count / 1000, 3) if self.count else 0,
+            **{f'p{round(q * 100)}_ms': round(self.percentile(q) / 1000, 3) for q in (0.5, 0.9, 0.99)},
+            'max_ms': round(self.max / 1000, 3),
+        }
+
+    def to_dict(self):
+        return {'buckets': {str(index): count for index, count in self.buckets.items()},
+                'count': self.count, 'total_us': self.total, 'max_us': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data['buckets'].items()}
+        histogram.count = data['count']
+        histogram.total = data['total_us']
+        histogram.max = data['max_us']
+        return histogram
+
+
+class ProfileBuffer:
+    """
+    The `size` slowest profiled requests
+
+    A min-heap on duration: a new profile is kept only if it is slower than
+    the fastest one held, which it then replaces.
+    """
+
+    def __init__(self, size=20):
+        self.size = size
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def would_keep(self, seconds):
+        return self.size > 0 and (len(self._heap) < self.size or seconds > self._heap[0][0])
+
+    def add(self, seconds, profile, info):
+        with self._lock:
+            if not self.would_keep(seconds):
+                return
+            entry = (seconds, next(self._ids), profile, info)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heapreplace(self._heap, entry)
+
+    def entries(self):
+        """Kept profiles, slowest first, as summaries"""
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [{'id': profile_id, 'duration_ms': round(seconds * 1000, 2), **info}
+                for seconds, profile_id, _, info in entries]
+
+    def report(self, profile_id, sort='cumulative', limit=40):
+        """pstats text of one kept profile, or None if it has been evicted"""
+        with self._lock:
+            profile = next((entry[2] for entry in self._heap if entry[1] == profile_id), None)
+        if profile is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+class RequestMetrics:
+    """
+    Request timing and sampled profiling for one app
+
+    Histograms and status counts are per worker process and reset when it
+    restarts; the admin endpoint serves the raw buckets too, so snapshots
+    from several workers can be merged.
+    """
+
+    def __init__(self, app=None):
+        self.histograms = {}
+        self.statuses = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        # cProfile can only profile one request at a time per process
+        self._profiling = threading.Lock()
+        self.profiles = ProfileBuffer()
+        self.sample_rate = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+        self.profiles.size = app.config['PROFILE_KEEP']
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.teardown_request(self.abandon_profile)
+        app.extensions['request_metrics'] = self
+
+    def start_request(self):
+        g.metrics_started = time.perf_counter()
+        if self.sample_rate and random.random() < self.sample_rate and self._profiling.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (a debugger, coverage) is active
+                self._profiling.release()
+                return
+            g.metrics_profile = profile
+
+    def finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        profile = g.pop('metrics_profile', None)
+        info = {
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'request_id': current_request_id(),
+            'at': time.time(),
+        } if profile else None
+
+        # On close, so a streamed body is included in the time
+        def record():
+            elapsed = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+                self._profiling.release()
+                self.profiles.add(elapsed, profile, info)
+            self.record(endpoint, response.status_code, elapsed)
+
+        response.call_on_close(record)
+        return response
+
+    def abandon_profile(self, exc=None):
+        """teardown_request: stop a profile whose request never reached finish_request"""
+        profile = g.pop('metrics_profile', None)
+        if profile is not None:
+            profile.disable()
+            self._profiling.release()
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            histogram = self.histograms.get(endpoint)
+            if histogram is None:
+                histogram = self.histograms[endpoint] = LatencyHistogram()
+                self.statuses[endpoint] = Counter()
+            histogram.record(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def snapshot(self, buckets=False):
+        """Per-endpoint latency summary and status counts, slowest p99 first"""
+        with self._lock:
+            routes = {
+                endpoint: {
+                    **histogram.summary(),
+                    'statuses': {str(status): count for status, count in sorted(self.statuses[endpoint].items())},
+                    **({'histogram': histogram.to_dict()} if buckets else {}),
+                }
+                for endpoint, histogram in self.histograms.items()
+            }
+        return dict(sorted(routes.items(), key=lambda item: item[1]['p99_ms'], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.statuses = {}
+            self.started_at = time.time()
+        self.profiles.clear()
@@ -0,0 +1,122 @@
+"""
+Rendered page cache for routes whose output only depends on their templates
+"""
+import logging
+import os
+from collections import namedtuple
+from functools import wraps
+
+from flask import current_app, request, session
+
+from .compression import prepare_stored_response
+from .http_utils import body_etag
+
+logger = logging.getLogger(__name__)
+
+# Encoded response body plus what's needed to rebuild the response; `compressed`
+# holds the body per Content-Encoding, filled as clients ask for each one
+CachedPage = namedtuple('CachedPage', ['body', 'content_type', 'etag', 'template_mtime', 'compressed'])
+
+
+class RenderCache:
+    """
+    In-memory cache of rendered page bodies
+
+    Pages are keyed by endpoint and request variant (SPA fragment or full
+    page) and served as pre-encoded bytes with a strong ETag computed when the
+    page is stored, so If-None-Match gets a 304. With `compress`, each page
+    is also kept compressed per encoding, so a hit doesn't compress it again.
+    Requests with pending flash messages bypass the cache, since the flashes
+    are part of the page. With auto_reload (development) an entry is dropped
+    when any template changes; in production entries live for the life of
+    the process.
+    """
+
+    def __init__(self, variant=None, auto_reload=False, compress=False):
+        """
+        Args:
+            variant: Callable returning the request variant part of the key
+            auto_reload: Re-render pages after template edits
+            compress: Serve pages brotli- or gzip-encoded as the client accepts
+        """
+        self.variant = variant or (lambda: None)
+        self.auto_reload = auto_reload
+        self.compress = compress
+        self._pages = {}
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def init_app(self, app):
+        """Re-render after template edits in debug mode; compress as COMPRESS_RESPONSES says"""
+        self.auto_reload = app.debug
+        self.compress = app.config['COMPRESS_RESPONSES']
+
+    def cached(self, view):
+        """Decorator for views whose output only depends on the template"""
+        @wraps(view)
+        def decorated_function(*args, **kwargs):
+            if self._has_flashes():
+                self.bypasses += 1
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, self.variant())
+            page = self._pages.get(key)
+            template_mtime = self._template_mtime() if self.auto_reload else None
+            if page is not None and page.template_mtime == template_mtime:
+                self.hits += 1
+                response = current_app.response_class(page.body, content_type=page.content_type)
+                return self._conditional(response, page)
+
+            self.misses += 1
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                body = response.get_data()
+                page = CachedPage(body, response.content_type, body_etag(body), template_mtime, {})
+                self._pages[key] = page
+                self._conditional(response, page)
+            return response
+
+        return decorated_function
+
+    def _conditional(self, response, page):
+        response.set_etag(page.etag)
+        if self.compress:
+            # Before the conditional check, so a 304 has the encoded 200's ETag and Vary
+            prepare_stored_response(request, response, page.compressed)
+        return response.make_conditional(request)
+
+    def clear(self):
+        """Drop every cached page, e.g. after rebuilding assets the pages refer to"""
+        self._pages.clear()
+
+    def stats(self):
+        """Hit/miss counters and hit rate since the process started"""
+        lookups = self.hits + self.misses
+        return {
+            'pages': len(self._pages),
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def _has_flashes(self):
+        # Only look at the session when there is a cookie, so cacheable
+        # requests don't load it (and don't get Vary: Cookie)
+        if current_app.config['SESSION_COOKIE_NAME'] not in request.cookies:
+            return False
+        return bool(session.get('_flashes'))
+
+    def _template_mtime(self):
+        latest = 0
+        for loader_path in _template_paths():
+            for root, _, files in os.walk(loader_path):
+                for name in files:
+                    latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+        return latest
+
+
+def _template_paths():
+    loader = current_app.jinja_loader
+    return getattr(loader, 'searchpath', [])
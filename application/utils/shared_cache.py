@@ -0,0 +1,245 @@
+"""
+Key-value cache shared by every worker process on the host
+
+Backed by one SQLite file in WAL mode, so readers in any worker never wait
+for a writer. Values are pickled. Entries carry an optional expiry and a
+last-used time; when a write takes the file past its size or entry cap,
+expired entries go first and then the least recently used.
+
+A cache failure (a locked or unwritable file) is logged and treated as a
+miss, never raised into the request.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at) WHERE expires_at IS NOT NULL;
+
+-- Running totals, so checking the caps doesn't scan the table
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL,
+    entries INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET bytes = bytes + NEW.size, entries = entries + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET bytes = bytes + NEW.size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET bytes = bytes - OLD.size, entries = entries - 1;
+END;
+"""
+
+_UPSERT = """
+INSERT INTO entries (key, value, size, expires_at, used_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value, size = excluded.size, expires_at = excluded.expires_at, used_at = excluded.used_at
+"""
+
+_MISSING = object()
+
+
+class SharedCache:
+    """
+    get/set/delete/incr with TTLs over a SQLite file shared across processes
+
+    Each thread of each process opens its own connection on first use (and
+    again after a fork). A hit refreshes the entry's last-used time at most
+    once per `touch_interval` seconds, so reads rarely write.
+
+    Args:
+        path: SQLite file; set here or by init_app
+        max_bytes: Cap on the total size of pickled values
+        max_entries: Cap on the number of entries
+        default_ttl: Seconds an entry lives when set() gets no ttl (None: no expiry)
+    """
+
+    def __init__(self, path=None, max_bytes=64 * 1024 * 1024, max_entries=10000, default_ttl=300,
+                 touch_interval=10, busy_timeout=5, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.touch_interval = touch_interval
+        self.busy_timeout = busy_timeout
+        self._clock = clock
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configure from SHARED_CACHE_*; the file is opened on first use, not here"""
+        self.path = app.config['SHARED_CACHE_PATH'] or os.path.join(app.instance_path, 'shared_cache.sqlite3')
+        self.max_bytes = app.config['SHARED_CACHE_MAX_MB'] * 1024 * 1024
+        self.max_entries = app.config['SHARED_CACHE_MAX_ENTRIES']
+        app.extensions['shared_cache'] = self
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        connection.execute('PRAGMA journal_mode = WAL')
+        # A cache can lose its last writes in a power cut
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.executescript(f'BEGIN IMMEDIATE; {_SCHEMA} COMMIT;')
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def get(self, key, default=None):
+        """The value stored under `key`, or `default` if it is missing or expired"""
+        try:
+            connection = self._connection()
+            row = connection.execute('SELECT value, expires_at, used_at FROM entries WHERE key = ?',
+                                     (key,)).fetchone()
+            now = self._clock()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return default
+            if now - row[2] > self.touch_interval:
+                self._touch(connection, key, now)
+            value = pickle.loads(row[0])
+        except (sqlite3.Error, OSError, pickle.UnpicklingError) as e:
+            logger.warning(f"Shared cache read of {key!r} failed: {e}")
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def _touch(self, connection, key, now):
+        # Only eviction order depends on it, so a failure (e.g. another worker
+        # holding the write lock) is logged and the value still returned
+        try:
+            connection.execute('UPDATE entries SET used_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache touch of {key!r} failed: {e}")
+
+    def set(self, key, value, ttl=None):
+        """
+        Store `value` under `key` for `ttl` seconds (default_ttl if None)
+
+        Returns:
+            bool: False if the value wasn't stored (larger than max_bytes, or a cache error)
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return False
+        try:
+            with self._transaction() as connection:
+                now = self._clock()
+                connection.execute(_UPSERT, (key, blob, len(blob), self._expiry(ttl, now), now))
+                self._evict(connection, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache write of {key!r} failed: {e}")
+            return False
+        return True
+
+    def incr(self, key, delta=1, ttl=None):
+        """
+        Atomically add `delta` to a counter, e.g. requests in a rate-limit window
+
+        A missing or expired counter starts from zero with a new `ttl`; an
+        existing one keeps its expiry. Returns the new value, or None on a
+        cache error.
+        """
+        try:
+            with self._transaction() as connection:
+                now = self._clock()
+                row = connection.execute('SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is None or (row[1] is not None and row[1] <= now):
+                    value, expires_at = delta, self._expiry(ttl, now)
+                else:
+                    value, expires_at = pickle.loads(row[0]) + delta, row[1]
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                connection.execute(_UPSERT, (key, blob, len(blob), expires_at, now))
+                self._evict(connection, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache increment of {key!r} failed: {e}")
+            return None
+        return value
+
+    def get_or_set(self, key, compute, ttl=None):
+        """The cached value, or compute() stored for next time (two workers may both compute it)"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key):
+        try:
+            with self._transaction() as connection:
+                connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache delete of {key!r} failed: {e}")
+
+    def clear(self):
+        """Drop every entry, for every process"""
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM entries')
+
+    def stats(self):
+        """Entries and bytes in the file, and this process's hits and misses"""
+        entries, size = self._connection().execute('SELECT entries, bytes FROM totals').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def _expiry(self, ttl, now):
+        ttl = self.default_ttl if ttl is None else ttl
+        return now + ttl if ttl is not None else None
+
+    def _evict(self, connection, now):
+        """Within a write: expired entries, then least recently used, until under both caps"""
+        entries, size = connection.execute('SELECT entries, bytes FROM totals').fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        while True:
+            entries, size = connection.execute('SELECT entries, bytes FROM totals').fetchone()
+            if entries <= self.max_entries and size <= self.max_bytes:
+                return
+            # Batches of about 5%, so a full cache isn't trimmed one row per write
+            batch = max(1, entries - self.max_entries, entries // 20)
+            connection.execute('DELETE FROM entries WHERE key IN '
+                               '(SELECT key FROM entries ORDER BY used_at LIMIT ?)', (batch,))
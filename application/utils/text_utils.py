@@ -0,0 +1,25 @@
+"""
+Text utility functions
+"""
+
+PREVIEW_LENGTH = 200
+
+
+def make_preview(text, length=PREVIEW_LENGTH):
+    """
+    Build a short single-line preview of a message body
+
+    Args:
+        text: Full message body (may be None)
+        length: Maximum preview length including the ellipsis
+
+    Returns:
+        str: Preview text, or None if there is no body
+    """
+    if not text:
+        return None
+
+    preview = ' '.join(text.split())
+    if len(preview) > length:
+        preview = preview[:length - 3].rstrip() + '...'
+    return preview
@@ -0,0 +1,62 @@
+"""
+Inbound webhook utility functions
+"""
+import hashlib
+from email.parser import HeaderParser
+
+
+# Stored in place of fields missing from a webhook payload
+INBOUND_EMAIL_DEFAULTS = {'from': 'Unknown', 'to': 'Unknown', 'subject': 'No Subject', 'text': '', 'html': ''}
+
+
+def normalize_inbound_email(email_data):
+    """
+    The addressing fields and bodies of a webhook payload, as they are stored
+
+    Missing fields get the defaults the webhook stores, so a key computed
+    from the payload and one computed later from the stored row agree.
+    """
+    return {field: email_data.get(field) or default for field, default in INBOUND_EMAIL_DEFAULTS.items()}
+
+
+def inbound_email_dedup_key(email_data):
+    """
+    Build a stable deduplication key for a SendGrid Inbound Parse payload
+
+    SendGrid retries deliveries it considers failed, so the same email can
+    arrive several times. The Message-ID header identifies it when present;
+    otherwise the key is a hash of the addressing fields and bodies (see
+    inbound_email_content_key).
+
+    Args:
+        email_data: Dict of the posted webhook form fields
+
+    Returns:
+        str: 64-character hex digest
+    """
+    message_id = _message_id(email_data.get('headers', ''))
+    if not message_id:
+        return inbound_email_content_key(email_data)
+    return hashlib.sha256(f"message-id\0{message_id}".encode('utf-8')).hexdigest()
+
+
+def inbound_email_content_key(email_data):
+    """
+    Dedup key from the addressing fields and bodies alone
+
+    This is the only key a stored row can be given, because headers aren't
+    stored. Rows received before dedup keys existed were backfilled with it,
+    even when the original delivery had a Message-ID, so for those rows the
+    webhook also looks for this key when a delivery has a Message-ID.
+    """
+    fields = normalize_inbound_email(email_data)
+    source = '\0'.join(['content', fields['from'], fields['to'], fields['subject'], fields['text'], fields['html']])
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def _message_id(raw_headers):
+    """Extract the Message-ID from a raw header block"""
+    if not raw_headers:
+        return None
+    message_id = HeaderParser().parsestr(raw_headers).get('Message-ID')
+    return message_id.strip() if message_id else None
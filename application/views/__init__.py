@@ -0,0 +1,12 @@
+"""
+Route blueprints
+"""
+from .pages import bp as pages_bp
+from .admin import bp as admin_bp
+from .webhooks import bp as webhooks_bp
+from .api import bp as api_bp
+from .debug import bp as debug_bp
+
+BLUEPRINTS = (pages_bp, admin_bp, webhooks_bp, api_bp, debug_bp)
+
+__all__ = ['BLUEPRINTS', 'pages_bp', 'admin_bp', 'webhooks_bp', 'api_bp', 'debug_bp']
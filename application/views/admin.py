@@ -0,0 +1,375 @@
+"""
+Admin dashboard, message lists, live feed, search and performance metrics
+"""
+import heapq
+import json
+import os
+import time
+from datetime import datetime
+
+from flask import (Blueprint, Response, current_app, jsonify, render_template, request, session, stream_with_context,
+                   url_for)
+from sqlalchemy.orm import load_only
+
+from application.database import keyset_page
+from application.extensions import db
+from application.models import SEARCH_INDEXES, ContactMessage, InboundEmail
+from application.utils.auth_utils import requires_auth
+from application.utils.http_utils import collection_etag, is_not_modified
+from application.utils.live_feed import feed_broadcaster
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+ADMIN_PAGE_SIZE = 25
+SEARCH_PAGE_SIZE = 20
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'calls')
+FEED_LIMIT = 100
+FEED_RETRY_MS = 3000
+
+
+def inbound_email_list_statement():
+    """Dashboard list query - bodies stay on disk, only previews are loaded"""
+    return db.select(InboundEmail).options(load_only(
+        InboundEmail.from_email, InboundEmail.to_email, InboundEmail.subject,
+        InboundEmail.preview, InboundEmail.received_at
+    ))
+
+
+def contact_message_list_statement():
+    """Dashboard list query - bodies stay on disk, only previews are loaded"""
+    return db.select(ContactMessage).options(load_only(
+        ContactMessage.name, ContactMessage.email, ContactMessage.subject,
+        ContactMessage.preview, ContactMessage.created_at
+    ))
+
+
+@bp.route('/dashboard')
+def dashboard():
+    """Admin dashboard to view received emails and contact messages"""
+    # For a signed-in admin the newest pages follow the live feed, from a
+    # cursor read before the lists so a row committed in between is pushed
+    # rather than missed
+    feed_url = None
+    if session.get('authenticated') and not (request.args.get('emails_cursor') or request.args.get('messages_cursor')):
+        feed_url = url_for('admin.feed_stream', since=encode_feed_cursor(current_feed_position()))
+
+    # One page of each list, most recent first
+    inbound_page = keyset_page(
+        db.session, inbound_email_list_statement(),
+        InboundEmail.received_at, InboundEmail.id,
+        cursor=request.args.get('emails_cursor'), per_page=ADMIN_PAGE_SIZE
+    )
+
+    contact_page = keyset_page(
+        db.session, contact_message_list_statement(),
+        ContactMessage.created_at, ContactMessage.id,
+        cursor=request.args.get('messages_cursor'), per_page=ADMIN_PAGE_SIZE
+    )
+
+    return render_template('admin_dashboard.html',
+                           inbound_emails=inbound_page.items,
+                           inbound_emails_next=inbound_page.next_cursor,
+                           inbound_email_count=db.session.query(db.func.count(InboundEmail.id)).scalar(),
+                           contact_messages=contact_page.items,
+                           contact_messages_next=contact_page.next_cursor,
+                           contact_message_count=db.session.query(db.func.count(ContactMessage.id)).scalar(),
+                           feed_url=feed_url)
+
+
+def admin_list_response(statement, time_column, id_column, serialize):
+    """
+    One page of an admin list as JSON, with validators from the newest row
+
+    Last-Modified is the newest row's timestamp; the ETag also covers the row
+    count so deletions invalidate it. Both are checked before any rows are
+    loaded, so an unchanged list costs one aggregate query.
+    """
+    newest, count = db.session.execute(db.select(db.func.max(time_column), db.func.count(id_column))).one()
+    etag = collection_etag(count, newest.isoformat() if newest else None)
+    if is_not_modified(request, etag=etag, last_modified=newest):
+        response = current_app.response_class(status=304)
+    else:
+        page = keyset_page(db.session, statement, time_column, id_column,
+                           cursor=request.args.get('cursor'), per_page=ADMIN_PAGE_SIZE)
+        response = jsonify({
+            'count': count,
+            'items': [serialize(item) for item in page.items],
+            'next_cursor': page.next_cursor
+        })
+    response.set_etag(etag)
+    if newest:
+        response.last_modified = newest
+    return response
+
+
+def email_summary(email):
+    """List and feed entry for an inbound email"""
+    return {
+        'id': email.id,
+        'from': email.from_email,
+        'to': email.to_email,
+        'subject': email.subject,
+        'preview': email.preview,
+        'received_at': email.received_at.isoformat() if email.received_at else None,
+        'url': url_for('admin.email_detail', email_id=email.id)
+    }
+
+
+def message_summary(message):
+    """List and feed entry for a contact message"""
+    return {
+        'id': message.id,
+        'name': message.name,
+        'email': message.email,
+        'subject': message.subject,
+        'preview': message.preview,
+        'created_at': message.created_at.isoformat() if message.created_at else None,
+        'url': url_for('admin.message_detail', message_id=message.id)
+    }
+
+
+@bp.route('/api/emails')
+@requires_auth
+def email_list_json():
+    """Inbound email list as JSON, most recent first"""
+    return admin_list_response(inbound_email_list_statement(), InboundEmail.received_at, InboundEmail.id,
+                               email_summary)
+
+
+@bp.route('/api/messages')
+@requires_auth
+def message_list_json():
+    """Contact message list as JSON, most recent first"""
+    return admin_list_response(contact_message_list_statement(), ContactMessage.created_at, ContactMessage.id,
+                               message_summary)
+
+
+# Feed kind -> (list statement, id column, time column, summary)
+FEED_KINDS = {
+    'email': (inbound_email_list_statement, InboundEmail.id, InboundEmail.received_at, email_summary),
+    'message': (contact_message_list_statement, ContactMessage.id, ContactMessage.created_at, message_summary),
+}
+
+
+def encode_feed_cursor(position):
+    """'<email id>-<message id>': the newest row of each kind already seen"""
+    return f"{position['email']}-{position['message']}"
+
+
+def decode_feed_cursor(cursor):
+    """Position from encode_feed_cursor, or None if the cursor is missing or malformed"""
+    try:
+        email_id, message_id = (int(part) for part in (cursor or '').split('-'))
+    except ValueError:
+        return None
+    if email_id < 0 or message_id < 0:
+        return None
+    return {'email': email_id, 'message': message_id}
+
+
+def current_feed_position():
+    """Position after the newest row of each kind"""
+    return {kind: db.session.scalar(db.select(db.func.coalesce(db.func.max(id_column), 0)))
+            for kind, (_, id_column, _, _) in FEED_KINDS.items()}
+
+
+def feed_since(position, limit=None):
+    """
+    Rows committed after `position`, oldest first
+
+    Ids are the cursor rather than timestamps: SQLite has a single writer,
+    so ids are handed out in commit order, while received_at is set before
+    the commit and can land out of order. Each kind is read from its primary
+    key, so checking an unchanged feed costs two index lookups.
+
+    Returns:
+        tuple: (items as (kind, summary), position after them, whether a kind had
+            more than `limit` (default FEED_LIMIT))
+    """
+    limit = FEED_LIMIT if limit is None else limit
+    position = dict(position)
+    per_kind, more = [], False
+    for kind, (statement, id_column, time_column, summary) in FEED_KINDS.items():
+        rows = db.session.scalars(statement().where(id_column > position[kind])
+                                  .order_by(id_column).limit(limit + 1)).all()
+        more = more or len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            position[kind] = rows[-1].id
+        per_kind.append([(getattr(row, time_column.key), kind, summary(row)) for row in rows])
+    # Interleaved by time, but each kind stays in id order so every event's cursor only moves forward
+    items = [(kind, item) for _, kind, item in heapq.merge(*per_kind, key=lambda entry: entry[0] or datetime.min)]
+    return items, position, more
+
+
+def follows(position, items):
+    """Whether items continue each kind's ids from `position` without a gap"""
+    position = dict(position)
+    for kind, item in items:
+        if item['id'] != position[kind] + 1:
+            return False
+        position[kind] = item['id']
+    return True
+
+
+@bp.route('/api/feed')
+@requires_auth
+def feed():
+    """
+    Emails and messages committed after the `since` cursor, oldest first
+
+    Without `since`, returns no items and the cursor to start from. When
+    `more` is true there are further rows; ask again with the new cursor.
+    """
+    since = request.args.get('since')
+    if since is None:
+        return jsonify({'items': [], 'cursor': encode_feed_cursor(current_feed_position()), 'more': False})
+    position = decode_feed_cursor(since)
+    if position is None:
+        return jsonify({'error': f'Malformed cursor: {since}'}), 400
+    items, position, more = feed_since(position)
+    return jsonify({
+        'items': [{'type': kind, **item} for kind, item in items],
+        'cursor': encode_feed_cursor(position),
+        'more': more
+    })
+
+
+@bp.route('/feed/stream')
+@requires_auth
+def feed_stream():
+    """
+    New emails and messages as Server-Sent Events
+
+    Starts after the `Last-Event-ID` header (which EventSource sends when it
+    reconnects) or the `since` cursor, replaying what was missed, or else
+    from now. Rows committed by this worker are pushed by feed_broadcaster as
+    the handlers commit them. After ADMIN_FEED_KEEPALIVE seconds without
+    one, a catch-up query picks up rows from other workers, and a comment
+    keeps proxies from closing the idle connection. The stream ends after
+    ADMIN_FEED_MAX_SECONDS to free its thread, and the browser reconnects.
+    """
+    keepalive = current_app.config['ADMIN_FEED_KEEPALIVE']
+    deadline = time.monotonic() + current_app.config['ADMIN_FEED_MAX_SECONDS']
+    # Taken before reading the database, so a row committed in between is
+    # announced rather than lost (the position check drops the duplicate)
+    after = feed_broadcaster.sequence
+    start = (decode_feed_cursor(request.headers.get('Last-Event-ID') or request.args.get('since'))
+             or current_feed_position())
+    # The stream keeps this request's context open; it mustn't keep a connection too
+    db.session.remove()
+
+    def catch_up(position):
+        items, _, more = feed_since(position)
+        # Release the connection (and SQLite's read snapshot) while the stream waits
+        db.session.remove()
+        return items, more
+
+    def generate():
+        nonlocal after
+        yield f"retry: {FEED_RETRY_MS}\n\n"
+        # Replay anything after the client's cursor first
+        position, behind = start, True
+
+        while (remaining := deadline - time.monotonic()) > 0:
+            events, missed = feed_broadcaster.wait(after, 0 if behind else min(keepalive, remaining))
+            after = events[-1][0] if events else after
+            items = [(kind, item) for _, kind, item in events if item['id'] > position[kind]]
+            behind = False
+            if missed or not events or not follows(position, items):
+                # Idle, or a gap: rows another worker committed, or rows announced
+                # out of order. Ids are given out in commit order, so the
+                # database already has every row up to the newest one announced.
+                items, behind = catch_up(position)
+                if not items and not events:
+                    yield ": keepalive\n\n"
+            for kind, item in items:
+                position = {**position, kind: item['id']}
+                yield f"id: {encode_feed_cursor(position)}\nevent: {kind}\ndata: {json.dumps(item)}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@bp.route('/search')
+@requires_auth
+def search():
+    """Ranked full-text search over inbound emails or contact messages"""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type', 'emails')
+    if kind not in SEARCH_INDEXES:
+        return jsonify({'error': f'Unknown search type: {kind}'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    # Fetch one extra row to know whether there is a next page
+    results = SEARCH_INDEXES[kind].search(
+        db.session, query, limit=SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE
+    )
+    has_next = len(results) > SEARCH_PAGE_SIZE
+    results = results[:SEARCH_PAGE_SIZE]
+
+    detail_endpoint = 'admin.email_detail' if kind == 'emails' else 'admin.message_detail'
+    id_arg = 'email_id' if kind == 'emails' else 'message_id'
+    for result in results:
+        result['url'] = url_for(detail_endpoint, **{id_arg: result['id']})
+
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'query': query,
+            'type': kind,
+            'page': page,
+            'next_page': page + 1 if has_next else None,
+            'results': [{**result, 'snippet': str(result['snippet'])} for result in results]
+        }), 200
+
+    return render_template('admin_search.html', query=query, kind=kind, page=page,
+                           has_next=has_next, results=results)
+
+
+@bp.route('/emails/<int:email_id>')
+@requires_auth
+def email_detail(email_id):
+    """Full view of a single inbound email, bodies included"""
+    email = db.get_or_404(InboundEmail, email_id)
+    return render_template('admin_email_detail.html', email=email)
+
+
+@bp.route('/messages/<int:message_id>')
+@requires_auth
+def message_detail(message_id):
+    """Full view of a single contact form message"""
+    message = db.get_or_404(ContactMessage, message_id)
+    return render_template('admin_message_detail.html', message=message)
+
+
+@bp.route('/performance')
+@requires_auth
+def performance():
+    """
+    This worker's latency histograms and status counts per endpoint, slowest
+    p99 first, and its kept profiles (`?buckets=1` adds the raw buckets for
+    merging with other workers)
+    """
+    metrics = current_app.extensions['request_metrics']
+    return jsonify({
+        'pid': os.getpid(),
+        'since': metrics.started_at,
+        'profile_sample_rate': metrics.sample_rate,
+        'routes': metrics.snapshot(buckets=request.args.get('buckets') == '1'),
+        'profiles': [{**entry, 'url': url_for('admin.performance_profile', profile_id=entry['id'])}
+                     for entry in metrics.profiles.entries()],
+    })
+
+
+@bp.route('/performance/profiles/<int:profile_id>')
+@requires_auth
+def performance_profile(profile_id):
+    """pstats report of one kept profile (`?sort=cumulative|tottime|calls`)"""
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in PROFILE_SORT_KEYS:
+        return jsonify({'error': f'Unknown sort key: {sort}'}), 400
+    report = current_app.extensions['request_metrics'].profiles.report(profile_id, sort=sort)
+    if report is None:
+        return jsonify({'error': 'Profile not found (evicted by slower ones, or from another worker)'}), 404
+    return current_app.response_class(report, mimetype='text/plain')
@@ -0,0 +1,118 @@
+"""
+Health check, status and chat API endpoints
+"""
+import logging
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from application.extensions import page_cache
+from career_agent import get_career_agent
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('api', __name__)
+
+
+@bp.route('/health', methods=['GET'])
+@bp.route('/health/live', methods=['GET'])
+def health_check():
+    """Liveness: the process answers; never touches a dependency"""
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        **current_app.extensions['health_monitor'].liveness()
+    }), 200
+
+
+@bp.route('/health/ready', methods=['GET'])
+def readiness():
+    """Readiness from the cached dependency probes; 503 while a critical one fails"""
+    ready, checks = current_app.extensions['health_monitor'].readiness()
+    return jsonify({
+        "status": "ready" if ready else "unavailable",
+        "timestamp": datetime.now().isoformat(),
+        "checks": checks
+    }), 200 if ready else 503
+
+
+@bp.route('/api/status', methods=['GET'])
+def status():
+    """API status endpoint"""
+    checks = current_app.extensions['health_monitor'].results()
+    return jsonify({
+        "website": "josefinhao.com",
+        "status": "operational",
+        "sendgrid_webhook": "active",
+        "database": "connected" if checks['database']['ok'] else "unavailable",
+        "career_agent": career_agent_status(checks['openai']),
+        "render_cache": page_cache.stats()
+    }), 200
+
+
+def career_agent_status(check):
+    """Breaker state when the probe reported one, else why it didn't ('fallback' without an API key)"""
+    if 'state' in check:
+        return check['state']
+    if check['stale']:
+        return "stale"
+    return check.get('error', 'fallback')
+
+
+@bp.route('/api/user-ip', methods=['GET'])
+def user_ip():
+    """Returns the user's IP address for client-side storage separation"""
+    # Get IP address - handle proxy headers if behind a proxy
+    user_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
+    if user_ip and ',' in user_ip:
+        # X-Forwarded-For can contain multiple IPs, use the first one
+        user_ip = user_ip.split(',')[0].strip()
+
+    return jsonify({
+        "ip": user_ip
+    }), 200
+
+
+@bp.route('/api/chat', methods=['POST'])
+def chat():
+    """
+    AI Chat endpoint with streaming - powered by OpenAI Career Agent
+    Provides intelligent responses about Josefin's background, skills, and projects
+    """
+    try:
+        data = request.get_json()
+        user_message = data.get('message', '').strip()
+
+        if not user_message:
+            return jsonify({
+                "response": "Please ask me something!"
+            }), 400
+
+        # Log the chat interaction
+        logger.info(f"💬 Chat query: {user_message[:100]}...")
+
+        # Get Career Agent and stream response
+        agent = get_career_agent()
+
+        def generate():
+            """Generator function for Server-Sent Events streaming"""
+            try:
+                for chunk in agent.chat_stream(user_message, history=data.get('history')):
+                    # Send each chunk as a data event
+                    yield f"data: {chunk}\n\n"
+                # Send done signal
+                yield "data: [DONE]\n\n"
+            except Exception as e:
+                logger.error(f"❌ Error during streaming: {str(e)}", exc_info=True)
+                yield f"data: I'm sorry, I encountered an error. Please try again.\n\n"
+                yield "data: [DONE]\n\n"
+
+        logger.info(f"✅ Starting Career Agent stream")
+
+        return Response(generate(), mimetype='text/event-stream')
+
+    except Exception as e:
+        logger.error(f"❌ Error in chat API: {str(e)}", exc_info=True)
+        return jsonify({
+            "response": "I'm sorry, I encountered an error. Please try again or contact Josefin directly via the contact form."
+        }), 500
@@ -0,0 +1,50 @@
+"""
+Debug endpoints
+"""
+import logging
+import os
+
+from flask import Blueprint, current_app, jsonify
+
+from application.utils.email_utils import SENDGRID_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('debug', __name__, url_prefix='/debug')
+
+
+@bp.route('/db-status')
+def db_status():
+    """Debug endpoint to check database status (tables and count from the cached health probe)"""
+    try:
+        db_path = current_app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+
+        # Check if database file exists
+        if db_path.startswith('/'):
+            abs_path = db_path
+        else:
+            abs_path = os.path.join(current_app.instance_path, db_path)
+
+        db_exists = os.path.exists(abs_path)
+
+        database = current_app.extensions['health_monitor'].results()['database']
+        tables = database.get('tables', [])
+        message_count = database.get('contact_message_count', f"Error: {database.get('error')}")
+
+        return jsonify({
+            'database_uri': current_app.config['SQLALCHEMY_DATABASE_URI'],
+            'database_path': abs_path,
+            'database_exists': db_exists,
+            'tables': tables,
+            'contact_message_count': message_count,
+            'sendgrid_available': SENDGRID_AVAILABLE,
+            'checked_age_s': database['age_s'],
+            'instance_path': current_app.instance_path
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Debug endpoint error: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': str(e),
+            'type': type(e).__name__
+        }), 500
@@ -0,0 +1,111 @@
+"""
+Main website pages
+"""
+import logging
+
+from flask import Blueprint, current_app, flash, redirect, render_template, url_for
+
+from application.extensions import db, page_cache
+from application.forms import ContactForm
+from application.models import ContactMessage
+from application.utils.email_utils import send_contact_notification
+from application.utils.http_utils import is_spa_request
+from application.utils.live_feed import feed_broadcaster
+from application.views.admin import message_summary
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('pages', __name__)
+
+
+@bp.app_context_processor
+def inject_page_layout():
+    """Pages extend the full shell, or only the content fragment for SPA navigations"""
+    return {'page_layout': '_content_only.html' if is_spa_request() else 'base.html'}
+
+
+@bp.after_app_request
+def vary_on_spa_headers(response):
+    """HTML pages differ between SPA and full-page requests, so caches must key on the headers"""
+    if response.mimetype == 'text/html':
+        response.vary.update(('X-SPA-Request', 'X-Requested-With'))
+    return response
+
+
+@bp.route('/')
+@page_cache.cached
+def home():
+    """Main homepage"""
+    return render_template('index.html')
+
+
+@bp.route('/about')
+@page_cache.cached
+def about():
+    """About page"""
+    return render_template('about.html')
+
+
+@bp.route('/projects')
+@page_cache.cached
+def projects():
+    """Projects page"""
+    return render_template('projects.html')
+
+
+@bp.route('/games')
+@page_cache.cached
+def games():
+    """Games page with interactive mini-games"""
+    return render_template('games.html')
+
+
+@bp.route('/cat-cafe')
+@page_cache.cached
+def cat_cafe():
+    """Cat Cafe interactive experience"""
+    return render_template('cat-cafe.html')
+
+
+@bp.route('/contact', methods=['GET', 'POST'])
+def contact():
+    """Contact page with form"""
+    form = ContactForm()
+
+    if form.validate_on_submit():
+        try:
+            # Save the contact message to database
+            message = ContactMessage(
+                name=form.name.data,
+                email=form.email.data,
+                subject=form.subject.data,
+                message=form.message.data
+            )
+            db.session.add(message)
+            db.session.commit()
+
+            logger.info(f"New contact message from {form.email.data}: {form.subject.data}")
+            feed_broadcaster.publish('message', message_summary(message))
+
+            # Try to send email notification (don't fail if this doesn't work)
+            try:
+                send_contact_notification(
+                    current_app,
+                    name=form.name.data,
+                    email=form.email.data,
+                    subject=form.subject.data,
+                    message=form.message.data
+                )
+            except Exception as e:
+                logger.error(f"Failed to send email notification: {str(e)}")
+
+            flash('Thank you for your message! I\'ll get back to you soon.', 'success')
+            return redirect(url_for('pages.contact'))
+
+        except Exception as e:
+            logger.error(f"Failed to save contact message: {str(e)}", exc_info=True)
+            logger.error(f"Form data - Name: {form.name.data}, Email: {form.email.data}, Subject: {form.subject.data}")
+            db.session.rollback()
+            flash('Sorry, there was an error submitting your message. Please try again.', 'error')
+
+    return render_template('contact.html', form=form)
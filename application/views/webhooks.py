@@ -0,0 +1,109 @@
+"""
+SendGrid Inbound Parse webhook
+"""
+import logging
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from application.extensions import db
+from application.models import InboundEmail, dedup_keys_added_at
+from application.utils.live_feed import feed_broadcaster
+from application.utils.webhook_utils import (
+    inbound_email_content_key, inbound_email_dedup_key, normalize_inbound_email
+)
+from application.views.admin import email_summary
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('webhooks', __name__, url_prefix='/webhook')
+
+
+@bp.route('/sendgrid', methods=['POST'])
+def sendgrid():
+    """
+    Receives incoming emails from SendGrid Inbound Parse
+    This is for the reply.josefinhao.com subdomain
+    """
+    try:
+        # Get the email data from SendGrid
+        email_data = request.form.to_dict()
+
+        # SendGrid retries deliveries - acknowledge repeats without writing
+        dedup_key = inbound_email_dedup_key(email_data)
+        match = InboundEmail.dedup_key == dedup_key
+        content_key = inbound_email_content_key(email_data)
+        if content_key != dedup_key:
+            # Rows stored before dedup keys existed were keyed by content even
+            # if the delivery had a Message-ID; only those match by content, so
+            # distinct emails that happen to share a body aren't collapsed
+            added_at = dedup_keys_added_at(db.session.connection())
+            if added_at is not None:
+                match = or_(match, and_(InboundEmail.dedup_key == content_key, InboundEmail.received_at < added_at))
+        existing_id = db.session.query(InboundEmail.id).filter(match).limit(1).scalar()
+        if existing_id is not None:
+            return duplicate_email_response(existing_id)
+
+        # Extract key information, with the defaults the dedup key was computed with
+        fields = normalize_inbound_email(email_data)
+        from_email = fields['from']
+        to_email = fields['to']
+        subject = fields['subject']
+        text_content = fields['text']
+        html_content = fields['html']
+
+        # Save email to database
+        inbound_email = InboundEmail(
+            from_email=from_email,
+            to_email=to_email,
+            subject=subject,
+            text_content=text_content,
+            html_content=html_content,
+            dedup_key=dedup_key
+        )
+        db.session.add(inbound_email)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent retry of the same delivery committed first
+            db.session.rollback()
+            existing_id = db.session.query(InboundEmail.id).filter_by(dedup_key=dedup_key).scalar()
+            return duplicate_email_response(existing_id)
+
+        # One structured line; the fields are searchable in the JSON log output
+        logger.info(f"📧 Inbound email {inbound_email.id} saved from {from_email}", extra={
+            'email_id': inbound_email.id,
+            'from_email': from_email,
+            'to_email': to_email,
+            'subject': subject,
+            'preview': text_content[:200] if text_content else None,
+        })
+        # Push it to admin dashboards watching this worker's live feed
+        feed_broadcaster.publish('email', email_summary(inbound_email))
+
+        # Send success response to SendGrid
+        return jsonify({
+            "status": "success",
+            "message": "Email received and saved",
+            "email_id": inbound_email.id,
+            "from": from_email,
+            "subject": subject
+        }), 200
+
+    except Exception as e:
+        logger.error(f"❌ Error processing email: {str(e)}", exc_info=True)
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+
+def duplicate_email_response(email_id):
+    """Acknowledge a retried webhook delivery so SendGrid stops retrying"""
+    logger.info(f"Duplicate inbound email delivery ignored (existing ID: {email_id})")
+    return jsonify({
+        "status": "duplicate",
+        "message": "Email already received",
+        "email_id": email_id
+    }), 200
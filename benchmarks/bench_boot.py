@@ -0,0 +1,85 @@
+"""
+Benchmark: worker boot time - importing the app and serving the first request
+
+Each run is a fresh interpreter, as a new gunicorn worker (without
+preload_app) would be, on a temporary database. Also lists the slowest
+imports and checks that the lazily-loaded dependencies stayed unloaded.
+
+Usage:
+    python -m benchmarks.bench_boot [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+booted = time.perf_counter()
+client = app.app.test_client()
+client.get('/about')
+first = time.perf_counter()
+client.get('/about')
+second = time.perf_counter()
+print(json.dumps({
+    'boot': (booted - start) * 1000,
+    'first_request': (first - booted) * 1000,
+    'second_request': (second - first) * 1000,
+    'lazy_loaded': [name for name in ('openai', 'sendgrid', 'PIL') if name in sys.modules],
+}))
+"""
+
+LAZY_MODULES = ('openai', 'sendgrid', 'PIL')
+
+
+def run_boot(env):
+    output = subprocess.run([sys.executable, '-c', BOOT_SCRIPT], capture_output=True, text=True, check=True,
+                            env=env)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, limit=10):
+    """Import time of `import app` per top-level package (self time summed), in milliseconds"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, check=True, env=env)
+    totals = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        if not self_time.strip().isdigit():
+            continue
+        package = name.strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(self_time) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, 'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'bench.db')}"}
+        results = [run_boot(env) for _ in range(args.runs)]
+        imports = slowest_imports(env)
+
+    for key, label in (('boot', 'import app'), ('first_request', 'first request'),
+                       ('second_request', 'second request')):
+        timings = [result[key] for result in results]
+        print(f"{label:<16} median={statistics.median(timings):7.1f} ms  min={min(timings):7.1f} ms")
+    loaded = sorted({name for result in results for name in result['lazy_loaded']})
+    print(f"Loaded at boot: {', '.join(loaded) or 'none of ' + ', '.join(LAZY_MODULES)}")
+
+    print("\nSlowest packages to import:")
+    for name, ms in imports:
+        print(f"  {name:<32}{ms:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
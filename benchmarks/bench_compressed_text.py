@@ -0,0 +1,79 @@
+"""
+Benchmark: plain Text vs CompressedText for inbound email bodies
+
+Writes the same synthetic HTML newsletters into two SQLite files and reports
+file size plus write and read cost.
+
+Usage:
+    python -m benchmarks.bench_compressed_text [--rows 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, create_engine, insert, select
+
+from application.database import CompressedText
+
+
+def make_newsletter(rng):
+    """Build an HTML newsletter body of roughly 20-60KB"""
+    blocks = []
+    for i in range(rng.randint(40, 120)):
+        blocks.append(
+            f'<tr><td style="padding: 12px; font-family: Arial, sans-serif; color: #333;">'
+            f'<h2 style="color: #5e35b1;">Story {i}: {rng.choice(["AI", "Data", "Crypto", "Python"])} update</h2>'
+            f'<p style="line-height: 1.6;">{" ".join(rng.choice(WORDS) for _ in range(60))}</p>'
+            f'<a href="https://example.com/track?u={rng.getrandbits(64):x}&i={i}">Read more</a></td></tr>'
+        )
+    return '<html><body><table width="100%">' + ''.join(blocks) + '</table></body></html>'
+
+
+WORDS = ('model', 'agent', 'pipeline', 'latency', 'vector', 'prompt', 'dataset', 'analytics',
+         'workflow', 'dashboard', 'market', 'token', 'inference', 'feature', 'release', 'update')
+
+
+def run(column_type, bodies, path):
+    """Insert and read back all bodies, returning (size, write_s, read_s)"""
+    engine = create_engine(f'sqlite:///{path}')
+    metadata = MetaData()
+    table = Table('inbound_email', metadata,
+                  Column('id', Integer, primary_key=True),
+                  Column('html_content', column_type))
+    metadata.create_all(engine)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(table), [{'html_content': body} for body in bodies])
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        total = sum(len(row.html_content) for row in conn.execute(select(table.c.html_content)))
+    read_s = time.perf_counter() - start
+    assert total == sum(len(body) for body in bodies)
+
+    engine.dispose()
+    return os.path.getsize(path), write_s, read_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    bodies = [make_newsletter(rng) for _ in range(args.rows)]
+    print(f"{args.rows} bodies, {sum(len(b) for b in bodies) / 1e6:.1f} MB of HTML")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, column_type in (('Text', Text()), ('CompressedText', CompressedText())):
+            size, write_s, read_s = run(column_type, bodies, os.path.join(tmp, f'{label}.db'))
+            print(f"{label:15} size={size / 1e6:7.1f} MB  write={write_s * 1000:8.1f} ms  "
+                  f"read={read_s * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: dynamic compression, bytes saved vs CPU spent
+
+Compresses every page (full and SPA fragment), an admin-style JSON list and a
+simulated chat event stream at the dynamic levels, next to the maximum levels
+used for precompressed static files. Pages come from the app in the
+production configuration on a temporary database.
+
+Usage:
+    python -m benchmarks.bench_compression
+"""
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+import zlib
+
+from application import create_app
+from application.extensions import page_cache
+from application.utils import compression
+from application.utils.compression import BROTLI_AVAILABLE, StreamCompressor, compress_body
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+PAGES = ('/', '/about', '/projects', '/games', '/cat-cafe', '/contact')
+SPA_HEADERS = {'X-SPA-Request': 'true', 'X-Requested-With': 'XMLHttpRequest'}
+REPEAT = 20
+
+
+def timed(compress, data):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = compress(data)
+    return len(result), (time.perf_counter() - start) / REPEAT * 1000
+
+
+def codecs():
+    yield 'gzip-6', lambda data: compress_body(data, 'gzip')
+    yield 'gzip-9', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if BROTLI_AVAILABLE:
+        yield f'br-{compression.BROTLI_QUALITY}', lambda data: compress_body(data, 'br')
+        yield 'br-11', lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+
+
+def sample_bodies(app):
+    page_cache.clear()
+    client = app.test_client()
+    for path in PAGES:
+        yield path, client.get(path).data
+        yield f'{path} (spa)', client.get(path, headers=SPA_HEADERS).data
+
+    rng = random.Random(3)
+    items = [{
+        'id': n,
+        'from_email': f'user{rng.randint(1, 500)}@example.com',
+        'subject': f'Re: project update #{rng.randint(1, 9999)}',
+        'preview': ' '.join(rng.choice(('thanks', 'meeting', 'invoice', 'next', 'week', 'attached'))
+                            for _ in range(30)),
+        'received_at': f'2024-05-{rng.randint(1, 28):02}T12:00:00',
+    } for n in range(50)]
+    yield 'admin JSON (50 rows)', json.dumps({'count': 50, 'items': items}).encode('utf-8')
+
+
+def bench_bodies(app):
+    names = [name for name, _ in codecs()]
+    print(f"{'Body':<22}{'Identity':>10}" + ''.join(f'{name:>18}' for name in names))
+    for label, body in sample_bodies(app):
+        cells = []
+        for _, compress in codecs():
+            size, ms = timed(compress, body)
+            cells.append(f'{size:>8,} {ms:>6.2f}ms')
+        print(f'{label:<22}{len(body):>10,}' + ''.join(f'{cell:>18}' for cell in cells))
+
+
+def bench_event_stream(events=400):
+    """A reply streamed a few words per event, as /api/chat does"""
+    rng = random.Random(5)
+    words = ('I', 'have', 'worked', 'on', 'data', 'pipelines', 'machine', 'learning', 'and', 'the')
+    chunks = [f"data: {' '.join(rng.choices(words, k=3))}\n\n".encode('utf-8') for _ in range(events)]
+    identity = sum(len(chunk) for chunk in chunks)
+
+    print(f'\nEvent stream: {events} events, {identity:,} bytes identity')
+    print(f"{'Mode':<30}{'Bytes':>10}{'Saved':>8}{'us/event':>10}")
+    encodings = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+    for encoding in encodings:
+        for label, shared in ((f'{encoding}, one stream, flushed', True),
+                              (f'{encoding}, new compressor per event', False)):
+            start = time.perf_counter()
+            total = 0
+            compressor = StreamCompressor(encoding)
+            for chunk in chunks:
+                if not shared:
+                    compressor = StreamCompressor(encoding)
+                total += len(compressor.compress(chunk))
+                if not shared:
+                    total += len(compressor.finish())
+            if shared:
+                total += len(compressor.finish())
+            us = (time.perf_counter() - start) / events * 1e6
+            print(f'{label:<30}{total:>10,}{1 - total / identity:>8.0%}{us:>10.1f}')
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        bench_bodies(create_app('production', {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'bench.db')}"}))
+    bench_event_stream()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark: page latency under gunicorn while chat streams are open
+
+Starts gunicorn with gunicorn.conf.py once per worker profile, against a
+temporary database and a stub OpenAI server that streams each answer over a
+few seconds. A set of clients keeps chat streams open back to back while
+others load the public pages; the report shows page throughput and latency,
+completed and failed streams, and the time to a stream's first event.
+
+Usage:
+    python -m benchmarks.bench_gunicorn [--seconds 10] [--streams 6] [--page-clients 4]
+        [--profile sync --profile gthread --profile gevent]
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.stubs import StubOpenAI
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = ('sync', 'gthread', 'gevent')
+PAGES = ('/', '/about', '/projects', '/games', '/cat-cafe', '/contact')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(profile, port, env):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app'],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, **env, 'GUNICORN_WORKER_CLASS': profile, 'GUNICORN_BIND': f'127.0.0.1:{port}'},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'gunicorn ({profile}) did not start')
+
+
+def stream_client(port, deadline, results):
+    """Open chat streams back to back; a stream counts if it reaches [DONE]"""
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        first_event = None
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            connection.request('POST', '/api/chat', body=json.dumps({'message': 'Tell me about your projects'}),
+                               headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            complete = False
+            for line in response:
+                if first_event is None and line.startswith(b'data:'):
+                    first_event = time.perf_counter() - started
+                if line.strip() == b'data: [DONE]':
+                    complete = True
+            connection.close()
+        except OSError:
+            complete = False
+        results.append((complete, first_event))
+
+
+def page_client(port, deadline, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    n = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        ok = False
+        # Like a browser, retry once when a recycled worker closed the keep-alive connection
+        for _ in range(2):
+            try:
+                connection.request('GET', PAGES[n % len(PAGES)])
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+                break
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(1)
+        n += 1
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def run_profile(profile, args, env):
+    port = free_port()
+    process = start_server(profile, port, env)
+    try:
+        # Warm the render cache and the workers before measuring
+        for path in PAGES:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            connection.request('GET', path)
+            connection.getresponse().read()
+
+        deadline = time.monotonic() + args.seconds
+        streams, latencies, errors = [], [], []
+        threads = [threading.Thread(target=stream_client, args=(port, deadline, streams))
+                   for _ in range(args.streams)]
+        threads += [threading.Thread(target=page_client, args=(port, deadline, latencies, errors))
+                    for _ in range(args.page_clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+    first_events = [first for complete, first in streams if first is not None]
+    return {
+        'pages_per_sec': len(latencies) / args.seconds,
+        'page_p50_ms': percentile(latencies, 0.50) * 1000,
+        'page_p99_ms': percentile(latencies, 0.99) * 1000,
+        'page_errors': len(errors),
+        'streams_done': sum(complete for complete, _ in streams),
+        'streams_failed': sum(not complete for complete, _ in streams),
+        'first_event_p50_ms': percentile(first_events, 0.50) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--streams', type=int, default=6, help='clients keeping chat streams open')
+    parser.add_argument('--page-clients', type=int, default=4, help='clients loading pages')
+    parser.add_argument('--stream-seconds', type=float, default=3, help='length of each stubbed answer')
+    parser.add_argument('--workers', type=int, help='WEB_CONCURRENCY for every profile (default: per profile)')
+    parser.add_argument('--profile', choices=PROFILES, action='append')
+    args = parser.parse_args()
+
+    print(f"{args.streams} chat streams ({args.stream_seconds:g}s each) + {args.page_clients} page clients, "
+          f"{args.seconds:g}s per profile, {os.cpu_count()} CPUs")
+    print(f"{'profile':<9} {'pages/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} "
+          f"{'streams':>8} {'failed':>7} {'1st event ms':>13}")
+
+    with StubOpenAI(seconds=args.stream_seconds) as stub, tempfile.TemporaryDirectory() as directory:
+        env = {
+            'OPENAI_API_KEY': 'stub', 'OPENAI_BASE_URL': stub.base_url,
+            'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        }
+        if args.workers:
+            env['WEB_CONCURRENCY'] = str(args.workers)
+        for profile in args.profile or PROFILES:
+            if profile == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print(f"{profile:<9} skipped: gevent is not installed")
+                continue
+            row = run_profile(profile, args, env)
+            print(f"{profile:<9} {row['pages_per_sec']:>8.1f} {row['page_p50_ms']:>8.1f} {row['page_p99_ms']:>8.1f} "
+                  f"{row['page_errors']:>7} {row['streams_done']:>8} {row['streams_failed']:>7} "
+                  f"{row['first_event_p50_ms']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+"""
+Benchmark: end-to-end HTTP workloads, checked against baselines
+
+Runs the app on a local port - in this process under werkzeug's threaded
+server, or under gunicorn with gunicorn.conf.py - against a temporary
+SQLite database seeded with emails, a stub SendGrid and a stub OpenAI
+(benchmarks/stubs.py). Each scenario is a weighted mix of request kinds,
+driven by a fixed number of client threads for a set time:
+
+    page       GET a public page (full document)
+    fragment   GET a public page as an SPA navigation
+    contact    POST the contact form (CSRF token, database write, notification)
+    webhook    POST a SendGrid inbound email with a new Message-ID
+    dashboard  GET the admin dashboard or its JSON email list
+    chat       POST /api/chat and read the stream to [DONE]
+               (chat_first_event is the time to its first event)
+
+The report is JSON: throughput and p50/p95/p99 latency per route per
+scenario. Routes are compared with the baseline file for the server mode
+(those with at least MIN_SAMPLES requests in the baseline); the exit status
+is 1 if any route's p50 or p95 grew, or its throughput fell, by more than
+the tolerance, or it failed requests the baseline didn't. Baselines depend on the machine: record your own with
+--update-baseline before comparing.
+
+Usage:
+    python -m benchmarks.bench_http [--server inprocess|gunicorn] [--seconds 10]
+        [--scenario mixed] [--concurrency 8] [--output report.json]
+        [--baseline benchmarks/baselines/bench_http.json] [--tolerance 0.5] [--update-baseline]
+"""
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlencode
+
+from application.utils.metrics import LatencyHistogram
+from benchmarks.bench_gunicorn import PAGES, free_port, start_server
+from benchmarks.stubs import StubOpenAI, StubSendGrid
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'bench_http.json')
+
+SPA_HEADERS = {'X-SPA-Request': 'true', 'X-Requested-With': 'XMLHttpRequest'}
+DASHBOARD_PATHS = ('/admin/dashboard', '/admin/api/emails')
+# Basic auth for bench:bench, the admin credentials the server is started with
+ADMIN_HEADERS = {'Authorization': 'Basic YmVuY2g6YmVuY2g='}
+
+# Request kind weights, and the concurrency levels each scenario runs at
+SCENARIOS = {
+    'browse': ({'page': 45, 'fragment': 45, 'contact': 10}, (4, 16)),
+    'webhook-flood': ({'webhook': 90, 'dashboard': 10}, (4, 16)),
+    'mixed': ({'page': 25, 'fragment': 25, 'dashboard': 10, 'webhook': 20, 'contact': 5, 'chat': 15}, (8,)),
+}
+
+# Routes with fewer requests than this in the baseline are too noisy to compare
+MIN_SAMPLES = 100
+
+_CSRF_PATTERN = re.compile(rb'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+class Client:
+    """Keep-alive HTTP client with a cookie jar, like one browser tab"""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookies = {}
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, body=None, headers=None, stream=False):
+        """Returns (status, response); the body is read unless `stream`"""
+        headers = {'Accept-Encoding': 'gzip', **(headers or {})}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        # Retry once when the server closed the keep-alive connection
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                break
+            except (OSError, http.client.HTTPException):
+                self.connection.close()
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+                if attempt:
+                    raise
+        for cookie in response.headers.get_all('Set-Cookie') or ():
+            name, _, value = cookie.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value
+        if not stream:
+            response.body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                response.body = gzip.decompress(response.body)
+        return response.status, response
+
+    def post_form(self, path, fields):
+        return self.request('POST', path, body=urlencode(fields),
+                            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+def run_page(client, n):
+    status, _ = client.request('GET', PAGES[n % len(PAGES)])
+    return status == 200
+
+
+def run_fragment(client, n):
+    status, _ = client.request('GET', PAGES[n % len(PAGES)], headers=SPA_HEADERS)
+    return status == 200
+
+
+def run_contact(client, n):
+    if 'csrf_token' not in client.state:
+        _, response = client.request('GET', '/contact')
+        client.state['csrf_token'] = _CSRF_PATTERN.search(response.body).group(1).decode()
+    status, _ = client.post_form('/contact', {
+        'csrf_token': client.state['csrf_token'], 'name': 'Bench Visitor', 'email': 'visitor@example.com',
+        'subject': f'Benchmark message {n}', 'message': 'Hello, this is a benchmark message. ' * 5,
+    })
+    # Success redirects back to the form; a validation error re-renders it with 200
+    return status == 302
+
+
+def run_webhook(client, n):
+    status, _ = client.post_form('/webhook/sendgrid', {
+        'from': 'sender@example.com', 'to': 'hello@reply.josefinhao.com', 'subject': f'Flood {n}',
+        'text': 'Body of an inbound email. ' * 40, 'headers': f'Message-ID: <{uuid.uuid4()}@example.com>',
+    })
+    return status == 200
+
+
+def run_dashboard(client, n):
+    status, _ = client.request('GET', DASHBOARD_PATHS[n % len(DASHBOARD_PATHS)], headers=ADMIN_HEADERS)
+    return status == 200
+
+
+def run_chat(client, n):
+    started = time.perf_counter()
+    status, response = client.request('POST', '/api/chat', stream=True,
+                                      body=json.dumps({'message': 'Tell me about your projects'}),
+                                      headers={'Content-Type': 'application/json', 'Accept-Encoding': 'identity'})
+    first_event, complete = None, False
+    for line in response:
+        if first_event is None and line.startswith(b'data:'):
+            first_event = time.perf_counter() - started
+        if line.strip() == b'data: [DONE]':
+            complete = True
+    extra = {'chat_first_event': first_event} if first_event is not None else {}
+    return status == 200 and complete, extra
+
+
+KINDS = {
+    'page': run_page, 'fragment': run_fragment, 'contact': run_contact,
+    'webhook': run_webhook, 'dashboard': run_dashboard, 'chat': run_chat,
+}
+
+
+def client_loop(port, weights, deadline, seed, results, lock):
+    """One client thread: weighted random requests until the deadline"""
+    rng = random.Random(seed)
+    kinds, cumulative = list(weights), list(weights.values())
+    client = Client(port)
+    client.state = {}
+    histograms, errors = {}, Counter()
+    n = 0
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, cumulative)[0]
+        started = time.perf_counter()
+        try:
+            outcome = KINDS[kind](client, n)
+        except (OSError, http.client.HTTPException, AttributeError):
+            outcome = False
+        elapsed = time.perf_counter() - started
+        ok, extra = outcome if isinstance(outcome, tuple) else (outcome, {})
+        if ok:
+            histograms.setdefault(kind, LatencyHistogram()).record(elapsed)
+            for name, seconds in extra.items():
+                histograms.setdefault(name, LatencyHistogram()).record(seconds)
+        else:
+            errors[kind] += 1
+        n += 1
+    client.connection.close()
+    with lock:
+        for kind, histogram in histograms.items():
+            results['histograms'].setdefault(kind, LatencyHistogram()).merge(histogram)
+        results['errors'].update(errors)
+
+
+def run_scenario(port, weights, concurrency, seconds):
+    results = {'histograms': {}, 'errors': Counter()}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    threads = [threading.Thread(target=client_loop, args=(port, weights, deadline, seed, results, lock))
+               for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    routes = {}
+    for kind in sorted(set(results['histograms']) | set(results['errors'])):
+        histogram = results['histograms'].get(kind, LatencyHistogram())
+        routes[kind] = {
+            'requests': histogram.count,
+            'errors': results['errors'][kind],
+            'per_sec': round(histogram.count / seconds, 2),
+            **{f'p{q}_ms': round(histogram.percentile(q / 100) / 1000, 2) for q in (50, 95, 99)},
+        }
+    return {
+        'concurrency': concurrency,
+        'per_sec': round(sum(route['per_sec'] for kind, route in routes.items() if kind in KINDS), 2),
+        'routes': routes,
+    }
+
+
+def seed_database(database_uri, rows):
+    """Migrate the temporary database and fill it with emails for the dashboard"""
+    from datetime import datetime, timedelta
+    from application import create_app
+    from application.extensions import db
+    from application.models import InboundEmail, init_db
+
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_uri, 'LOG_LEVEL': 'WARNING'})
+    with app.app_context():
+        init_db()
+        start = datetime(2024, 1, 1)
+        db.session.add_all(
+            InboundEmail(from_email=f'sender{i}@example.com', to_email='hello@reply.josefinhao.com',
+                         subject=f'Seed message {i}', text_content='Hello there ' * 40,
+                         received_at=start + timedelta(minutes=i), dedup_key=f'seed-{i}')
+            for i in range(rows)
+        )
+        db.session.commit()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+class InProcessServer:
+    """The app under werkzeug's threaded server, on a background thread"""
+
+    def __init__(self, env):
+        from werkzeug.serving import make_server
+        from application import create_app
+
+        os.environ.update(env)
+        self.app = create_app('production', {
+            'SQLALCHEMY_DATABASE_URI': env['DATABASE_URL'], 'SECRET_KEY': env['SECRET_KEY'],
+            'SENDGRID_API_KEY': env['SENDGRID_API_KEY'], 'SENDGRID_API_HOST': env['SENDGRID_API_HOST'],
+            'OPENAI_API_KEY': env['OPENAI_API_KEY'], 'LOG_LEVEL': env['LOG_LEVEL'],
+        })
+        # No access log, as under gunicorn's defaults
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        self.port = self.server.server_port
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class GunicornServer:
+    """gunicorn with gunicorn.conf.py, as in production"""
+
+    def __init__(self, env, worker_class):
+        self.port = free_port()
+        self.process = start_server(worker_class, self.port, env)
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(timeout=30)
+
+
+def compare(report, baseline, tolerance):
+    """Routes that regressed against the baseline, as messages"""
+    regressions = []
+    for scenario, expected in baseline.items():
+        measured = report.get(scenario)
+        if measured is None:
+            continue
+        for route, base in expected['routes'].items():
+            if base['requests'] < MIN_SAMPLES:
+                continue
+            result = measured['routes'].get(route)
+            if result is None:
+                regressions.append(f"{scenario} {route}: no successful requests")
+                continue
+            if result['errors'] and not base['errors']:
+                regressions.append(f"{scenario} {route}: {result['errors']} failed requests")
+            for key in ('p50_ms', 'p95_ms'):
+                if result[key] > base[key] * (1 + tolerance):
+                    regressions.append(f"{scenario} {route}: {key} {result[key]} > {base[key]} baseline")
+            if result['per_sec'] < base['per_sec'] * (1 - tolerance):
+                regressions.append(f"{scenario} {route}: {result['per_sec']}/s < {base['per_sec']}/s baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--server', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--worker-class', default='gthread', help='GUNICORN_WORKER_CLASS for --server gunicorn')
+    parser.add_argument('--seconds', type=float, default=10, help='per scenario and concurrency level')
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append')
+    parser.add_argument('--concurrency', type=int, action='append', help="override the scenarios' levels")
+    parser.add_argument('--stream-seconds', type=float, default=1, help='length of each stubbed chat answer')
+    parser.add_argument('--mail-delay-ms', type=float, default=150, help='stub SendGrid response time')
+    parser.add_argument('--seed-rows', type=int, default=500)
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative regression')
+    parser.add_argument('--update-baseline', action='store_true', help='save this run as the baseline')
+    args = parser.parse_args()
+
+    with StubOpenAI(seconds=args.stream_seconds, chunks=10) as openai_stub, \
+            StubSendGrid(delay=args.mail_delay_ms / 1000) as mail_stub, \
+            tempfile.TemporaryDirectory() as directory:
+        database_uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        env = {
+            'DATABASE_URL': database_uri, 'SECRET_KEY': 'bench-secret', 'LOG_LEVEL': 'WARNING',
+            'OPENAI_API_KEY': 'stub', 'OPENAI_BASE_URL': openai_stub.base_url,
+            'SENDGRID_API_KEY': 'stub', 'SENDGRID_API_HOST': mail_stub.base_url,
+            'ADMIN_USERNAME': 'bench', 'ADMIN_PASSWORD': 'bench', 'ADMIN_PASSWORD_HASH': '',
+        }
+        seed_database(database_uri, args.seed_rows)
+        server = InProcessServer(env) if args.server == 'inprocess' else GunicornServer(env, args.worker_class)
+        report = {}
+        try:
+            # Warm the page cache and the database connections
+            client = Client(server.port)
+            for path in PAGES:
+                client.request('GET', path)
+            for path in DASHBOARD_PATHS:
+                client.request('GET', path, headers=ADMIN_HEADERS)
+            client.connection.close()
+
+            for name in args.scenario or SCENARIOS:
+                weights, levels = SCENARIOS[name]
+                for concurrency in args.concurrency or levels:
+                    result = run_scenario(server.port, weights, concurrency, args.seconds)
+                    report[f'{name}@{concurrency}'] = result
+                    print(f"{name}@{concurrency}: {result['per_sec']} requests/s", file=sys.stderr)
+        finally:
+            server.stop()
+        notifications = mail_stub.received
+
+    output = {
+        'server': args.server if args.server == 'inprocess' else f'gunicorn-{args.worker_class}',
+        'seconds': args.seconds,
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'notifications_sent': notifications,
+        'scenarios': report,
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    if args.update_baseline:
+        baselines[output['server']] = {'cpus': output['cpus'], 'scenarios': report}
+        with open(args.baseline, 'w') as f:
+            f.write(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Baseline for {output['server']} saved to {args.baseline}", file=sys.stderr)
+        return
+
+    baseline = baselines.get(output['server'])
+    if baseline is None:
+        print(f"No {output['server']} baseline in {args.baseline}; nothing checked", file=sys.stderr)
+        return
+    regressions = compare(report, baseline['scenarios'], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+    print(f"Within {args.tolerance:.0%} of the {output['server']} baseline", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
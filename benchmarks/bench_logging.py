@@ -0,0 +1,144 @@
+"""
+Benchmark: what logging costs the thread that logs
+
+Compares writing records synchronously from the calling thread (what
+logging.basicConfig did) with the queued pipeline in
+application/utils/logging_utils.py, where the caller only enqueues and a
+listener thread formats and writes. Two measurements per sink:
+
+    per record   logger.info() with extra= fields in a tight loop
+    per request  SendGrid webhook posts through the app's test client
+
+The sink is a temporary file; --write-delay-ms adds a pause to every write
+to stand in for a slow log collector or a full stderr pipe.
+
+Usage:
+    python -m benchmarks.bench_logging [--records 20000] [--requests 500] [--write-delay-ms 0.2]
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from application.utils.logging_utils import TEXT_FORMAT, JsonFormatter, LogPipeline, log_pipeline
+
+PROFILES = ('sync-text', 'sync-json', 'queue-json', 'queue-json-sampled')
+
+
+class SlowFile:
+    """File whose writes block for `delay` seconds, like a back-pressured pipe"""
+
+    def __init__(self, path, delay):
+        self.file = open(path, 'a', encoding='utf-8')
+        self.delay = delay
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def install(profile, pipeline, sink):
+    """Point the root logger at `sink` the way `profile` would; returns a teardown callable"""
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    if profile.startswith('sync'):
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(JsonFormatter() if profile == 'sync-json' else logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        return lambda: root.removeHandler(handler)
+
+    sampling = {'bench': 0.1, 'application.views.webhooks': 0.1} if profile.endswith('sampled') else None
+    pipeline.stream = sink
+    pipeline.configure(level='INFO', fmt='json', sampling=sampling)
+
+    def teardown():
+        pipeline.stop()
+        pipeline.stream = None
+    return teardown
+
+
+def per_record(profile, records, sink):
+    """Mean and p99 microseconds spent in logger.info(), and the time to drain what was queued"""
+    logger = logging.getLogger('bench.records')
+    teardown = install(profile, LogPipeline(), sink)
+    timings = []
+    try:
+        for n in range(records):
+            started = time.perf_counter()
+            logger.info('Inbound email %s saved', n, extra={'email_id': n, 'subject': 'Benchmark'})
+            timings.append(time.perf_counter() - started)
+    finally:
+        drain_started = time.perf_counter()
+        teardown()
+        drained = time.perf_counter() - drain_started
+    timings.sort()
+    return statistics.fmean(timings) * 1e6, timings[int(len(timings) * 0.99)] * 1e6, drained
+
+
+def per_request(profile, requests, sink, database_uri):
+    """Mean and p99 milliseconds per webhook post"""
+    from application import create_app
+    from application.extensions import db
+    from application.models import init_db
+
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_uri})
+    with app.app_context():
+        init_db()
+    # create_app installed the stderr pipeline; swap in the profile's sink
+    log_pipeline.stop()
+    teardown = install(profile, log_pipeline, sink)
+
+    client = app.test_client()
+    timings = []
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            client.post('/webhook/sendgrid', data={
+                'from': 'bench@example.com', 'to': 'hello@reply.josefinhao.com', 'subject': 'Benchmark',
+                'text': 'Body ' * 100, 'headers': f'Message-ID: <{uuid.uuid4()}>',
+            })
+            timings.append(time.perf_counter() - started)
+    finally:
+        teardown()
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+    timings.sort()
+    return statistics.fmean(timings) * 1000, timings[int(len(timings) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--write-delay-ms', type=float, default=0.2, help='pause added to every sink write')
+    parser.add_argument('--profile', choices=PROFILES, action='append')
+    args = parser.parse_args()
+    delay = args.write_delay_ms / 1000
+
+    print(f"{args.records} records and {args.requests} webhook requests per profile, "
+          f"{args.write_delay_ms:g}ms per sink write")
+    print(f"{'profile':<19} {'record us':>10} {'p99 us':>8} {'drain ms':>9} {'request ms':>11} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profile or PROFILES:
+            sink = SlowFile(os.path.join(directory, f'{profile}.log'), delay)
+            record_mean, record_p99, drained = per_record(profile, args.records, sink)
+            database_uri = f"sqlite:///{os.path.join(directory, f'{profile}.db')}"
+            request_mean, request_p99 = per_request(profile, args.requests, sink, database_uri)
+            sink.close()
+            print(f"{profile:<19} {record_mean:>10.1f} {record_p99:>8.1f} {drained * 1000:>9.0f} "
+                  f"{request_mean:>11.2f} {request_p99:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: FTS5 search latency over a large synthetic mailbox
+
+Fills an FTS5 index with generated emails and times ranked, snippet-highlighted
+queries through SearchIndex.search.
+
+Usage:
+    python -m benchmarks.bench_search [--rows 200000]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import Integer, String, create_engine, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from application.database import SearchIndex
+
+WORDS = ('invoice', 'meeting', 'project', 'agent', 'newsletter', 'payment', 'schedule', 'report',
+         'dataset', 'model', 'release', 'interview', 'offer', 'crypto', 'python', 'deadline',
+         'update', 'review', 'quarter', 'budget', 'launch', 'feedback', 'contract', 'travel')
+
+
+def make_vocabulary(rng, size=30000):
+    """Real words first (most frequent), then random filler words"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    filler = {''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)}
+    return list(WORDS) + sorted(filler - set(WORDS))
+
+
+def zipf_weights(size):
+    """Word frequencies following Zipf's law, like natural language"""
+    return [1 / rank for rank in range(1, size + 1)]
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Email(Base):
+    __tablename__ = 'email'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    subject: Mapped[str] = mapped_column(String(200))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(rng)
+    # Skip the real words at the very top so they behave like mid-frequency terms
+    weights = zipf_weights(len(vocabulary))
+    weights = weights[200:200 + len(WORDS)] + weights[:len(vocabulary) - len(WORDS)]
+    cum_weights = list(itertools.accumulate(weights))
+
+    def words(count):
+        return ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+
+    documents = [{
+        'id': row_id,
+        'subject': words(6),
+        'sender': f'user{rng.randint(1, 5000)}@example.com',
+        'body': words(rng.randint(50, 300)),
+    } for row_id in range(1, args.rows + 1)]
+    insert_sql = text("INSERT INTO email_fts (rowid, subject, sender, body) VALUES (:id, :subject, :sender, :body)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}")
+        index = SearchIndex('email_fts', Email, lambda email: {}, watched_attrs=())
+
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            index.create(conn)
+            for offset in range(0, len(documents), 5000):
+                conn.execute(insert_sql, documents[offset:offset + 5000])
+            conn.execute(text("INSERT INTO email_fts (email_fts) VALUES ('optimize')"))
+        print(f"Indexed {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        queries = ['user42', 'invoice', 'invoice deadline', 'contract offer interview', 'crypt', 'budget quarter report']
+        with Session(engine) as session:
+            for query in queries:
+                timings = []
+                for page in range(5):
+                    start = time.perf_counter()
+                    results = index.search(session, query, limit=20, offset=page * 20)
+                    timings.append((time.perf_counter() - start) * 1000)
+                print(f"{query!r:28} results/page={len(results):3}  "
+                      f"median={statistics.median(timings):7.2f} ms  max={max(timings):7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
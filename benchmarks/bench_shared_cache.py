@@ -0,0 +1,144 @@
+"""
+Benchmark: the shared SQLite cache against a per-process dict
+
+Three measurements:
+
+    per operation   get (hit and miss), set and incr in one thread, next to
+                    the same dict operations
+    hit rate        worker processes looking up Zipf-distributed keys; a miss
+                    costs --miss-ms (standing in for an OpenAI answer or a
+                    render) and is stored. Each worker's own dict warms
+                    separately; the shared cache warms once for all of them
+    contention      worker processes doing 90% gets and 10% sets at once
+
+Usage:
+    python -m benchmarks.bench_shared_cache [--workers 4] [--lookups 500] [--keys 200] [--miss-ms 20]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from application.utils.shared_cache import SharedCache
+
+VALUE = 'An answer of a few sentences, about the size of a cached chat reply. ' * 12
+
+
+def per_operation(path, repeat=20000):
+    """Microseconds per call"""
+    cache = SharedCache(path, default_ttl=None)
+    local = {}
+    for n in range(1000):
+        cache.set(f'key{n}', VALUE)
+        local[f'key{n}'] = VALUE
+
+    def timed(operation):
+        started = time.perf_counter()
+        for n in range(repeat):
+            operation(n)
+        return (time.perf_counter() - started) / repeat * 1e6
+
+    return [
+        ('dict get', timed(lambda n: local.get(f'key{n % 1000}'))),
+        ('dict set', timed(lambda n: local.__setitem__(f'key{n % 1000}', VALUE))),
+        ('shared get (hit)', timed(lambda n: cache.get(f'key{n % 1000}'))),
+        ('shared get (miss)', timed(lambda n: cache.get(f'absent{n}'))),
+        ('shared set', timed(lambda n: cache.set(f'key{n % 1000}', VALUE))),
+        ('shared incr', timed(lambda n: cache.incr(f'counter{n % 10}'))),
+    ]
+
+
+def zipf_keys(seed, count, keys):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    return rng.choices(range(keys), weights, k=count)
+
+
+def hit_rate_worker(seed, path, lookups, keys, miss_seconds, results):
+    cache = SharedCache(path, default_ttl=None) if path else {}
+    hits = 0
+    started = time.perf_counter()
+    for key in zipf_keys(seed, lookups, keys):
+        value = cache.get(f'answer{key}')
+        if value is None:
+            time.sleep(miss_seconds)
+            if path:
+                cache.set(f'answer{key}', VALUE)
+            else:
+                cache[f'answer{key}'] = VALUE
+        else:
+            hits += 1
+    results.put((hits, time.perf_counter() - started))
+
+
+def contention_worker(seed, path, seconds, results):
+    cache = SharedCache(path, default_ttl=None)
+    rng = random.Random(seed)
+    gets, sets, slowest = 0, 0, 0.0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        key = f'key{rng.randrange(1000)}'
+        started = time.perf_counter()
+        if rng.random() < 0.9:
+            cache.get(key)
+            gets += 1
+        else:
+            cache.set(key, VALUE)
+            sets += 1
+        slowest = max(slowest, time.perf_counter() - started)
+    results.put((gets, sets, slowest))
+
+
+def run_processes(target, argument_sets):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=target, args=(*arguments, results)) for arguments in argument_sets]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return collected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--lookups', type=int, default=500, help='per worker')
+    parser.add_argument('--keys', type=int, default=200, help='distinct keys (Zipf-distributed)')
+    parser.add_argument('--miss-ms', type=float, default=20, help='cost of computing a missing value')
+    parser.add_argument('--seconds', type=float, default=3, help='contention run length')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Per operation ({len(VALUE)} character values)")
+        for name, micros in per_operation(os.path.join(directory, 'ops.sqlite3')):
+            print(f"  {name:<18} {micros:>8.2f} us")
+
+        print(f"\nHit rate: {args.workers} workers x {args.lookups} lookups over {args.keys} keys, "
+              f"{args.miss_ms:g}ms per miss")
+        for name, path in (('per-worker dict', None), ('shared cache', os.path.join(directory, 'hits.sqlite3'))):
+            collected = run_processes(hit_rate_worker, [
+                (seed, path, args.lookups, args.keys, args.miss_ms / 1000) for seed in range(args.workers)
+            ])
+            hits = sum(hits for hits, _ in collected)
+            slowest = max(elapsed for _, elapsed in collected)
+            print(f"  {name:<18} hit rate {hits / (args.workers * args.lookups):>6.1%}   "
+                  f"misses {args.workers * args.lookups - hits:>5}   slowest worker {slowest:.2f}s")
+
+        print(f"\nContention: {args.workers} workers, 90% get / 10% set, {args.seconds:g}s")
+        path = os.path.join(directory, 'contention.sqlite3')
+        warm = SharedCache(path, default_ttl=None)
+        for n in range(1000):
+            warm.set(f'key{n}', VALUE)
+        collected = run_processes(contention_worker, [(seed, path, args.seconds) for seed in range(args.workers)])
+        gets = sum(gets for gets, _, _ in collected)
+        sets = sum(sets for _, sets, _ in collected)
+        print(f"  {(gets + sets) / args.seconds:,.0f} ops/s ({gets / args.seconds:,.0f} gets, "
+              f"{sets / args.seconds:,.0f} sets), slowest op {max(s for _, _, s in collected) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark: bytes per SPA navigation, full page vs content fragment
+
+Requests every page the way the SPA router does and compares the response
+with the full page it used to receive, raw and gzipped. The app runs in the
+production configuration on a temporary database.
+
+Usage:
+    python -m benchmarks.bench_spa_navigation
+"""
+import gzip
+import os
+import tempfile
+
+from application import create_app
+from application.extensions import page_cache
+
+PAGES = ('/', '/about', '/projects', '/games', '/cat-cafe', '/contact')
+SPA_HEADERS = {'X-SPA-Request': 'true', 'X-Requested-With': 'XMLHttpRequest'}
+
+
+def sizes(body):
+    return len(body), len(gzip.compress(body, compresslevel=6, mtime=0))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app('production', {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'bench.db')}"})
+        page_cache.clear()
+        report(app.test_client())
+
+
+def report(client):
+    totals = [0, 0, 0, 0]
+
+    print(f"{'Route':<12}{'Full page':>12}{'gzip':>10}{'Fragment':>12}{'gzip':>10}  Saved")
+    for path in PAGES:
+        full = sizes(client.get(path).data)
+        fragment = sizes(client.get(path, headers=SPA_HEADERS).data)
+        for i, size in enumerate(full + fragment):
+            totals[i] += size
+        print(f"{path:<12}{full[0]:>12,}{full[1]:>10,}{fragment[0]:>12,}{fragment[1]:>10,}"
+              f"  {1 - fragment[0] / full[0]:.0%}")
+    print(f"{'Total':<12}{totals[0]:>12,}{totals[1]:>10,}{totals[2]:>12,}{totals[3]:>10,}"
+          f"  {1 - totals[2] / totals[0]:.0%}")
+
+
+if __name__ == '__main__':
+    main()
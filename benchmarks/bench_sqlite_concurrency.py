@@ -0,0 +1,168 @@
+"""
+Benchmark: concurrent webhook writes and dashboard reads on one SQLite file
+
+Worker processes, each with its own app and threads like a gunicorn gthread
+worker, post SendGrid webhooks and load the admin dashboard and JSON list
+against a shared temporary database. Each engine profile is run in turn and
+reports throughput, latency percentiles and failed requests (a "database is
+locked" error surfaces as a 500).
+
+Profiles:
+    rollback-journal  DELETE journal, synchronous=FULL, reads through the writer
+    wal               WAL and the tuned pragmas, reads through the writer
+    wal-split         WAL plus the read-only pool (the production default)
+
+Usage:
+    python -m benchmarks.bench_sqlite_concurrency [--seconds 5] [--writers 2] [--readers 2] [--threads 4]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+from application.config import Config
+
+PROFILES = {
+    'rollback-journal': {
+        'SQLITE_PRAGMAS': {**Config.SQLITE_PRAGMAS, 'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+        'SQLITE_READ_POOL_SIZE': 0,
+    },
+    'wal': {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS, 'SQLITE_READ_POOL_SIZE': 0},
+    'wal-split': {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS, 'SQLITE_READ_POOL_SIZE': Config.SQLITE_READ_POOL_SIZE},
+}
+
+READ_PATHS = ('/admin/dashboard', '/admin/api/emails')
+# Basic auth for bench:bench, the admin credentials each worker sets
+ADMIN_ENV = {'ADMIN_USERNAME': 'bench', 'ADMIN_PASSWORD': 'bench', 'ADMIN_PASSWORD_HASH': ''}
+ADMIN_HEADERS = {'Authorization': 'Basic YmVuY2g6YmVuY2g='}
+
+
+def build_app(database_uri, profile):
+    from application import create_app
+    return create_app('production', {'SQLALCHEMY_DATABASE_URI': database_uri, **PROFILES[profile]})
+
+
+def seed(database_uri, profile, rows):
+    """Migrate the database and fill it with emails"""
+    from datetime import datetime, timedelta
+    from application.extensions import db
+    from application.models import InboundEmail, init_db
+
+    # Seeded in the profile under test: WAL is a property of the file
+    app = build_app(database_uri, profile)
+    with app.app_context():
+        init_db()
+        start = datetime(2024, 1, 1)
+        db.session.add_all(
+            InboundEmail(from_email=f'sender{i}@example.com', to_email='hello@reply.josefinhao.com',
+                         subject=f'Seed message {i}', text_content='Hello there ' * 40,
+                         received_at=start + timedelta(minutes=i), dedup_key=f'seed-{i}')
+            for i in range(rows)
+        )
+        db.session.commit()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def run_worker(kind, database_uri, profile, threads, seconds, results):
+    """One worker process: `threads` threads issuing requests until the deadline"""
+    logging.disable(logging.WARNING)
+    os.environ.update(ADMIN_ENV)
+    app = build_app(database_uri, profile)
+    deadline = time.monotonic() + seconds
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def loop():
+        client = app.test_client()
+        done, errors = [], 0
+        n = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            if kind == 'write':
+                response = client.post('/webhook/sendgrid', data={
+                    'from': 'bench@example.com', 'to': 'hello@reply.josefinhao.com',
+                    'subject': 'Benchmark', 'text': 'Body ' * 100, 'headers': f'Message-ID: <{uuid.uuid4()}>',
+                })
+            else:
+                response = client.get(READ_PATHS[n % len(READ_PATHS)], headers=ADMIN_HEADERS)
+            done.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+            n += 1
+        with lock:
+            latencies.extend(done)
+            failures.append(errors)
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((kind, latencies, sum(failures)))
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run_profile(profile, database_uri, args):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_worker, args=(kind, database_uri, profile, args.threads, args.seconds, results))
+        for kind, count in (('write', args.writers), ('read', args.readers))
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for kind in ('write', 'read'):
+        latencies = [value for k, values, _ in collected if k == kind for value in values]
+        failures = sum(f for k, _, f in collected if k == kind)
+        summary[kind] = {
+            'requests': len(latencies),
+            'per_sec': len(latencies) / args.seconds,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            'failed': failures,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--writers', type=int, default=2, help='writer processes')
+    parser.add_argument('--readers', type=int, default=2, help='reader processes')
+    parser.add_argument('--threads', type=int, default=4, help='threads per process')
+    parser.add_argument('--rows', type=int, default=2000, help='emails seeded before each profile')
+    parser.add_argument('--profile', choices=sorted(PROFILES), action='append')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{args.writers}x{args.threads} webhook writers, {args.readers}x{args.threads} dashboard readers, "
+          f"{args.seconds:g}s per profile, {args.rows} seeded rows")
+    print(f"{'profile':<18} {'kind':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'failed':>7}")
+
+    for profile in args.profile or PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            database_uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            seed(database_uri, profile, args.rows)
+            summary = run_profile(profile, database_uri, args)
+        for kind, row in summary.items():
+            print(f"{profile:<18} {kind:<6} {row['per_sec']:>8.1f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                  f"{row['mean_ms']:>8.1f} {row['failed']:>7}")
+
+
+if __name__ == '__main__':
+    main()
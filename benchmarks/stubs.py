@@ -0,0 +1,117 @@
+"""
+Local stand-ins for external services, for benchmarks that run the real app
+
+StubOpenAI answers /v1/chat/completions with a streamed completion paced
+like a real model. Point the app at it with OPENAI_BASE_URL=stub.base_url
+and any OPENAI_API_KEY.
+
+StubSendGrid accepts /v3/mail/send after a delay and counts the messages.
+Point the app at it with SENDGRID_API_HOST=stub.base_url and any
+SENDGRID_API_KEY.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        try:
+            for i in range(server.chunks):
+                time.sleep(server.delay)
+                self._event({'choices': [{'index': 0, 'delta': {'content': f'word{i} '}, 'finish_reason': None}]},
+                            request)
+            self._event({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}, request)
+            self.wfile.write(b'data: [DONE]\n\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _event(self, body, request):
+        body.update(id='chatcmpl-stub', object='chat.completion.chunk', created=0, model=request.get('model', 'stub'))
+        self.wfile.write(f"data: {json.dumps(body)}\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SendGridHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.received += 1
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubServer:
+    """Threaded HTTP server started and stopped as a context manager"""
+    handler = None
+    path = ''
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.server = ThreadingHTTPServer((host, port), self.handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubOpenAI(_StubServer):
+    """
+    Streaming chat completions server on a background thread
+
+    Args:
+        seconds: How long each completion takes to stream
+        chunks: Number of content chunks per completion
+    """
+    handler = _OpenAIHandler
+    path = '/v1'
+
+    def __init__(self, seconds=3.0, chunks=30, **kwargs):
+        super().__init__(**kwargs)
+        self.server.chunks = chunks
+        self.server.delay = seconds / chunks
+
+
+class StubSendGrid(_StubServer):
+    """
+    Mail send endpoint answering 202 after `delay` seconds
+
+    `received` counts the messages accepted so far.
+    """
+    handler = _SendGridHandler
+
+    def __init__(self, delay=0.15, **kwargs):
+        super().__init__(**kwargs)
+        self.server.delay = delay
+        self.server.received = 0
+        self.server.lock = threading.Lock()
+
+    @property
+    def received(self):
+        return self.server.received
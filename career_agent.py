@@ -4,36 +4,153 @@ Uses OpenAI API to intelligently answer questions about Josefin's background,
 experience, projects, and skills.
 """
 
+import hashlib
 import os
 import logging
-from openai import OpenAI
+import threading
+import time
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 
+class CircuitBreaker:
+    """
+    Stops calling OpenAI after repeated failures
+
+    After `failure_threshold` consecutive failures the breaker opens and chat
+    answers come from the fallback responses straight away, instead of every
+    request waiting for the API to fail. After `reset_timeout` seconds one
+    request is let through to try the API again (half-open): its success
+    closes the breaker, its failure opens it for another `reset_timeout`.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """Whether to call the API now"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            # One trial at a time; a trial that never reported back expires
+            now = self._clock()
+            if state == self.HALF_OPEN and (self._trial_at is None or now - self._trial_at >= self.reset_timeout):
+                self._trial_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_at = None
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = self._clock()
+
+    def to_dict(self) -> dict:
+        return {'state': self.state, 'consecutive_failures': self.failures}
+
+
+# Last 5 exchanges, each message cut to a sane length
+HISTORY_MESSAGES = 10
+HISTORY_MESSAGE_CHARS = 2000
+
+
+def clean_history(history) -> list:
+    """
+    The visitor's earlier messages, in the form the API takes
+
+    The chat widget keeps its own conversation and sends it with each
+    question (the agent is shared by every visitor, so it keeps none). Only
+    user and assistant messages with text are kept, the last
+    HISTORY_MESSAGES of them, each cut to HISTORY_MESSAGE_CHARS.
+    """
+    if not isinstance(history, list):
+        return []
+    messages = [
+        {"role": message["role"], "content": message["content"][:HISTORY_MESSAGE_CHARS]}
+        for message in history
+        if isinstance(message, dict) and message.get("role") in ("user", "assistant")
+        and isinstance(message.get("content"), str) and message["content"].strip()
+    ]
+    return messages[-HISTORY_MESSAGES:]
+
+
 class CareerAgent:
     """
     AI-powered career agent that answers questions about Josefin Hao
     using OpenAI's chat completion API with comprehensive context.
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, answer_cache=None, answer_ttl: float = 3600):
         """
         Initialize the Career Agent with OpenAI API key.
 
         Args:
             api_key: OpenAI API key (defaults to OPENAI_API_KEY env var)
+            answer_cache: Cache with get/set (e.g. the shared cache) for API
+                answers, so a repeated question skips OpenAI in every worker
+            answer_ttl: Seconds an answer is reused; 0 disables the cache
         """
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         if not self.api_key:
             logger.warning("OpenAI API key not found. Career Agent will use fallback responses.")
-            self.client = None
-        else:
-            self.client = OpenAI(api_key=self.api_key)
+
+        # The OpenAI client is built on first use (see `client`)
+        self._client = None
+        self._client_pid = None
+        self.breaker = CircuitBreaker()
 
         self.model = "gpt-4o-mini"  # Fast and cost-effective
-        self.conversation_history = []
+        self.answer_cache = answer_cache
+        self.answer_ttl = answer_ttl
+
+    @property
+    def client(self):
+        """
+        OpenAI client, created on first use in the current process
+
+        Importing openai is the slowest part of booting the app, and its HTTP
+        connection pool must not be shared across a fork, so the client is
+        built lazily and rebuilt in a forked worker.
+        """
+        if not self.api_key:
+            return None
+        if self._client is None or self._client_pid != os.getpid():
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def reset_client(self):
+        """Forget the OpenAI client (and its connections); the next use builds a new one"""
+        self._client = None
+        self._client_pid = None
 
     @property
     def system_prompt(self) -> str:
@@ -66,40 +183,34 @@ CONTACT: josefin.rui.hao@gmail.com | Use contact form on website
 
 Keep responses concise (2-4 sentences), friendly, professional. Emphasize multi-agent AI expertise and data analytics automation. Don't make up info."""
 
-    def chat(self, user_message: str, reset_history: bool = False) -> str:
+    def chat(self, user_message: str, history=None) -> str:
         """
         Process a user message and return an AI-generated response.
 
         Args:
             user_message: The user's question or message
-            reset_history: If True, clears conversation history
+            history: The visitor's conversation so far, as sent by the chat
+                widget (see clean_history); None for a first question
 
         Returns:
             AI-generated response string
         """
-        if reset_history:
-            self.conversation_history = []
+        history = clean_history(history)
 
-        # If no API key, use fallback
-        if not self.client:
+        # A first question's answer is shared by every visitor who asks it
+        cached = None if history else self._cached_answer(user_message)
+        if cached is not None:
+            return cached
+
+        # If no API key, or OpenAI has been failing, use fallback
+        if not self.client or not self.breaker.allow_request():
             return self._fallback_response(user_message)
 
         try:
-            # Add user message to history
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message
-            })
-
-            # Prepare messages for API call
-            messages = [
-                {"role": "system", "content": self.system_prompt}
-            ] + self.conversation_history
-
             # Call OpenAI API
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=self._messages(user_message, history),
                 temperature=0.7,
                 max_tokens=200,  # Optimized for speed
                 top_p=1,
@@ -110,59 +221,48 @@ Keep responses concise (2-4 sentences), friendly, professional. Emphasize multi-
             # Extract response
             assistant_message = response.choices[0].message.content
 
-            # Add to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message
-            })
-
-            # Keep history manageable (last 5 exchanges = 10 messages)
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
-
             logger.info(f"Career Agent response generated for: {user_message[:50]}...")
+            self.breaker.record_success()
+            if not history:
+                self._store_answer(user_message, assistant_message)
 
             return assistant_message
 
         except Exception as e:
             logger.error(f"Error in Career Agent: {str(e)}", exc_info=True)
+            self.breaker.record_failure()
             return self._fallback_response(user_message)
 
-    def chat_stream(self, user_message: str, reset_history: bool = False):
+    def chat_stream(self, user_message: str, history=None):
         """
         Process a user message and stream the AI-generated response.
 
         Args:
             user_message: The user's question or message
-            reset_history: If True, clears conversation history
+            history: The visitor's conversation so far, as sent by the chat
+                widget (see clean_history); None for a first question
 
         Yields:
             Chunks of the AI-generated response as they arrive
         """
-        if reset_history:
-            self.conversation_history = []
+        history = clean_history(history)
 
-        # If no API key, use fallback
-        if not self.client:
+        # A first question's answer is shared by every visitor who asks it: sent as one chunk, no API call
+        cached = None if history else self._cached_answer(user_message)
+        if cached is not None:
+            yield cached
+            return
+
+        # If no API key, or OpenAI has been failing, use fallback
+        if not self.client or not self.breaker.allow_request():
             yield self._fallback_response(user_message)
             return
 
         try:
-            # Add user message to history
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message
-            })
-
-            # Prepare messages for API call
-            messages = [
-                {"role": "system", "content": self.system_prompt}
-            ] + self.conversation_history
-
             # Call OpenAI API with streaming
             stream = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=self._messages(user_message, history),
                 temperature=0.7,
                 max_tokens=200,
                 top_p=1,
@@ -179,22 +279,42 @@ Keep responses concise (2-4 sentences), friendly, professional. Emphasize multi-
                     full_response += content
                     yield content
 
-            # Add complete response to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": full_response
-            })
-
-            # Keep history manageable
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
-
             logger.info(f"Career Agent streamed response for: {user_message[:50]}...")
+            self.breaker.record_success()
+            if not history:
+                self._store_answer(user_message, full_response)
 
         except Exception as e:
             logger.error(f"Error in Career Agent streaming: {str(e)}", exc_info=True)
+            self.breaker.record_failure()
             yield self._fallback_response(user_message)
 
+    def _messages(self, user_message: str, history: list) -> list:
+        """The system prompt, the earlier exchanges and the new question"""
+        return ([{"role": "system", "content": self.system_prompt}] + history
+                + [{"role": "user", "content": user_message}])
+
+    def _answer_key(self, user_message: str) -> str:
+        # Same question (case and spacing aside), same model and prompt
+        question = ' '.join(user_message.lower().split())
+        digest = hashlib.sha256(f"{self.model}\n{self.system_prompt}\n{question}".encode('utf-8')).hexdigest()
+        return f"chat-answer:{digest}"
+
+    def _cached_answer(self, user_message: str) -> Optional[str]:
+        """
+        A stored API answer to the same question, if any
+
+        Keyed on the question alone, so it is only used for a first question;
+        a follow-up's answer depends on the exchanges before it.
+        """
+        if self.answer_cache is None or not self.answer_ttl:
+            return None
+        return self.answer_cache.get(self._answer_key(user_message))
+
+    def _store_answer(self, user_message: str, answer: str):
+        if self.answer_cache is not None and self.answer_ttl and answer:
+            self.answer_cache.set(self._answer_key(user_message), answer, ttl=self.answer_ttl)
+
     def _fallback_response(self, message: str) -> str:
         """Fallback response system when OpenAI API is unavailable"""
         message_lower = message.lower()
@@ -231,28 +351,25 @@ Keep responses concise (2-4 sentences), friendly, professional. Emphasize multi-
         return ("I can share about my background (quant → trader → crypto data scientist → AI engineer), "
                 "my 10+ multi-agent AI projects, technical skills, or how to contact me. What would you like to know?")
 
-    def reset_conversation(self):
-        """Clear conversation history"""
-        self.conversation_history = []
-        logger.info("Career Agent conversation history reset")
-
 
 # Global instance (initialized in app.py)
 career_agent = None
 
 
-def init_career_agent(api_key: Optional[str] = None) -> CareerAgent:
+def init_career_agent(api_key: Optional[str] = None, answer_cache=None, answer_ttl: float = 3600) -> CareerAgent:
     """
     Initialize the global career agent instance.
 
     Args:
         api_key: OpenAI API key (optional)
+        answer_cache: Cache for API answers (optional, see CareerAgent)
+        answer_ttl: Seconds an answer is reused; 0 disables the cache
 
     Returns:
         CareerAgent instance
     """
     global career_agent
-    career_agent = CareerAgent(api_key=api_key)
+    career_agent = CareerAgent(api_key=api_key, answer_cache=answer_cache, answer_ttl=answer_ttl)
     logger.info("Career Agent initialized")
     return career_agent
 
@@ -0,0 +1,92 @@
+"""
+Gunicorn configuration
+
+`gunicorn app:app` picks this file up from the project root. Chat answers
+are streamed (/api/chat holds its connection open for as long as OpenAI
+generates), so the default profile runs threaded workers: a stream occupies
+one thread, not a whole worker, and page requests keep being served next to it.
+
+Environment:
+    GUNICORN_WORKER_CLASS   gthread (default), gevent (needs `pip install gevent`) or sync
+    WEB_CONCURRENCY         Worker processes (default: CPU count, at least 2; sync: 2 x CPUs + 1)
+    GUNICORN_THREADS        Threads per gthread worker (default: 8)
+    GUNICORN_CONNECTIONS    Concurrent connections per gevent worker (default: 200)
+    GUNICORN_TIMEOUT        Seconds before a silent worker is restarted (default: 60)
+    GUNICORN_MAX_REQUESTS   Recycle a worker after this many requests, 0 to never (default: 2000)
+    GUNICORN_PRELOAD        Import the app once in the master (default: true; off for gevent)
+    GUNICORN_BIND           Address to listen on (default: 0.0.0.0:$PORT, PORT defaults to 10000)
+"""
+import importlib.util
+import os
+import sys
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _cpu_count():
+    # Honours CPU affinity / container limits where the platform exposes them
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+cpus = _cpu_count()
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+    # Not a hard dependency - fall back rather than fail to boot
+    print('gunicorn.conf.py: gevent is not installed, using gthread workers', file=sys.stderr)
+    worker_class = 'gthread'
+
+if worker_class == 'sync':
+    # One request per worker; a chat stream blocks its worker until it ends
+    workers = _env_int('WEB_CONCURRENCY', 2 * cpus + 1)
+else:
+    # Threads and greenlets provide the concurrency; processes only need to use the CPUs
+    workers = _env_int('WEB_CONCURRENCY', max(2, cpus))
+threads = _env_int('GUNICORN_THREADS', 8) if worker_class == 'gthread' else 1
+worker_connections = _env_int('GUNICORN_CONNECTIONS', 200)
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '10000')}")
+
+# For gthread and gevent workers this is a heartbeat, not a per-request limit,
+# so long streams are not killed; for sync workers it caps each request
+timeout = _env_int('GUNICORN_TIMEOUT', 60)
+# Time a recycled worker gets to finish in-flight streams
+graceful_timeout = 30
+keepalive = 5
+
+# Recycling bounds slow memory growth; the jitter keeps workers from restarting together
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = max_requests // 10
+
+# Monkey patching after the app is imported breaks gevent, so it loads per worker
+preload_app = os.environ.get('GUNICORN_PRELOAD', str(worker_class != 'gevent')).lower() == 'true'
+
+# Heartbeat files on tmpfs, so a slow disk can't make workers look hung
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def when_ready(server):
+    # Runs in the master before any worker is forked. Import the OpenAI SDK
+    # here once, so every worker (including recycled ones) inherits it instead
+    # of importing it on its first chat request; no client or connection exists yet
+    if preload_app and os.environ.get('OPENAI_API_KEY'):
+        import openai  # noqa: F401
+    server.log.info(f"{workers} {worker_class} workers"
+                    + (f" x {threads} threads" if worker_class == 'gthread' else '')
+                    + (' (preloaded)' if preload_app else ''))
+
+
+def post_fork(server, worker):
+    # The preloaded app's database pools and OpenAI client belong to the master
+    if preload_app:
+        from application import reset_after_fork
+        reset_after_fork()
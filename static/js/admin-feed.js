@@ -0,0 +1,105 @@
+/**
+ * Admin Dashboard Live Feed
+ * Adds new contact messages and inbound emails to the dashboard as they arrive,
+ * from the /admin/feed/stream Server-Sent Events endpoint
+ */
+
+(function() {
+    'use strict';
+
+    // Timestamps as the dashboard renders them: 2024-01-02 09:30 UTC
+    function formatTime(iso) {
+        return iso ? iso.slice(0, 16).replace('T', ' ') + ' UTC' : 'Unknown';
+    }
+
+    function element(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) {
+            node.className = className;
+        }
+        if (text !== undefined) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    function metaLine(meta, label, value) {
+        meta.appendChild(element('strong', null, label + ':'));
+        meta.appendChild(document.createTextNode(' ' + value));
+        meta.appendChild(document.createElement('br'));
+    }
+
+    // Same markup as the server-rendered items in admin_dashboard.html
+    function renderItem(kind, item) {
+        const entry = element('div', 'email-item');
+        const heading = element('h3');
+        const link = element('a', null, item.subject);
+        link.href = item.url;
+        link.setAttribute('data-no-spa', '');
+        heading.appendChild(link);
+        entry.appendChild(heading);
+
+        const meta = element('div', 'email-meta');
+        if (kind === 'message') {
+            metaLine(meta, 'From', item.name + ' (' + item.email + ')');
+            metaLine(meta, 'Received', formatTime(item.created_at));
+        } else {
+            metaLine(meta, 'From', item.from);
+            metaLine(meta, 'To', item.to);
+            metaLine(meta, 'Received', formatTime(item.received_at));
+        }
+        entry.appendChild(meta);
+        entry.appendChild(element('div', 'email-preview',
+            item.preview || (kind === 'message' ? '' : 'No text content')));
+        return entry;
+    }
+
+    function addItem(section, kind, item) {
+        let list = section.querySelector('.email-list');
+        if (!list) {
+            const empty = section.querySelector('.empty-state');
+            list = element('div', 'email-list');
+            if (empty) {
+                empty.replaceWith(list);
+            } else {
+                section.appendChild(list);
+            }
+        }
+        list.prepend(renderItem(kind, item));
+
+        const count = section.querySelector('[data-feed-count]');
+        if (count) {
+            count.textContent = parseInt(count.textContent, 10) + 1;
+        }
+    }
+
+    function initAdminFeed() {
+        const root = document.querySelector('[data-feed-url]');
+        if (!root || !window.EventSource) {
+            return;
+        }
+
+        // EventSource reconnects by itself, resuming from the last event id
+        const source = new EventSource(root.dataset.feedUrl);
+        ['message', 'email'].forEach(kind => {
+            source.addEventListener(kind, function(event) {
+                // The SPA router swapped the dashboard out
+                if (!document.contains(root)) {
+                    source.close();
+                    return;
+                }
+                const section = root.querySelector(`[data-feed-kind="${kind}"]`);
+                if (section) {
+                    addItem(section, kind, JSON.parse(event.data));
+                }
+            });
+        });
+    }
+
+    // Initialize when DOM is ready
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', initAdminFeed);
+    } else {
+        initAdminFeed();
+    }
+})();
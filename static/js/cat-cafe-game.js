@@ -118,6 +118,22 @@
         }
     }
 
+    /**
+     * Resolve an image path to its resized derivative, if the page provided one
+     */
+    function imageUrl(path) {
+        const container = document.querySelector('.cat-cafe-container');
+        if (container && container.dataset.images) {
+            try {
+                const urls = JSON.parse(container.dataset.images);
+                return urls[path] || path;
+            } catch (e) {
+                console.warn('Invalid image URL map, using original images');
+            }
+        }
+        return path;
+    }
+
     function loadImages(callback) {
         let loadedCount = 0;
         const totalImages = 5;
@@ -141,7 +157,7 @@
             console.error('Background image failed to load:', e);
             imageLoaded();
         };
-        game.images.background.src = '/static/images/cat_cafe.png';
+        game.images.background.src = imageUrl('/static/images/cat_cafe.png');
         console.log('Loading cat cafe background from:', game.images.background.src);
 
         // Load cat image - local custom cat PNG
@@ -151,7 +167,7 @@
             console.log('Cat image failed to load, using fallback');
             imageLoaded();
         };
-        game.images.cat.src = '/static/images/cat.png';
+        game.images.cat.src = imageUrl('/static/images/cat.png');
 
         // Load cat tree image - transparent PNG
         game.images.catTree = new Image();
@@ -1533,7 +1549,7 @@
             '/static/images/yarn_ball_orange.png',
             '/static/images/yarn_ball_green.png',
             '/static/images/yarn_ball_yellow.png'
-        ];
+        ].map(imageUrl);
 
         console.log('Loading yarn ball images...');
         let loadedCount = 0;
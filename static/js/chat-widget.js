@@ -6,6 +6,8 @@ class ChatWidget {
         this.chatInput = null;
         this.sendButton = null;
         this.isOpen = false;
+        // This visitor's conversation, sent with each question (the server keeps none)
+        this.history = [];
         this.init();
     }
 
@@ -85,7 +87,7 @@ class ChatWidget {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ message: message })
+                body: JSON.stringify({ message: message, history: this.history })
             });
 
             if (!response.ok) {
@@ -138,6 +140,10 @@ class ChatWidget {
             // If no content was received, show error
             if (!fullText) {
                 messageBubble.textContent = "I'm sorry, I couldn't process that request. Please try again.";
+            } else {
+                // Keep the last 5 exchanges, as the server does
+                this.history.push({ role: 'user', content: message }, { role: 'assistant', content: fullText });
+                this.history = this.history.slice(-10);
             }
 
         } catch (error) {
@@ -8,21 +8,48 @@ import sys
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 
 
 @pytest.fixture
-def app():
-    """Create and configure a test Flask application"""
-    from application.config import TestingConfig
+def make_app(tmp_path):
+    """
+    Build website apps with create_app('testing') or another config name
 
-    test_app = Flask(__name__)
-    test_app.config.from_object(TestingConfig)
-    test_app.config['TESTING'] = True
-    test_app.config['WTF_CSRF_ENABLED'] = False
+    Keyword arguments override the config. Each app gets its own database
+    file in tmp_path, so every connection sees the same data, unless
+    SQLALCHEMY_DATABASE_URI is given; migrate=True applies the migrations.
+    The page cache and learned preload hints are per process, so they are
+    emptied for each new app.
+    """
+    from application import create_app
+    from application.extensions import db as database, page_cache, site_assets
+    from application.models import init_db
 
-    return test_app
+    apps = []
+
+    def make(config_name='testing', migrate=False, **overrides):
+        overrides.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / f'app{len(apps)}.db'}")
+        test_app = create_app(config_name, overrides)
+        page_cache.clear()
+        site_assets.preload_hints._links.clear()
+        apps.append(test_app)
+        if migrate:
+            with test_app.app_context():
+                init_db()
+        return test_app
+
+    yield make
+    for test_app in apps:
+        with test_app.app_context():
+            database.session.remove()
+            for engine in database.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    """The website app in testing mode, on an unmigrated database file"""
+    return make_app()
 
 
 @pytest.fixture
@@ -33,17 +60,48 @@ def client(app):
 
 @pytest.fixture
 def db(app):
-    """Create test database"""
-    database = SQLAlchemy(app)
+    """The app's database with the migrations applied"""
+    from application.extensions import db as database
+    from application.models import init_db
 
     with app.app_context():
-        database.create_all()
+        init_db()
         yield database
         database.session.remove()
-        database.drop_all()
+
+
+class FakeClock:
+    """Stands in for time.monotonic; tests move it forward by setting `now`"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """A clock that only moves when the test advances it"""
+    return FakeClock()
 
 
 @pytest.fixture
 def runner(app):
     """Create a test CLI runner"""
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def admin_auth(monkeypatch):
+    """Basic-auth headers for the admin login admin:pw, with the per-process auth caches emptied"""
+    from application.utils import auth_utils
+
+    monkeypatch.delenv('ADMIN_PASSWORD_HASH', raising=False)
+    monkeypatch.setenv('ADMIN_USERNAME', 'admin')
+    monkeypatch.setenv('ADMIN_PASSWORD', 'pw')
+    auth_utils.credential_cache.clear()
+    auth_utils.failure_throttle.clear()
+    yield {'Authorization': 'Basic YWRtaW46cHc='}
+    auth_utils.credential_cache.clear()
+    auth_utils.failure_throttle.clear()
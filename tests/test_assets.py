@@ -0,0 +1,559 @@
+"""
+Tests for the static asset pipeline
+"""
+import gzip
+import json
+import os
+
+import pytest
+
+from flask import url_for
+from werkzeug.http import parse_accept_header
+
+from application.assets import (
+    BROTLI_AVAILABLE, CRITICAL_CSS_BUDGET, AssetManifest, BundleResolver, ImageManifest, build_bundles,
+    build_fingerprints, PreloadHints, build_image_derivatives, build_size_report, extract_critical_css,
+    format_size_report, link_header, over_budget, page_hints, precompress_files, send_static_file, set_immutable
+)
+from application.assets import bundles as bundles_module
+from application.assets.bundles import BUNDLE_DIR, minify_css
+from application.assets.critical import parse_blocks
+from application.assets.fingerprint import FINGERPRINT_DIR, KEEP_BUILDS, rewrite_css_urls
+from application.assets.images import MANIFEST_NAME, OUTPUT_DIR, PIL_AVAILABLE, derivative_widths
+from application.assets.precompress import negotiate_encoding
+from application.assets.report import measure_page, page_assets
+
+if PIL_AVAILABLE:
+    from PIL import Image as PIL
+
+requires_pil = pytest.mark.skipif(not PIL_AVAILABLE, reason='Pillow not installed')
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    """Static folder with a single 400x200 source image"""
+    os.makedirs(tmp_path / 'images')
+    if PIL_AVAILABLE:
+        PIL.new('RGBA', (400, 200), (200, 100, 50, 255)).save(tmp_path / 'images' / 'photo.png')
+    return str(tmp_path)
+
+
+SIZES = {'images/photo.png': (100, 300)}
+
+
+def read_manifest(static_folder):
+    with open(os.path.join(static_folder, OUTPUT_DIR, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+@requires_pil
+class TestImageDerivatives:
+    """Test building derivatives"""
+
+    def test_derivative_widths_cover_densities_without_upscaling(self):
+        """Each display width gets 1x and 2x, capped at the source width"""
+        assert derivative_widths((100, 300), 400) == [100, 200, 300, 400]
+
+    def test_build_writes_variants_and_manifest(self, static_folder):
+        """Every width is written in every format and recorded"""
+        result = build_image_derivatives(static_folder, SIZES)
+        assert result == {'built': ['images/photo.png'], 'skipped': []}
+
+        entry = read_manifest(static_folder)['images/photo.png']
+        assert (entry['width'], entry['height']) == (400, 200)
+        assert [width for width, _, _ in entry['variants']['png']] == [100, 200, 300, 400]
+        assert 'webp' in entry['variants']
+        for variants in entry['variants'].values():
+            for width, height, path in variants:
+                assert height == width // 2
+                assert os.path.exists(os.path.join(static_folder, path))
+
+    def test_unchanged_sources_are_skipped(self, static_folder):
+        """A second build with the same sources does no work"""
+        build_image_derivatives(static_folder, SIZES)
+        assert build_image_derivatives(static_folder, SIZES) == {'built': [], 'skipped': ['images/photo.png']}
+        assert build_image_derivatives(static_folder, SIZES, force=True)['built'] == ['images/photo.png']
+
+    def test_changed_source_is_rebuilt_and_old_outputs_removed(self, static_folder):
+        """Editing a source regenerates it under new file names"""
+        build_image_derivatives(static_folder, SIZES)
+        old_paths = [path for _, _, path in read_manifest(static_folder)['images/photo.png']['variants']['png']]
+
+        PIL.new('RGBA', (400, 200), (0, 0, 255, 255)).save(os.path.join(static_folder, 'images', 'photo.png'))
+        assert build_image_derivatives(static_folder, SIZES)['built'] == ['images/photo.png']
+
+        new_paths = [path for _, _, path in read_manifest(static_folder)['images/photo.png']['variants']['png']]
+        assert set(old_paths).isdisjoint(new_paths)
+        assert not any(os.path.exists(os.path.join(static_folder, path)) for path in old_paths)
+
+    def test_changed_sizes_rebuild(self, static_folder):
+        """Changing the configured widths counts as a change"""
+        build_image_derivatives(static_folder, SIZES)
+        assert build_image_derivatives(static_folder, {'images/photo.png': (50,)})['built'] == ['images/photo.png']
+
+
+@requires_pil
+class TestImageManifest:
+    """Test the template helpers"""
+
+    @pytest.fixture
+    def manifest_app(self, app, static_folder):
+        app.static_folder = static_folder
+        return app
+
+    def test_picture_markup(self, manifest_app, static_folder):
+        """<picture> lists modern formats before the PNG <img>"""
+        build_image_derivatives(static_folder, SIZES)
+        manifest = ImageManifest(static_folder)
+
+        with manifest_app.test_request_context():
+            html = str(manifest.picture('images/photo.png', 100, alt='A "photo"', class_='hero'))
+
+        assert html.startswith('<picture><source type="image/')
+        assert 'type="image/webp"' in html
+        assert html.index('image/webp') < html.index('<img')
+        assert 'photo-' in html and '-200w.webp 200w' in html
+        assert 'sizes="100px"' in html
+        assert 'width="100" height="50"' in html
+        assert 'alt="A &#34;photo&#34;"' in html
+        assert 'class="hero"' in html
+
+    def test_missing_manifest_falls_back_to_original(self, manifest_app, static_folder):
+        """Without a build, helpers point at the source image"""
+        manifest = ImageManifest(static_folder)
+
+        with manifest_app.test_request_context():
+            html = str(manifest.picture('images/photo.png', 100, 100, alt='Photo'))
+            url = manifest.url('images/photo.png', 100)
+
+        assert html == '<img src="/static/images/photo.png" alt="Photo" width="100" height="100" decoding="async">'
+        assert url == '/static/images/photo.png'
+
+    def test_url_picks_smallest_sufficient_width(self, manifest_app, static_folder):
+        """url() returns the first derivative at least as wide as requested"""
+        build_image_derivatives(static_folder, SIZES)
+        manifest = ImageManifest(static_folder)
+
+        with manifest_app.test_request_context():
+            assert manifest.url('images/photo.png', 150).endswith('-200w.webp')
+            assert manifest.url('images/photo.png', 1000).endswith('-400w.webp')
+            assert manifest.url('images/photo.png', 150, 'png').endswith('-200w.png')
+
+    def test_auto_reload_picks_up_new_build(self, manifest_app, static_folder):
+        """In development the manifest is re-read after a rebuild"""
+        manifest = ImageManifest(static_folder, auto_reload=True)
+        assert manifest.entries == {}
+
+        build_image_derivatives(static_folder, SIZES)
+        assert 'images/photo.png' in manifest.entries
+
+
+@pytest.fixture
+def asset_folder(tmp_path):
+    """Static folder with a stylesheet, a script and an image"""
+    for name, content in {
+        'css/style.css': "body { background: url('../images/bg.png'); }\n"
+                         ".hero { background: url(\"/static/images/bg.png?v=1\"); }\n"
+                         ".icon { background: url(data:image/png;base64,AAAA); }",
+        'js/app.js': "console.log('hi');",
+        'images/bg.png': 'not really a png',
+    }.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return str(tmp_path)
+
+
+class TestFingerprints:
+    """Test content-hashed static files"""
+
+    def test_build_copies_files_to_hashed_names(self, asset_folder):
+        """Each source gets a hashed copy under dist/static"""
+        manifest = build_fingerprints(asset_folder)
+
+        assert set(manifest) == {'css/style.css', 'js/app.js', 'images/bg.png'}
+        assert manifest['js/app.js'].startswith(f'{FINGERPRINT_DIR}/js/app.')
+        with open(os.path.join(asset_folder, manifest['js/app.js'])) as f:
+            assert f.read() == "console.log('hi');"
+
+    def test_hash_changes_with_content(self, asset_folder):
+        """Editing a file changes its URL; the old copy outlives the next KEEP_BUILDS builds"""
+        old = build_fingerprints(asset_folder)['js/app.js']
+        with open(os.path.join(asset_folder, 'js', 'app.js'), 'w') as f:
+            f.write("console.log('bye');")
+        new = build_fingerprints(asset_folder)['js/app.js']
+
+        assert new != old
+        assert os.path.exists(os.path.join(asset_folder, old))
+
+        for n in range(KEEP_BUILDS):
+            with open(os.path.join(asset_folder, 'js', 'app.js'), 'w') as f:
+                f.write(f"console.log({n});")
+            build_fingerprints(asset_folder)
+        assert os.path.exists(os.path.join(asset_folder, new))
+        assert not os.path.exists(os.path.join(asset_folder, old))
+
+    def test_unchanged_rebuilds_keep_the_history(self, asset_folder):
+        """Rebuilding without changes doesn't push earlier builds out"""
+        old = build_fingerprints(asset_folder)['js/app.js']
+        with open(os.path.join(asset_folder, 'js', 'app.js'), 'w') as f:
+            f.write("console.log('bye');")
+        for _ in range(KEEP_BUILDS + 1):
+            build_fingerprints(asset_folder)
+        assert os.path.exists(os.path.join(asset_folder, old))
+
+    def test_build_output_is_not_fingerprinted_again(self, asset_folder):
+        """Rebuilding doesn't pick up the previous build's output"""
+        first = build_fingerprints(asset_folder)
+        assert build_fingerprints(asset_folder) == first
+
+    def test_rebuild_keeps_precompressed_siblings(self, asset_folder):
+        """Compressed siblings of current files survive a rebuild"""
+        with open(os.path.join(asset_folder, 'js', 'app.js'), 'w') as f:
+            f.write('console.log("padding");\n' * 100)
+        hashed = build_fingerprints(asset_folder)['js/app.js']
+        precompress_files(asset_folder, [hashed])
+        build_fingerprints(asset_folder)
+        assert os.path.exists(os.path.join(asset_folder, hashed + '.gz'))
+
+    def test_css_urls_point_at_hashed_files(self, asset_folder):
+        """Stylesheet references are rewritten; the stylesheet hash covers them"""
+        manifest = build_fingerprints(asset_folder)
+        with open(os.path.join(asset_folder, manifest['css/style.css'])) as f:
+            css = f.read()
+
+        image = manifest['images/bg.png']
+        assert f"url('../images/{os.path.basename(image)}')" in css
+        assert f'url("/static/{image}?v=1")' in css
+        assert 'url(data:image/png;base64,AAAA)' in css
+
+    def test_unknown_css_urls_untouched(self):
+        """References to files outside the manifest are left alone"""
+        css = "a { background: url('../missing.png') } b { background: url(https://example.com/x.png) }"
+        assert rewrite_css_urls(css, 'css/style.css', {'css/style.css': 'dist/static/css/style.css'}) == css
+
+    def test_url_for_resolves_hashed_names(self, app, asset_folder):
+        """url_for('static') transparently uses the manifest"""
+        manifest = build_fingerprints(asset_folder)
+        assets = AssetManifest(asset_folder)
+        app.url_defaults(lambda endpoint, values: values.update(filename=assets.resolve(values['filename']))
+                         if endpoint == 'static' else None)
+
+        with app.test_request_context():
+            assert url_for('static', filename='js/app.js') == f"/static/{manifest['js/app.js']}"
+            assert url_for('static', filename='js/other.js') == '/static/js/other.js'
+        assert manifest['js/app.js'] in assets.hashed_paths
+
+    def test_disabled_manifest_passes_through(self, asset_folder):
+        """Development mode serves source files directly"""
+        build_fingerprints(asset_folder)
+        assets = AssetManifest(asset_folder, enabled=False)
+        assert assets.resolve('js/app.js') == 'js/app.js'
+
+    def test_set_immutable(self, app):
+        """Hashed responses are cacheable for a year without revalidation"""
+        response = set_immutable(app.response_class('x'))
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+
+@pytest.fixture
+def compressed_folder(tmp_path):
+    """Static folder with a large stylesheet and a small script, precompressed"""
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body { color: #333; margin: 0 auto; }\n' * 200)
+    (tmp_path / 'tiny.js').write_text('x = 1;')
+    precompress_files(str(tmp_path), ['css/site.css', 'tiny.js'])
+    return str(tmp_path)
+
+
+@pytest.fixture
+def static_app(app, compressed_folder):
+    """App whose static view serves precompressed siblings"""
+    app.static_folder = compressed_folder
+    app.view_functions['static'] = send_static_file
+    return app
+
+
+class TestPrecompress:
+    """Test precompressed static serving"""
+
+    def test_writes_siblings_for_large_text_files(self, compressed_folder):
+        """Large text files get decompressible siblings; small files are skipped"""
+        path = os.path.join(compressed_folder, 'css', 'site.css')
+        with open(path, 'rb') as f, open(path + '.gz', 'rb') as gz:
+            assert gzip.decompress(gz.read()) == f.read()
+        assert os.path.exists(path + '.br') == BROTLI_AVAILABLE
+        assert not os.path.exists(os.path.join(compressed_folder, 'tiny.js.gz'))
+
+    def test_report_sizes(self, compressed_folder):
+        """Existing siblings are reported without being rewritten"""
+        report = precompress_files(compressed_folder, ['css/site.css', 'tiny.js'])
+        assert list(report) == ['css/site.css']
+        assert report['css/site.css']['.gz'] < report['css/site.css']['identity']
+
+    def test_negotiate_encoding(self):
+        """Highest client quality wins, br breaks ties"""
+        def accept(header):
+            return parse_accept_header(header)
+
+        available = {'br': '.br', 'gzip': '.gz'}
+        assert negotiate_encoding(accept('gzip, deflate, br'), available) == 'br'
+        assert negotiate_encoding(accept('gzip;q=1.0, br;q=0.5'), available) == 'gzip'
+        assert negotiate_encoding(accept('br;q=0, gzip;q=0'), available) is None
+        assert negotiate_encoding(accept(''), available) is None
+        assert negotiate_encoding(accept('*'), {'gzip': '.gz'}) == 'gzip'
+
+    def test_serves_gzip_variant(self, static_app):
+        """A gzip-capable client gets the .gz sibling with the original type"""
+        response = static_app.test_client().get('/static/css/site.css', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data).startswith(b'body {')
+
+    @pytest.mark.skipif(not BROTLI_AVAILABLE, reason='brotli not installed')
+    def test_serves_brotli_variant(self, static_app):
+        """Brotli is preferred when the client accepts both"""
+        response = static_app.test_client().get('/static/css/site.css', headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+
+    def test_identity_when_not_accepted(self, static_app):
+        """Clients without Accept-Encoding get the plain file, still with Vary"""
+        response = static_app.test_client().get('/static/css/site.css')
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.data.startswith(b'body {')
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+    def test_files_without_siblings_served_normally(self, static_app):
+        """No Vary header when there is nothing to negotiate; missing files 404"""
+        client = static_app.test_client()
+        response = client.get('/static/tiny.js', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.data == b'x = 1;'
+        assert 'Vary' not in response.headers
+        assert client.get('/static/missing.js').status_code == 404
+
+
+@pytest.fixture
+def bundle_folder(tmp_path):
+    """Static folder with two scripts and a stylesheet referencing an image"""
+    for name, content in {
+        'js/a.js': '// first file\nvar a = 1\n',
+        'js/b.js': 'function b() {\n    return a + 1;\n}\n',
+        'css/style.css': "/* site */\n.logo {\n    background: url('../images/logo.png');\n}\n",
+        'images/logo.png': 'png',
+    }.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return str(tmp_path)
+
+
+BUNDLE_CONFIG = {'app.js': ('js/a.js', 'js/b.js'), 'site.css': ('css/style.css',)}
+
+
+class TestBundles:
+    """Test per-page bundles"""
+
+    def test_build_concatenates_in_order(self, bundle_folder):
+        """Scripts are joined in load order and minified"""
+        report = build_bundles(bundle_folder, BUNDLE_CONFIG)
+
+        with open(os.path.join(bundle_folder, BUNDLE_DIR, 'app.js')) as f:
+            bundle = f.read()
+        assert bundle.index('var a') < bundle.index('function b')
+        assert report[f'{BUNDLE_DIR}/app.js']['minified'] <= report[f'{BUNDLE_DIR}/app.js']['source']
+
+    def test_css_bundle_keeps_urls_working(self, bundle_folder):
+        """Relative url()s become root-relative because the bundle lives elsewhere"""
+        build_bundles(bundle_folder, BUNDLE_CONFIG)
+        with open(os.path.join(bundle_folder, BUNDLE_DIR, 'site.css')) as f:
+            css = f.read()
+        assert "url('/static/images/logo.png')" in css
+        assert '/* site */' not in css
+
+    def test_bundles_are_fingerprinted(self, bundle_folder):
+        """Built bundles go through the fingerprint step like sources"""
+        build_bundles(bundle_folder, BUNDLE_CONFIG)
+        manifest = build_fingerprints(bundle_folder)
+
+        assert manifest[f'{BUNDLE_DIR}/app.js'].startswith(f'{FINGERPRINT_DIR}/bundles/app.')
+        with open(os.path.join(bundle_folder, manifest[f'{BUNDLE_DIR}/site.css'])) as f:
+            assert f"/static/{manifest['images/logo.png']}" in f.read()
+
+    def test_fallback_css_minifier(self, monkeypatch):
+        """Without rcssmin, comments and whitespace are still removed"""
+        monkeypatch.setattr(bundles_module, 'RCSSMIN_AVAILABLE', False)
+        css = "/* c */\na > b {\n    color: red;\n    margin: 0 auto;\n}\n"
+        assert minify_css(css) == 'a > b{color: red;margin: 0 auto}'
+
+    def test_resolver_uses_bundle_when_built(self, app, bundle_folder):
+        """One URL for a built bundle, the source files otherwise"""
+        build_bundles(bundle_folder, BUNDLE_CONFIG)
+        app.static_folder = bundle_folder
+        built = BundleResolver(AssetManifest(bundle_folder), BUNDLE_CONFIG)
+
+        with app.test_request_context():
+            assert built.urls('app.js') == ['/static/js/a.js', '/static/js/b.js']
+            build_fingerprints(bundle_folder)
+            built.asset_manifest.reload()
+            assert built.urls('app.js') == [f'/static/{built.asset_manifest.resolve(f"{BUNDLE_DIR}/app.js")}']
+            assert str(built.scripts('app.js')).startswith('<script src="/static/dist/static/bundles/app.')
+
+
+PAGE_HTML = """
+<html><body data-page="games">
+<header><nav><a class="logo active" href="/">Home</a></nav></header>
+<div id="spa-content">
+<div class="intro"><button class="btn primary">Go</button><input type="text"><br></div>
+<div class="second-section"><p class="blurb">Below</p></div>
+</div>
+<div id="chatWidgetContainer" class="chat-widget"></div>
+</body></html>
+"""
+
+
+class TestCriticalCss:
+    """Test critical CSS extraction"""
+
+    def extract(self, css):
+        return extract_critical_css(css, PAGE_HTML)
+
+    def test_keeps_rules_for_elements_on_the_page(self):
+        """Rules are kept when every compound matches some element"""
+        css = ('.btn{color:red}.missing{color:blue}header nav .logo{margin:0}'
+               '#spa-content .btn.primary{padding:1px}.btn.secondary{padding:2px}')
+        assert self.extract(css) == '.btn{color:red}header nav .logo{margin:0}#spa-content .btn.primary{padding:1px}'
+
+    def test_selector_lists_match_if_any_selector_matches(self):
+        assert self.extract('.missing,.btn{color:red}') == '.missing,.btn{color:red}'
+
+    def test_attribute_selectors(self):
+        css = 'body[data-page="games"] .btn{a:1}body[data-page="cat-cafe"] .btn{b:2}input[type=text]{c:3}'
+        assert self.extract(css) == 'body[data-page="games"] .btn{a:1}input[type=text]{c:3}'
+
+    def test_interaction_states_are_deferred(self):
+        """:hover and friends can't apply on first paint; ::before can"""
+        css = '.btn:hover{color:red}.btn::before{content:""}.btn:not(.missing){x:1}'
+        assert self.extract(css) == '.btn::before{content:""}.btn:not(.missing){x:1}'
+
+    def test_media_queries_are_filtered(self):
+        css = '@media screen{.btn{a:1}.missing{b:2}}@media print{.missing{c:3}}'
+        assert self.extract(css) == '@media screen{.btn{a:1}}'
+
+    def test_only_used_keyframes_kept(self):
+        css = '@keyframes pulse{to{opacity:0}}@keyframes spin{to{opacity:1}}.btn{animation:pulse 1s}'
+        critical = self.extract(css)
+        assert '@keyframes pulse' in critical
+        assert 'spin' not in critical
+
+    def test_content_past_the_first_section_is_below_the_fold(self):
+        """Only the first content section counts; later sections and what follows the content don't"""
+        assert self.extract('.intro{a:1}.second-section{b:2}.blurb{c:3}.chat-widget{d:4}') == '.intro{a:1}'
+
+    def test_fold_marker_ends_the_first_viewport(self):
+        html = ('<header class="top"></header><div id="spa-content"><div class="intro"></div>'
+                '<div class="more"></div><div class="later" data-fold><p class="deep"></p></div></div>')
+        assert extract_critical_css('.top{a:1}.more{b:2}.later{c:3}.deep{d:4}', html) == '.top{a:1}.more{b:2}'
+
+    def test_hidden_elements_are_skipped(self):
+        html = ('<div id="spa-content"><div class="intro"><div class="overlay" style="display: none;">'
+                '<p class="inside"></p></div><p hidden class="note"></p><p class="shown"></p></div></div>')
+        css = '.overlay{a:1}.inside{b:2}.note{c:3}.shown{d:4}'
+        assert extract_critical_css(css, html) == '.shown{d:4}'
+
+    def test_universal_and_root_selectors(self):
+        assert self.extract(':root{--a:1}*{margin:0}') == ':root{--a:1}*{margin:0}'
+
+    def test_parse_blocks_handles_strings_and_statements(self):
+        blocks = parse_blocks('@charset "utf-8";a{content:"}"}b{c:d}')
+        assert blocks == [('@charset "utf-8"', None), ('a', 'content:"}"'), ('b', 'c:d')]
+
+
+class TestSizeReport:
+    """Test the per-route size report"""
+
+    def test_page_assets_lists_local_styles_and_scripts(self):
+        html = ('<link rel="preload" href="/static/site.css" as="style">'
+                '<noscript><link rel="stylesheet" href="/static/site.css"></noscript>'
+                '<link rel="stylesheet" href="https://cdn.example.com/x.css">'
+                '<script src="/static/app.js?v=1"></script><script>inline()</script>')
+        assert page_assets(html) == ['site.css', 'app.js']
+
+    def test_measure_uses_smallest_sibling(self, compressed_folder):
+        html = '<link rel="stylesheet" href="/static/css/site.css"><script src="/static/tiny.js"></script>'
+        sizes = measure_page(compressed_folder, html)
+        css_path = os.path.join(compressed_folder, 'css', 'site.css')
+
+        assert sizes['css'] == os.path.getsize(css_path)
+        assert sizes['js'] == 6
+        assert sizes['transfer'] < sizes['html'] + sizes['css'] + sizes['js']
+
+    def test_report_compares_with_previous_build(self, compressed_folder):
+        pages = {'/': '<script src="/static/tiny.js"></script>'}
+        build_size_report(compressed_folder, pages)
+        report, previous = build_size_report(compressed_folder, {'/': pages['/'] + ' ' * 500})
+
+        assert previous['/']['html'] < report['/']['html']
+        lines = format_size_report(report, previous)
+        assert lines[1].startswith('/') and lines[1].endswith(' B')
+
+    def test_inline_css_budget(self, compressed_folder):
+        pages = {'/': '<style>' + 'a' * 100 + '</style>',
+                 '/big': '<style>' + 'a' * (CRITICAL_CSS_BUDGET + 1) + '</style>'}
+        report, _ = build_size_report(compressed_folder, pages)
+
+        assert report['/']['inline_css'] == 100
+        assert over_budget(report) == ['/big']
+
+
+class TestPreloadHints:
+    """Test the Link header hints learned from page markup"""
+
+    HTML = ('<script src="/static/app.js"></script>'
+            '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+            '<link rel="stylesheet" href="https://cdn.example.com/x.css" crossorigin="anonymous">'
+            '<link rel="preload" href="/static/site.css" as="style">'
+            '<noscript><link rel="stylesheet" href="/static/fallback.css"></noscript>'
+            '<link rel="icon" href="/favicon.ico"><script>inline()</script>'
+            '<script src="/static/app.js"></script>')
+
+    def test_orders_origins_styles_then_scripts(self):
+        assert [hint[0] for hint in page_hints(self.HTML)] == [
+            'https://fonts.gstatic.com', 'https://cdn.example.com/x.css', '/static/site.css', '/static/app.js'
+        ]
+
+    def test_link_header_format(self):
+        assert link_header(page_hints(self.HTML)) == (
+            '<https://fonts.gstatic.com>; rel=preconnect; crossorigin, '
+            '<https://cdn.example.com/x.css>; rel=preload; as=style; crossorigin, '
+            '</static/site.css>; rel=preload; as=style, '
+            '</static/app.js>; rel=preload; as=script'
+        )
+
+    def test_hint_count_is_capped(self):
+        html = ''.join(f'<script src="/static/{n}.js"></script>' for n in range(20))
+        assert len(page_hints(html, max_hints=5)) == 5
+
+    def test_learned_once_unless_auto_reload(self):
+        hints = PreloadHints()
+        hints.learn('home', '<script src="/static/a.js"></script>')
+        hints.learn('home', '<script src="/static/b.js"></script>')
+        assert hints.get('home') == '</static/a.js>; rel=preload; as=script'
+
+        hints.auto_reload = True
+        hints.learn('home', '<script src="/static/b.js"></script>')
+        assert hints.get('home') == '</static/b.js>; rel=preload; as=script'
+
+    def test_early_hints_need_server_support(self):
+        hints = PreloadHints()
+        hints.learn('home', '<script src="/static/a.js"></script>')
+        sent = []
+
+        assert not hints.send_early_hints({}, 'home')
+        assert not hints.send_early_hints({'wsgi.early_hints': sent.append}, 'about')
+        assert hints.send_early_hints({'wsgi.early_hints': sent.append}, 'home')
+        assert sent == [[('Link', '</static/a.js>; rel=preload; as=script')]]
@@ -1,8 +1,20 @@
 """
 Tests for configuration
 """
+import importlib.util
+import os
+import runpy
+import threading
+import time
+from datetime import datetime
+
 import pytest
-from application.config import Config, DevelopmentConfig, ProductionConfig, TestingConfig
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from application.config import READ_BIND, Config, DevelopmentConfig, ProductionConfig, TestingConfig
+from application.extensions import db
+from application.models import InboundEmail
 
 
 class TestConfig:
@@ -73,3 +85,146 @@ class TestTestingConfig:
     def test_testing_csrf_disabled(self):
         """Test testing config has CSRF disabled"""
         assert TestingConfig.WTF_CSRF_ENABLED is False
+
+
+@pytest.fixture
+def file_app(make_app):
+    """Production app on a migrated temporary database file"""
+    app = make_app('production', migrate=True)
+    with app.app_context():
+        yield app
+
+
+def pragma(connection, name):
+    return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+
+class TestSqliteEngines:
+    """Tuned connections and the read/write split for an SQLite file"""
+
+    def test_writer_pragmas(self, file_app):
+        with db.engines[None].connect() as connection:
+            assert pragma(connection, 'journal_mode') == 'wal'
+            assert pragma(connection, 'synchronous') == 1  # NORMAL
+            assert pragma(connection, 'busy_timeout') == Config.SQLITE_PRAGMAS['busy_timeout']
+            assert pragma(connection, 'cache_size') == Config.SQLITE_PRAGMAS['cache_size']
+            assert pragma(connection, 'query_only') == 0
+
+    def test_reader_cannot_write(self, file_app):
+        with db.engines[READ_BIND].connect() as connection:
+            assert pragma(connection, 'query_only') == 1
+            with pytest.raises(OperationalError):
+                connection.execute(text("DELETE FROM inbound_email"))
+
+    def test_single_writer_connection(self, file_app):
+        assert db.engines[None].pool.size() == 1
+        assert db.engines[READ_BIND].pool.size() == Config.SQLITE_READ_POOL_SIZE
+
+    def test_session_routes_reads_and_writes(self, file_app):
+        session = db.session
+        assert session.get_bind(clause=db.select(InboundEmail)) is db.engines[READ_BIND]
+        assert session.get_bind(clause=text('SELECT 1')) is db.engines[READ_BIND]
+        assert session.get_bind(clause=text('DELETE FROM inbound_email')) is db.engines[None]
+
+        session.add(InboundEmail(from_email='a@example.com', to_email='b@example.com',
+                                 subject='One', received_at=datetime(2024, 1, 1), dedup_key='one'))
+        session.flush()
+        # Uncommitted rows are only visible on the writer
+        assert session.get_bind(clause=db.select(InboundEmail)) is db.engines[None]
+        assert session.scalar(db.select(db.func.count(InboundEmail.id))) == 1
+
+        session.commit()
+        assert session.get_bind(clause=db.select(InboundEmail)) is db.engines[READ_BIND]
+        assert session.scalar(db.select(db.func.count(InboundEmail.id))) == 1
+
+    def test_readers_do_not_block_the_writer(self, file_app):
+        with db.engines[READ_BIND].connect() as reader:
+            reader.execute(text('SELECT count(*) FROM inbound_email')).scalar()  # holds a read snapshot
+            db.session.add(InboundEmail(from_email='a@example.com', to_email='b@example.com',
+                                        subject='Two', received_at=datetime(2024, 1, 1), dedup_key='two'))
+            db.session.commit()
+            assert reader.execute(text('SELECT count(*) FROM inbound_email')).scalar() == 0
+        with db.engines[READ_BIND].connect() as reader:
+            assert reader.execute(text('SELECT count(*) FROM inbound_email')).scalar() == 1
+
+    def test_writes_wait_for_each_other(self, file_app, make_app):
+        """A second writer waits for the lock rather than failing"""
+        other = make_app('production', SQLALCHEMY_DATABASE_URI=file_app.config['SQLALCHEMY_DATABASE_URI'])
+        with other.app_context():
+            other_writer = db.engines[None]
+        writer = db.engines[None]
+        inserted = []
+
+        def write_later():
+            with other_writer.begin() as connection:
+                connection.execute(text("INSERT INTO inbound_email (from_email, to_email, subject, received_at) "
+                                        "VALUES ('c@example.com', 'd@example.com', 'Three', '2024-01-02')"))
+            inserted.append(time.monotonic())
+
+        with writer.begin() as connection:
+            thread = threading.Thread(target=write_later)
+            thread.start()
+            time.sleep(0.2)
+            assert not inserted
+            released = time.monotonic()
+        thread.join()
+        other_writer.dispose()
+
+        assert inserted and inserted[0] >= released
+
+    def test_in_memory_database_keeps_one_engine(self, make_app):
+        app = make_app(SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        with app.app_context():
+            assert list(db.engines) == [None]
+
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+def load_gunicorn_conf(monkeypatch, **env):
+    for name in ('GUNICORN_WORKER_CLASS', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'GUNICORN_PRELOAD',
+                 'GUNICORN_MAX_REQUESTS', 'GUNICORN_BIND', 'PORT'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(GUNICORN_CONF)
+
+
+class TestGunicornConfig:
+    """Tests for the environment-driven gunicorn.conf.py"""
+
+    def test_defaults_to_preloaded_threaded_workers(self, monkeypatch):
+        conf = load_gunicorn_conf(monkeypatch)
+        assert conf['worker_class'] == 'gthread'
+        assert conf['workers'] == max(2, conf['cpus'])
+        assert conf['threads'] == 8
+        assert conf['preload_app'] is True
+        assert conf['bind'] == '0.0.0.0:10000'
+        assert conf['max_requests_jitter'] == conf['max_requests'] // 10 > 0
+
+    def test_environment_overrides(self, monkeypatch):
+        conf = load_gunicorn_conf(monkeypatch, WEB_CONCURRENCY='3', GUNICORN_THREADS='16', PORT='8080',
+                                  GUNICORN_MAX_REQUESTS='0', GUNICORN_PRELOAD='false')
+        assert (conf['workers'], conf['threads']) == (3, 16)
+        assert conf['bind'] == '0.0.0.0:8080'
+        assert conf['max_requests'] == conf['max_requests_jitter'] == 0
+        assert conf['preload_app'] is False
+
+    def test_sync_workers_scale_with_cpus(self, monkeypatch):
+        conf = load_gunicorn_conf(monkeypatch, GUNICORN_WORKER_CLASS='sync')
+        assert conf['workers'] == 2 * conf['cpus'] + 1
+        assert conf['threads'] == 1
+
+    def test_gevent_is_optional(self, monkeypatch):
+        conf = load_gunicorn_conf(monkeypatch, GUNICORN_WORKER_CLASS='gevent')
+        if importlib.util.find_spec('gevent') is None:
+            assert conf['worker_class'] == 'gthread'
+        else:
+            assert conf['worker_class'] == 'gevent'
+            assert conf['preload_app'] is False
+
+    def test_post_fork_resets_inherited_clients(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr('application.reset_after_fork', lambda: calls.append(True))
+        load_gunicorn_conf(monkeypatch)['post_fork'](None, None)
+        assert calls == [True]
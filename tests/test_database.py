@@ -0,0 +1,254 @@
+"""
+Tests for database helpers
+"""
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, Text, create_engine, insert, select, type_coerce
+from sqlalchemy.orm import Session
+
+from application.database import CompressedText, compress_existing_rows
+from application.database.types import COMPRESSED_MAGIC, compress_text, decompress_text, is_compressed
+
+
+@pytest.fixture
+def engine():
+    """In-memory SQLite engine"""
+    return create_engine('sqlite://')
+
+
+@pytest.fixture
+def message_table(engine):
+    """Table with a compressed body column"""
+    metadata = MetaData()
+    table = Table('message', metadata,
+                  Column('id', Integer, primary_key=True),
+                  Column('body', CompressedText(threshold=100)))
+    metadata.create_all(engine)
+    return table
+
+
+def raw_body(engine, table, row_id):
+    """Read a stored value without decompression"""
+    with engine.connect() as conn:
+        return conn.execute(
+            select(type_coerce(table.c.body, Text)).where(table.c.id == row_id)
+        ).scalar_one()
+
+
+class TestCompressedText:
+    """Tests for the CompressedText column type"""
+
+    def test_short_values_stored_as_text(self, engine, message_table):
+        """Test values below the threshold are not compressed"""
+        with engine.begin() as conn:
+            conn.execute(insert(message_table).values(id=1, body='short'))
+
+        assert raw_body(engine, message_table, 1) == 'short'
+
+    def test_large_values_roundtrip_compressed(self, engine, message_table):
+        """Test large values are compressed on disk and read back unchanged"""
+        body = '<p>Newsletter content</p>' * 200
+        with engine.begin() as conn:
+            conn.execute(insert(message_table).values(id=1, body=body))
+
+        stored = raw_body(engine, message_table, 1)
+        assert is_compressed(stored)
+        assert len(stored) < len(body)
+
+        with engine.connect() as conn:
+            assert conn.execute(select(message_table.c.body)).scalar_one() == body
+
+    def test_none_passthrough(self):
+        """Test NULL values are left alone"""
+        assert compress_text(None) is None
+        assert decompress_text(None) is None
+
+    def test_unknown_version_rejected(self):
+        """Test an unsupported header version raises an error"""
+        with pytest.raises(ValueError, match='Unsupported'):
+            decompress_text(COMPRESSED_MAGIC + bytes([99]) + b'payload')
+
+
+class TestCompressExistingRows:
+    """Tests for the batch compression job"""
+
+    def test_compresses_legacy_rows(self, engine):
+        """Test rows written as plain text are rewritten compressed"""
+        body = 'Hello world! ' * 100
+        plain = MetaData()
+        legacy = Table('message', plain,
+                       Column('id', Integer, primary_key=True),
+                       Column('body', Text))
+        plain.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(legacy), [{'id': i, 'body': body} for i in range(1, 6)]
+                         + [{'id': 6, 'body': 'tiny'}])
+
+        class Message:
+            __table__ = Table('message', MetaData(),
+                              Column('id', Integer, primary_key=True),
+                              Column('body', CompressedText(threshold=100)))
+
+        with Session(engine) as session:
+            assert compress_existing_rows(session, Message, batch_size=2) == 5
+            assert compress_existing_rows(session, Message, batch_size=2) == 0
+
+        assert is_compressed(raw_body(engine, Message.__table__, 1))
+        assert raw_body(engine, Message.__table__, 6) == 'tiny'
+        with engine.connect() as conn:
+            assert conn.execute(select(Message.__table__.c.body).where(Message.__table__.c.id == 3)).scalar_one() == body
+
+    def test_skips_values_that_do_not_shrink(self, engine):
+        """Test incompressible text isn't rewritten or counted, however often the job runs"""
+        # Above the threshold, but too short and varied for zlib's header to pay off
+        noise = 'The quick brown fox jumps over a lazy dog, 0123456789 times.'
+        plain = MetaData()
+        legacy = Table('message', plain,
+                       Column('id', Integer, primary_key=True),
+                       Column('body', Text))
+        plain.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(legacy), [{'id': 1, 'body': noise}, {'id': 2, 'body': 'Hello world! ' * 10}])
+
+        class Message:
+            __table__ = Table('message', MetaData(),
+                              Column('id', Integer, primary_key=True),
+                              Column('body', CompressedText(threshold=50)))
+
+        with Session(engine) as session:
+            assert compress_existing_rows(session, Message) == 1
+            assert compress_existing_rows(session, Message) == 0
+
+        assert raw_body(engine, Message.__table__, 1) == noise
+        assert is_compressed(raw_body(engine, Message.__table__, 2))
+
+
+class TestCollapseDuplicateEmails:
+    """Tests for the duplicate email batch job"""
+
+    def test_backfills_keys_and_deletes_duplicates(self, engine):
+        """Test legacy duplicates collapse to the first delivery"""
+        from sqlalchemy import String
+        from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+        from application.database import collapse_duplicate_emails
+
+        class Base(DeclarativeBase):
+            pass
+
+        class Email(Base):
+            __tablename__ = 'email'
+            id: Mapped[int] = mapped_column(primary_key=True)
+            subject = mapped_column(String(50))
+            dedup_key = mapped_column(String(64), unique=True)
+
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all([Email(subject=s) for s in ['a', 'b', 'a', 'a', 'c', 'b']])
+            session.commit()
+
+            keyed, deleted = collapse_duplicate_emails(session, Email, lambda e: f'key-{e.subject}', batch_size=2)
+
+            assert (keyed, deleted) == (3, 3)
+            remaining = session.execute(select(Email.id, Email.dedup_key).order_by(Email.id)).all()
+            assert remaining == [(1, 'key-a'), (2, 'key-b'), (5, 'key-c')]
+
+
+class TestKeysetPagination:
+    """Tests for cursor pagination"""
+
+    def test_cursor_roundtrip(self):
+        """Test cursors decode to the encoded position"""
+        from datetime import datetime
+        from application.database import encode_cursor, decode_cursor
+
+        timestamp = datetime(2026, 1, 2, 3, 4, 5, 678000)
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    def test_malformed_cursor_ignored(self):
+        """Test a garbage cursor starts from the first page"""
+        from application.database import decode_cursor
+
+        assert decode_cursor('not-a-cursor') is None
+        assert decode_cursor(None) is None
+
+    def test_pages_cover_every_row_once(self, db):
+        """Test walking all pages returns each row once, newest first, including timestamp ties"""
+        from datetime import datetime, timedelta
+        from application.database import keyset_page
+
+        class Entry(db.Model):
+            id = db.Column(db.Integer, primary_key=True)
+            created_at = db.Column(db.DateTime, nullable=False)
+
+        db.create_all()
+        start = datetime(2026, 1, 1)
+        db.session.add_all([Entry(created_at=start + timedelta(minutes=i // 3)) for i in range(20)])
+        db.session.commit()
+
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(db.session, db.select(Entry), Entry.created_at, Entry.id, cursor=cursor, per_page=7)
+            seen.extend(entry.id for entry in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == sorted(range(1, 21), key=lambda i: ((i - 1) // 3, i), reverse=True)
+
+
+class TestSearchIndex:
+    """Tests for FTS5 full-text search"""
+
+    def test_match_query_is_sanitized(self):
+        """Test user input can't inject FTS5 syntax"""
+        from application.database import build_match_query
+
+        assert build_match_query('invoice march') == '"invoice" "march"*'
+        assert build_match_query('"unbalanced OR') == '"unbalanced" "OR"*'
+        assert build_match_query('  !! ') is None
+
+    def test_html_to_text(self):
+        """Test HTML-only bodies are indexed as text"""
+        from application.database import html_to_text
+
+        assert html_to_text('<p>Hello <b>world</b></p>') == 'Hello world'
+        assert html_to_text(None) == ''
+
+    def test_index_follows_writes(self, db):
+        """Test inserts, updates and deletes are reflected in search results"""
+        from application.database import SearchIndex
+
+        class Note(db.Model):
+            id = db.Column(db.Integer, primary_key=True)
+            title = db.Column(db.String(100))
+            author = db.Column(db.String(100))
+            body = db.Column(CompressedText(threshold=10))
+
+        db.create_all()
+        index = SearchIndex(
+            'note_fts', Note,
+            lambda note: {'subject': note.title, 'sender': note.author, 'body': note.body},
+            watched_attrs=('title', 'author', 'body')
+        )
+        with db.engine.begin() as conn:
+            index.create(conn)
+
+        first = Note(title='Quarterly report', author='alice', body='Revenue grew <fast> this quarter')
+        second = Note(title='Lunch', author='bob', body='Pizza on Friday')
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        results = index.search(db.session, 'revenue')
+        assert [result['id'] for result in results] == [first.id]
+        assert str(results[0]['snippet']) == '<mark>Revenue</mark> grew &lt;fast&gt; this quarter'
+
+        second.body = 'Revenue sharing lunch'
+        db.session.commit()
+        assert {result['id'] for result in index.search(db.session, 'revenue')} == {first.id, second.id}
+
+        second_id = second.id
+        db.session.delete(first)
+        db.session.commit()
+        assert [result['id'] for result in index.search(db.session, 'revenue')] == [second_id]
+
+        assert index.rebuild(db.session) == 1
+        assert [result['id'] for result in index.search(db.session, 'lun')] == [second_id]
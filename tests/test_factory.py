@@ -0,0 +1,82 @@
+"""
+Tests for the application factory and lazy initialization
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+from application import _engines, reset_after_fork
+from application.extensions import db
+from career_agent import CareerAgent
+
+
+class TestCreateApp:
+    """Tests for create_app()"""
+
+    def test_builds_configured_app(self, app):
+        assert app.config['TESTING'] is True
+        assert app.debug is True
+        assert {'pages', 'admin', 'webhooks', 'api', 'debug'} <= set(app.blueprints)
+        assert app.template_folder.endswith('templates')
+        assert 'migrate' in app.cli.commands
+
+    def test_serves_pages(self, app):
+        response = app.test_client().get('/about')
+        assert response.status_code == 200
+        assert b'<header>' in response.data
+
+    def test_boot_skips_heavy_optional_imports(self, tmp_path):
+        """openai, SendGrid and Pillow are only imported when first needed"""
+        script = "import sys, app; print(','.join(m for m in ('openai', 'sendgrid', 'PIL') if m in sys.modules))"
+        env = {**os.environ, 'DATABASE_URL': f"sqlite:///{tmp_path / 'boot.db'}"}
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True, env=env)
+        assert result.stdout.strip() == ''
+
+    def test_boot_leaves_no_open_connections(self, make_app):
+        """A preloading parent must not hand pooled connections to its workers"""
+        app = make_app()
+        with app.app_context():
+            engine = db.engine
+        assert engine in _engines
+        assert engine.pool.checkedin() == 0
+
+
+class TestForkSafety:
+    """Tests for per-process state after a fork"""
+
+    def test_engine_pools_reset_in_child(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'fork.db'}")
+        _engines.add(engine)
+        with engine.connect():
+            pass
+        assert engine.pool.checkedin() == 1
+
+        reset_after_fork()
+        assert engine.pool.checkedin() == 0
+
+    def test_openai_client_rebuilt_in_new_process(self):
+        pytest.importorskip('openai')
+        agent = CareerAgent(api_key='test-key')
+        client = agent.client
+        assert agent.client is client
+
+        agent._client_pid = -1  # As seen from a forked worker
+        assert agent.client is not client
+
+    def test_reset_after_fork_drops_openai_client(self, monkeypatch):
+        pytest.importorskip('openai')
+        import career_agent
+        agent = CareerAgent(api_key='test-key')
+        monkeypatch.setattr(career_agent, 'career_agent', agent)
+        client = agent.client
+
+        reset_after_fork()
+        assert agent._client is None
+        assert agent.client is not client
+
+    def test_no_client_without_api_key(self, monkeypatch):
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        assert CareerAgent(api_key=None).client is None
@@ -0,0 +1,174 @@
+"""
+Tests for the health probes and the OpenAI circuit breaker
+"""
+import os
+import time
+
+import pytest
+
+from career_agent import CareerAgent, CircuitBreaker
+
+
+@pytest.fixture
+def health_app(make_app):
+    """Testing app on a migrated database"""
+    return make_app(migrate=True)
+
+
+@pytest.fixture
+def monitor(health_app):
+    return health_app.extensions['health_monitor']
+
+
+class TestCircuitBreaker:
+    """Tests for the OpenAI circuit breaker"""
+
+    def test_opens_after_consecutive_failures(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, clock=clock)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == 'closed' and breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        assert not breaker.allow_request()
+
+    def test_success_resets_count(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == 'closed'
+
+    def test_half_open_lets_one_trial_through(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+        breaker.record_failure()
+        clock.now += 60
+
+        assert breaker.state == 'half_open'
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state == 'closed'
+
+    def test_failed_trial_reopens(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+        breaker.record_failure()
+        clock.now += 60
+        assert breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state == 'open'
+
+    def test_open_breaker_answers_from_fallback(self):
+        class FailingClient:
+            class chat:
+                class completions:
+                    calls = 0
+
+                    @classmethod
+                    def create(cls, **kwargs):
+                        cls.calls += 1
+                        raise ConnectionError('unreachable')
+
+        agent = CareerAgent(api_key='test-key')
+        agent._client, agent._client_pid = FailingClient, os.getpid()
+        for _ in range(agent.breaker.failure_threshold + 2):
+            assert ''.join(agent.chat_stream('Tell me about your projects'))
+
+        assert FailingClient.chat.completions.calls == agent.breaker.failure_threshold
+        assert agent.breaker.state == 'open'
+
+
+class TestHealthMonitor:
+    """Tests for the cached dependency probes"""
+
+    def test_ready_with_every_check_reported(self, health_app):
+        response = health_app.test_client().get('/health/ready')
+
+        assert response.status_code == 200
+        checks = response.json['checks']
+        assert set(checks) == {'database', 'disk', 'openai', 'sendgrid'}
+        assert checks['database']['ok'] and 'inbound_email' in checks['database']['tables']
+        assert checks['disk']['free_mb'] > 0
+        assert checks['openai']['critical'] is False
+        for check in checks.values():
+            assert check['latency_ms'] >= 0 and check['age_s'] >= 0
+
+    def test_results_are_cached(self, monitor):
+        calls = []
+        monitor.add_probe('counted', lambda app: calls.append(1) or {})
+        monitor.results()
+        monitor.results()
+        assert calls == [1]
+
+    def test_pending_migrations_make_it_unready(self, client):
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert 'migrations pending' in response.json['checks']['database']['error']
+
+    def test_low_disk_makes_it_unready(self, health_app):
+        health_app.config['HEALTH_MIN_FREE_DISK_MB'] = 10 ** 12
+        response = health_app.test_client().get('/health/ready')
+        assert response.status_code == 503
+        assert response.json['checks']['disk']['ok'] is False
+
+    def test_non_critical_failure_keeps_it_ready(self, monitor):
+        def failing(app):
+            raise ConnectionError('down')
+        monitor.add_probe('optional', failing)
+
+        ready, checks = monitor.readiness()
+        assert ready
+        assert checks['optional']['ok'] is False and checks['optional']['error'] == 'down'
+
+    def test_stale_results_fail(self, monitor):
+        monitor.results()
+        monitor.stale_after = 0.01
+        time.sleep(0.02)
+
+        ready, checks = monitor.readiness()
+        assert not ready
+        assert checks['database']['stale'] is True
+
+    def test_status_reports_why_the_agent_is_down(self, health_app, monitor):
+        client = health_app.test_client()
+        assert client.get('/api/status').json['career_agent'] == 'fallback'
+
+        def failing(app):
+            raise ConnectionError('down')
+        monitor.add_probe('openai', failing)
+        monitor.refresh()
+        assert client.get('/api/status').json['career_agent'] == 'down'
+
+        monitor.add_probe('openai', lambda app: {'configured': True, 'state': 'half_open'})
+        monitor.refresh()
+        monitor.stale_after = 0.01
+        time.sleep(0.02)
+        assert client.get('/api/status').json['career_agent'] == 'half_open'
+
+        monitor.add_probe('openai', lambda app: {'configured': False})
+        monitor.refresh()
+        time.sleep(0.02)
+        assert client.get('/api/status').json['career_agent'] == 'stale'
+
+    def test_liveness_never_probes(self, health_app, monitor):
+        response = health_app.test_client().get('/health/live')
+        assert response.status_code == 200
+        assert response.json['status'] == 'healthy'
+        assert monitor._results == {}
+
+    def test_background_thread_refreshes(self, health_app, monitor):
+        monitor.interval = 0.05
+        monitor.ensure_running()
+        try:
+            deadline = time.monotonic() + 5
+            while len(monitor._results) < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            first = monitor._results['database'].checked_at
+            time.sleep(0.2)
+            assert monitor._results['database'].checked_at > first
+            assert monitor.liveness()['monitor_running'] is True
+        finally:
+            monitor.stop()
@@ -0,0 +1,237 @@
+"""
+Tests for the admin live feed: broadcaster, since-cursor JSON and SSE stream
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from application.extensions import db
+from application.models import InboundEmail
+from application.utils.live_feed import Broadcaster, feed_broadcaster
+
+
+@pytest.fixture
+def feed_app(make_app):
+    """Testing app on a file database, so a stream and the handlers each get their own connection"""
+    return make_app(migrate=True, ADMIN_FEED_KEEPALIVE=0.05, ADMIN_FEED_MAX_SECONDS=5)
+
+
+@pytest.fixture
+def admin_client(feed_app, admin_auth):
+    """A client signed in to the admin session, as the dashboard's EventSource is"""
+    client = feed_app.test_client()
+    assert client.get('/admin/api/feed', headers=admin_auth).status_code == 200
+    return client
+
+
+def post_email(app, subject):
+    response = app.test_client().post('/webhook/sendgrid', data={
+        'from': 'sender@example.com', 'to': 'reply@josefinhao.com', 'subject': subject, 'text': f'About {subject}'
+    })
+    assert response.status_code == 200
+    return response.json['email_id']
+
+
+def post_message(app, subject):
+    response = app.test_client().post('/contact', data={
+        'name': 'Ada', 'email': 'ada@example.com', 'subject': subject, 'message': 'A message long enough to pass'
+    })
+    assert response.status_code == 302
+
+
+def insert_email(app, subject):
+    """A row committed without an announcement, as another worker's would be"""
+    with app.app_context():
+        email = InboundEmail(from_email='other@example.com', to_email='reply@josefinhao.com', subject=subject,
+                             text_content='Hi', dedup_key=subject)
+        db.session.add(email)
+        db.session.commit()
+        return email.id
+
+
+class StreamReader:
+    """Parses SSE events off a streamed test response"""
+
+    def __init__(self, response):
+        self.response = response
+        self.chunks = iter(response.response)
+
+    def next_event(self):
+        """(id, kind, data) of the next event, skipping comments and the retry hint"""
+        for chunk in self.chunks:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n') if not line.startswith(':'))
+            if 'event' in fields:
+                return fields['id'], fields['event'], json.loads(fields['data'])
+        return None
+
+    def close(self):
+        self.response.close()
+
+
+def open_stream(client, **kwargs):
+    response = client.get('/admin/feed/stream', **kwargs)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    return StreamReader(response)
+
+
+def in_thread(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.start()
+    return thread
+
+
+class TestBroadcaster:
+    """Tests for the in-process fan-out"""
+
+    def test_wait_times_out_without_events(self):
+        broadcaster = Broadcaster()
+        started = time.monotonic()
+        assert broadcaster.wait(broadcaster.sequence, 0.05) == ([], False)
+        assert time.monotonic() - started >= 0.04
+
+    def test_publish_wakes_waiters(self):
+        broadcaster = Broadcaster()
+        after = broadcaster.sequence
+        received = []
+        waiters = [in_thread(lambda: received.append(broadcaster.wait(after, 5))) for _ in range(3)]
+        time.sleep(0.05)
+        broadcaster.publish('email', {'id': 1})
+        for waiter in waiters:
+            waiter.join(1)
+        assert received == [([(1, 'email', {'id': 1})], False)] * 3
+
+    def test_events_after_sequence_only(self):
+        broadcaster = Broadcaster()
+        for n in range(1, 4):
+            broadcaster.publish('email', {'id': n})
+        events, missed = broadcaster.wait(1, 0)
+        assert [event[2]['id'] for event in events] == [2, 3] and not missed
+
+    def test_reports_dropped_events(self):
+        broadcaster = Broadcaster(size=2)
+        for n in range(1, 5):
+            broadcaster.publish('email', {'id': n})
+        events, missed = broadcaster.wait(0, 0)
+        assert [event[2]['id'] for event in events] == [3, 4] and missed
+
+
+class TestFeedJson:
+    """Tests for /admin/api/feed"""
+
+    def test_unauthenticated_get_is_refused(self, feed_app):
+        client = feed_app.test_client()
+        assert client.get('/admin/api/feed').status_code == 401
+        assert client.get('/admin/api/feed?since=0-0').status_code == 401
+
+    def test_without_since_returns_cursor_only(self, feed_app, admin_client):
+        post_email(feed_app, 'existing')
+        response = admin_client.get('/admin/api/feed')
+        assert response.json == {'items': [], 'cursor': '1-0', 'more': False}
+
+    def test_returns_only_newer_rows_oldest_first(self, feed_app, admin_client):
+        post_email(feed_app, 'before')
+        cursor = admin_client.get('/admin/api/feed').json['cursor']
+
+        post_email(feed_app, 'first')
+        post_message(feed_app, 'second')
+        post_email(feed_app, 'third')
+
+        feed = admin_client.get(f'/admin/api/feed?since={cursor}').json
+        assert [(item['type'], item['subject']) for item in feed['items']] == [
+            ('email', 'first'), ('message', 'second'), ('email', 'third')]
+        assert feed['items'][1]['url'] == '/admin/messages/1'
+        assert feed['cursor'] == '3-1' and feed['more'] is False
+        assert admin_client.get(f"/admin/api/feed?since={feed['cursor']}").json['items'] == []
+
+    def test_more_when_limited(self, feed_app, admin_client, monkeypatch):
+        from application.views import admin
+        monkeypatch.setattr(admin, 'FEED_LIMIT', 2)
+        for n in range(3):
+            post_email(feed_app, f'email {n}')
+
+        feed = admin_client.get('/admin/api/feed?since=0-0').json
+        assert len(feed['items']) == 2 and feed['more'] is True
+        rest = admin_client.get(f"/admin/api/feed?since={feed['cursor']}").json
+        assert [item['subject'] for item in rest['items']] == ['email 2'] and rest['more'] is False
+
+    @pytest.mark.parametrize('since', ['', 'x', '1', '1-2-3', '-1-0'])
+    def test_malformed_cursor(self, admin_client, since):
+        assert admin_client.get(f'/admin/api/feed?since={since}').status_code == 400
+
+
+class TestFeedStream:
+    """Tests for /admin/feed/stream"""
+
+    def test_unauthenticated_get_is_refused(self, feed_app):
+        assert feed_app.test_client().get('/admin/feed/stream').status_code == 401
+
+    def test_pushes_committed_rows(self, feed_app, admin_client):
+        stream = open_stream(admin_client)
+        try:
+            post_email(feed_app, 'hello')
+            post_message(feed_app, 'question')
+            event_id, kind, item = stream.next_event()
+            assert (event_id, kind) == ('1-0', 'email')
+            assert item['subject'] == 'hello' and item['preview'] == 'About hello'
+            assert item['url'] == '/admin/emails/1' and item['received_at']
+            assert stream.next_event()[:2] == ('1-1', 'message')
+        finally:
+            stream.close()
+
+    def test_announced_rows_skip_the_database(self, admin_client):
+        stream = open_stream(admin_client)
+        try:
+            feed_broadcaster.publish('email', {'id': 1, 'subject': 'pushed, not stored'})
+            assert stream.next_event() == ('1-0', 'email', {'id': 1, 'subject': 'pushed, not stored'})
+        finally:
+            stream.close()
+
+    def test_picks_up_rows_from_other_workers(self, feed_app, admin_client):
+        stream = open_stream(admin_client)
+        try:
+            insert_email(feed_app, 'elsewhere')
+            event_id, kind, item = stream.next_event()
+            assert (event_id, kind, item['subject']) == ('1-0', 'email', 'elsewhere')
+        finally:
+            stream.close()
+
+    def test_gap_in_announcements_reads_database(self, feed_app, admin_client):
+        stream = open_stream(admin_client)
+        try:
+            insert_email(feed_app, 'unannounced')
+            post_email(feed_app, 'announced')
+            assert [stream.next_event()[2]['subject'] for _ in range(2)] == ['unannounced', 'announced']
+        finally:
+            stream.close()
+
+    def test_resumes_from_last_event_id(self, feed_app, admin_client):
+        post_email(feed_app, 'seen')
+        post_email(feed_app, 'missed')
+        stream = open_stream(admin_client, headers={'Last-Event-ID': '1-0'}, query_string={'since': '0-0'})
+        try:
+            assert stream.next_event()[:2] == ('2-0', 'email')
+        finally:
+            stream.close()
+
+    def test_ends_after_max_seconds(self, feed_app, admin_client):
+        feed_app.config['ADMIN_FEED_MAX_SECONDS'] = 0.2
+        stream = open_stream(admin_client)
+        started = time.monotonic()
+        assert stream.next_event() is None
+        assert time.monotonic() - started < 2
+
+    def test_dashboard_links_feed(self, feed_app, admin_client):
+        post_email(feed_app, 'shown')
+        html = admin_client.get('/admin/dashboard').get_data(as_text=True)
+        assert 'data-feed-url="/admin/feed/stream?since=1-0"' in html
+        assert 'admin-feed.js' in html
+        paged = admin_client.get('/admin/dashboard?emails_cursor=abc').get_data(as_text=True)
+        assert 'data-feed-url' not in paged
+
+    def test_dashboard_links_feed_only_when_signed_in(self, feed_app):
+        html = feed_app.test_client().get('/admin/dashboard').get_data(as_text=True)
+        assert 'data-feed-url' not in html
@@ -0,0 +1,125 @@
+"""
+Tests for request latency histograms and sampled profiles
+"""
+import random
+
+import pytest
+
+from application.utils.metrics import LatencyHistogram, ProfileBuffer, bucket_bounds, bucket_index
+
+
+@pytest.fixture
+def metrics_app(make_app, admin_auth):
+    """Testing app profiling every request, with admin:pw as the admin login"""
+    app = make_app(PROFILE_SAMPLE_RATE=1.0, PROFILE_KEEP=2, PROPAGATE_EXCEPTIONS=False)
+
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+
+    return app
+
+
+class TestLatencyHistogram:
+    """Tests for the log-linear histogram"""
+
+    def test_buckets_are_contiguous(self):
+        previous_high = -1
+        for index in range(bucket_index(10 ** 8)):
+            low, high = bucket_bounds(index)
+            assert low == previous_high + 1 and low <= high
+            assert bucket_index(low) == index == bucket_index(high)
+            previous_high = high
+
+    def test_percentiles_within_precision(self):
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(-5, 1.5) for _ in range(20000))
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        for fraction in (0.5, 0.9, 0.99):
+            exact = values[round(fraction * len(values)) - 1] * 1_000_000
+            assert abs(histogram.percentile(fraction) - exact) <= exact * 0.04 + 1
+        assert histogram.max == int(values[-1] * 1_000_000)
+        assert len(histogram.buckets) < 600
+
+    def test_merge_equals_recording_everything(self):
+        first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for n in range(1, 1000):
+            (first if n % 2 else second).record(n / 1000)
+            combined.record(n / 1000)
+
+        merged = LatencyHistogram.from_dict(first.to_dict()).merge(LatencyHistogram.from_dict(second.to_dict()))
+        assert merged.buckets == combined.buckets
+        assert merged.summary() == combined.summary()
+
+
+class TestProfileBuffer:
+    """Tests for the slowest-N profile buffer"""
+
+    def test_keeps_slowest(self):
+        buffer = ProfileBuffer(size=2)
+        for seconds in (0.3, 0.1, 0.5, 0.2):
+            buffer.add(seconds, None, {'path': str(seconds)})
+        assert [entry['path'] for entry in buffer.entries()] == ['0.5', '0.3']
+
+    def test_zero_size_keeps_nothing(self):
+        buffer = ProfileBuffer(size=0)
+        buffer.add(1.0, None, {})
+        assert buffer.entries() == []
+
+
+class TestPerformanceEndpoints:
+    """
+    Tests for request timing and the admin performance views
+
+    Requests are buffered so the test client closes them, as a server would.
+    """
+
+    def test_requires_auth(self, metrics_app):
+        client = metrics_app.test_client()
+        assert client.get('/admin/performance').status_code == 401
+        assert client.get('/admin/performance/profiles/1').status_code == 401
+
+    def test_routes_and_statuses_recorded(self, metrics_app, admin_auth):
+        client = metrics_app.test_client()
+        for _ in range(3):
+            client.get('/health', buffered=True)
+        client.get('/no-such-page', buffered=True)
+        client.get('/boom', buffered=True)
+
+        report = client.get('/admin/performance?buckets=1', headers=admin_auth).json
+        routes = report['routes']
+        assert routes['api.health_check']['count'] == 3
+        assert routes['api.health_check']['statuses'] == {'200': 3}
+        assert routes['unmatched']['statuses'] == {'404': 1}
+        assert routes['boom']['statuses'] == {'500': 1}
+        assert routes['api.health_check']['p50_ms'] <= routes['api.health_check']['max_ms']
+        assert LatencyHistogram.from_dict(routes['api.health_check']['histogram']).count == 3
+
+    def test_slowest_profiles_served(self, metrics_app, admin_auth):
+        client = metrics_app.test_client()
+        for _ in range(4):
+            client.get('/health', buffered=True)
+
+        profiles = client.get('/admin/performance', headers=admin_auth).json['profiles']
+        assert len(profiles) == 2
+        assert profiles[0]['duration_ms'] >= profiles[1]['duration_ms']
+        assert profiles[0]['endpoint'] == 'api.health_check' and profiles[0]['request_id']
+
+        response = client.get(profiles[0]['url'] + '?sort=tottime', headers=admin_auth)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert 'function calls' in response.get_data(as_text=True)
+
+    def test_unknown_profile_and_sort(self, metrics_app, admin_auth):
+        client = metrics_app.test_client()
+        assert client.get('/admin/performance/profiles/999', headers=admin_auth).status_code == 404
+        assert client.get('/admin/performance/profiles/1?sort=bogus', headers=admin_auth).status_code == 400
+
+    def test_off_by_default(self, app):
+        app.test_client().get('/health', buffered=True)
+        metrics = app.extensions['request_metrics']
+        assert metrics.sample_rate == 0 and metrics.profiles.entries() == []
+        assert metrics.histograms['api.health_check'].count == 1
@@ -0,0 +1,129 @@
+"""
+Tests for schema migrations and the query plans they support
+"""
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text
+
+from application.database import Migration, run_migrations, pending_migrations, keyset_statement, encode_cursor
+from application.extensions import db
+from application.models import MIGRATIONS, ContactMessage, InboundEmail
+from application.views.admin import ADMIN_PAGE_SIZE, contact_message_list_statement, inbound_email_list_statement
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine on an empty SQLite file"""
+    return create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+
+
+class TestMigrationRunner:
+    """Tests for the versioned migration runner"""
+
+    def test_applies_pending_in_order_once(self, engine):
+        """Test migrations run in version order and are recorded"""
+        calls = []
+        migrations = [
+            Migration(2, 'second', lambda conn: calls.append(2)),
+            Migration(1, 'first', lambda conn: calls.append(1)),
+        ]
+
+        assert [m.version for m in run_migrations(engine, migrations)] == [1, 2]
+        assert run_migrations(engine, migrations) == []
+        assert calls == [1, 2]
+
+        with engine.connect() as conn:
+            rows = conn.execute(text('SELECT version, name FROM schema_migrations ORDER BY version')).all()
+        assert rows == [(1, 'first'), (2, 'second')]
+
+    def test_failed_migration_is_retried(self, engine):
+        """Test a failing migration is not recorded and runs again next time"""
+        attempts = []
+
+        def flaky(conn):
+            conn.execute(text('CREATE TABLE IF NOT EXISTS half_done (id INTEGER)'))
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError('boom')
+
+        migrations = [Migration(1, 'flaky', flaky)]
+        with pytest.raises(RuntimeError):
+            run_migrations(engine, migrations)
+        assert pending_migrations(engine, migrations) == migrations
+
+        assert run_migrations(engine, migrations) == migrations
+        assert pending_migrations(engine, migrations) == []
+
+    def test_duplicate_versions_rejected(self, engine):
+        """Test two migrations can't share a version"""
+        with pytest.raises(ValueError, match='Duplicate'):
+            run_migrations(engine, [Migration(1, 'a', lambda c: None), Migration(1, 'b', lambda c: None)])
+
+
+@pytest.fixture
+def migrated_engine(engine):
+    """Engine with every website migration applied"""
+    run_migrations(engine, MIGRATIONS)
+    return engine
+
+
+def query_plan(engine, statement):
+    """EXPLAIN QUERY PLAN details for a statement"""
+    sql = statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True})
+    with engine.connect() as conn:
+        return [row[3] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+def assert_uses_index(plan, table):
+    """Fail if the plan scans the table without an index or sorts in a temp b-tree"""
+    for detail in plan:
+        assert not (detail.startswith(f'SCAN {table}') and 'INDEX' not in detail), plan
+        assert 'TEMP B-TREE' not in detail, plan
+
+
+class TestHotQueryPlans:
+    """Dashboard and webhook queries must stay index-backed as the tables grow"""
+
+    def test_migrations_upgrade_legacy_schema(self, engine):
+        """Test the original tables gain every later column and index"""
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE inbound_email (id INTEGER PRIMARY KEY, from_email VARCHAR(200) NOT NULL, '
+                              'to_email VARCHAR(200) NOT NULL, subject VARCHAR(500) NOT NULL, text_content TEXT, '
+                              'html_content TEXT, received_at DATETIME)'))
+            conn.execute(text("INSERT INTO inbound_email (from_email, to_email, subject, text_content, received_at) "
+                              "VALUES ('a@example.com', 'b@example.com', 'Hi', 'Hello there', '2026-01-01')"))
+
+        run_migrations(engine, MIGRATIONS)
+
+        columns = {column['name'] for column in inspect(engine).get_columns('inbound_email')}
+        assert {'dedup_key', 'preview'} <= columns
+        indexes = {index['name'] for index in inspect(engine).get_indexes('inbound_email')}
+        assert {'ix_inbound_email_received_at', 'ix_inbound_email_dedup_key'} <= indexes
+        with engine.connect() as conn:
+            assert conn.execute(text('SELECT preview FROM inbound_email')).scalar_one() == 'Hello there'
+            assert conn.execute(text("SELECT rowid FROM inbound_email_fts WHERE inbound_email_fts MATCH 'hello'")).all()
+
+    @pytest.mark.parametrize('cursor', [None, encode_cursor(datetime(2026, 1, 1), 500)])
+    def test_inbound_email_dashboard_page(self, migrated_engine, cursor):
+        """Test inbound email pages walk the received_at index"""
+        statement = keyset_statement(inbound_email_list_statement(), InboundEmail.received_at,
+                                     InboundEmail.id, cursor, ADMIN_PAGE_SIZE + 1)
+        plan = query_plan(migrated_engine, statement)
+        assert_uses_index(plan, 'inbound_email')
+        assert any('ix_inbound_email_received_at' in detail for detail in plan), plan
+
+    @pytest.mark.parametrize('cursor', [None, encode_cursor(datetime(2026, 1, 1), 500)])
+    def test_contact_message_dashboard_page(self, migrated_engine, cursor):
+        """Test contact message pages walk the created_at index"""
+        statement = keyset_statement(contact_message_list_statement(), ContactMessage.created_at,
+                                     ContactMessage.id, cursor, ADMIN_PAGE_SIZE + 1)
+        plan = query_plan(migrated_engine, statement)
+        assert_uses_index(plan, 'contact_message')
+        assert any('ix_contact_message_created_at' in detail for detail in plan), plan
+
+    def test_webhook_dedup_lookup(self, migrated_engine):
+        """Test the duplicate delivery check is an index search"""
+        statement = db.select(InboundEmail.id).where(InboundEmail.dedup_key == 'x' * 64)
+        plan = query_plan(migrated_engine, statement)
+        assert_uses_index(plan, 'inbound_email')
+        assert any('ix_inbound_email_dedup_key' in detail for detail in plan), plan
@@ -0,0 +1,321 @@
+"""
+Tests for page responses: SPA fragments and caching
+"""
+from datetime import datetime
+
+import pytest
+
+from application.assets import freeze_site
+from application.extensions import db, page_cache
+from application.models import InboundEmail
+
+
+SPA_HEADERS = {'X-SPA-Request': 'true', 'X-Requested-With': 'XMLHttpRequest'}
+PAGES = ['/', '/about', '/projects', '/games', '/cat-cafe', '/contact']
+
+
+class TestSpaFragments:
+    """SPA navigations get the content fragment only"""
+
+    @pytest.mark.parametrize('path', PAGES)
+    def test_fragment_has_what_the_router_swaps(self, client, path):
+        html = client.get(path, headers=SPA_HEADERS).get_data(as_text=True)
+
+        assert '<div id="spa-content">' in html
+        assert '<div id="spa-modals">' in html
+        assert '<title>' in html
+        assert 'chatWidgetContainer' not in html
+        assert '<header>' not in html
+
+    @pytest.mark.parametrize('path', PAGES)
+    def test_full_page_has_shell(self, client, path):
+        html = client.get(path).get_data(as_text=True)
+        assert 'chatWidgetContainer' in html
+        assert '<header>' in html
+
+    def test_fragment_keeps_page_scripts_and_data_page(self, client):
+        html = client.get('/cat-cafe', headers={'X-SPA-Request': 'true'}).get_data(as_text=True)
+        assert 'data-page="cat-cafe"' in html
+        assert 'cat-cafe' in html.rsplit('<script', 1)[-1]
+
+    def test_fragment_carries_modals(self, client):
+        """Game modals live outside spa-content and must come along"""
+        full = client.get('/games').get_data(as_text=True)
+        fragment = client.get('/games', headers=SPA_HEADERS).get_data(as_text=True)
+        modals = full.split('<div id="spa-modals">', 1)[1].split('</div>', 1)[0]
+        assert modals.strip() and modals in fragment
+
+    @pytest.mark.parametrize('headers', [{}, SPA_HEADERS])
+    def test_vary_on_spa_headers(self, client, headers):
+        vary = client.get('/about', headers=headers).headers['Vary']
+        assert 'X-SPA-Request' in vary and 'X-Requested-With' in vary
+
+    def test_variants_cached_separately(self, client):
+        """The render cache never serves the fragment for a full-page request"""
+        client.get('/projects', headers=SPA_HEADERS)
+        assert '<header>' in client.get('/projects').get_data(as_text=True)
+        assert '<header>' not in client.get('/projects', headers=SPA_HEADERS).get_data(as_text=True)
+
+    def test_json_responses_do_not_vary(self, client):
+        assert 'X-SPA-Request' not in client.get('/api/status').headers.get('Vary', '')
+
+
+class TestConditionalPages:
+    """Cached pages carry strong ETags and honour If-None-Match"""
+
+    def test_etag_is_stable_across_hits(self, client):
+        first = client.get('/about')
+        second = client.get('/about')
+        assert first.headers['ETag'] == second.headers['ETag']
+        assert not first.headers['ETag'].startswith('W/')
+
+    def test_matching_etag_gets_304_without_body(self, client):
+        etag = client.get('/projects').headers['ETag']
+        response = client.get('/projects', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
+
+    def test_first_request_can_be_conditional(self, app, client):
+        """A miss is answered conditionally too (e.g. after a worker restart)"""
+        etag = client.get('/games').headers['ETag']
+        page_cache.clear()
+        assert client.get('/games', headers={'If-None-Match': etag}).status_code == 304
+
+    def test_variants_have_different_etags(self, client):
+        assert client.get('/about').headers['ETag'] != client.get('/about', headers=SPA_HEADERS).headers['ETag']
+
+    def test_stale_etag_gets_full_page(self, client):
+        response = client.get('/about', headers={'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+        assert response.data
+
+
+class TestCompressedPages:
+    """Cached pages are compressed once per encoding, and 304s match the encoded 200"""
+
+    def test_hits_reuse_the_compressed_body(self, client):
+        import gzip
+        from unittest.mock import patch
+        from application.utils import compression
+
+        identity = client.get('/about').data
+        with patch.object(compression, 'compress_body', wraps=compression.compress_body) as compress:
+            first = client.get('/about', headers={'Accept-Encoding': 'gzip'})
+            second = client.get('/about', headers={'Accept-Encoding': 'gzip'})
+        assert compress.call_count == 1
+        assert second.headers['Content-Encoding'] == 'gzip'
+        assert second.data == first.data and gzip.decompress(second.data) == identity
+        assert 'rel=preload' in second.headers['Link']
+
+    def test_304_carries_the_compressed_validators(self, client):
+        first = client.get('/projects', headers={'Accept-Encoding': 'gzip'})
+        assert first.headers['ETag'].startswith('W/')
+
+        response = client.get('/projects', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == first.headers['ETag']
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+
+class TestPreloadLinks:
+    """Full pages advertise their critical assets in a Link header"""
+
+    def test_page_links_its_own_bundle_and_shared_origins(self, client):
+        link = client.get('/games').headers['Link']
+
+        assert '<https://fonts.gstatic.com>; rel=preconnect; crossorigin' in link
+        assert 'katex.min.css>; rel=preload; as=style; crossorigin' in link
+        assert 'rel=preload; as=script' in link
+        # Only this page's scripts; the home page's carousel isn't advertised
+        assert 'carousel' not in link and 'home' not in link
+
+    def test_cached_page_keeps_its_link_header(self, client):
+        first = client.get('/about').headers['Link']
+        assert client.get('/about').headers['Link'] == first
+
+    def test_spa_fragments_and_errors_have_no_link_header(self, client):
+        assert 'Link' not in client.get('/games', headers=SPA_HEADERS).headers
+        assert 'Link' not in client.get('/no-such-page').headers
+
+    def test_early_hints_sent_once_learned(self, client):
+        sent = []
+        environ = {'wsgi.early_hints': sent.append}
+        first = client.get('/projects', environ_overrides=environ)
+        client.get('/projects', environ_overrides=environ)
+
+        assert sent == [[('Link', first.headers['Link'])]]
+
+
+@pytest.fixture
+def admin_app(make_app):
+    """
+    The testing app with its database migrated
+
+    Not the `app` fixture: pytest-flask pushes a request context around
+    tests that use it, so client requests would share one session and not
+    see rows written after the first request.
+    """
+    return make_app(migrate=True)
+
+
+@pytest.fixture
+def admin_client(admin_app):
+    return admin_app.test_client()
+
+
+def add_email(app, subject, received_at):
+    with app.app_context():
+        email = InboundEmail(from_email='a@example.com', to_email='b@example.com', subject=subject,
+                                  text_content='Hello', received_at=received_at, dedup_key=subject)
+        db.session.add(email)
+        db.session.commit()
+        return email.id
+
+
+class TestAdminJsonLists:
+    """Admin list endpoints send Last-Modified from the newest row"""
+
+    def test_unauthenticated_get_is_refused(self, admin_app, admin_client):
+        add_email(admin_app, 'private', datetime(2024, 1, 1))
+        assert admin_client.get('/admin/api/emails').status_code == 401
+        assert admin_client.get('/admin/api/messages').status_code == 401
+
+    def test_list_with_validators(self, admin_app, admin_auth, admin_client):
+        add_email(admin_app, 'older', datetime(2024, 1, 1, 8, 0))
+        add_email(admin_app, 'newer', datetime(2024, 1, 2, 9, 30, 15, 123))
+
+        response = admin_client.get('/admin/api/emails', headers=admin_auth)
+
+        assert response.status_code == 200
+        assert [item['subject'] for item in response.json['items']] == ['newer', 'older']
+        assert response.json['count'] == 2
+        assert response.headers['Last-Modified'] == 'Tue, 02 Jan 2024 09:30:15 GMT'
+        assert response.headers['ETag']
+
+    def test_if_modified_since_gets_304(self, admin_app, admin_auth, admin_client):
+        add_email(admin_app, 'only', datetime(2024, 1, 2, 9, 30, 15))
+        last_modified = admin_client.get('/admin/api/emails', headers=admin_auth).headers['Last-Modified']
+
+        response = admin_client.get('/admin/api/emails', headers={**admin_auth, 'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_new_row_invalidates(self, admin_app, admin_auth, admin_client):
+        add_email(admin_app, 'first', datetime(2024, 1, 1))
+        etag = admin_client.get('/admin/api/emails', headers=admin_auth).headers['ETag']
+        add_email(admin_app, 'second', datetime(2024, 1, 3))
+
+        response = admin_client.get('/admin/api/emails', headers={**admin_auth, 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json['count'] == 2
+
+    def test_deleting_an_older_row_invalidates_etag(self, admin_app, admin_auth, admin_client):
+        """Last-Modified can't see deletions; the ETag covers the row count"""
+        old_id = add_email(admin_app, 'old', datetime(2024, 1, 1))
+        add_email(admin_app, 'new', datetime(2024, 1, 3))
+        etag = admin_client.get('/admin/api/emails', headers=admin_auth).headers['ETag']
+
+        with admin_app.app_context():
+            db.session.delete(db.session.get(InboundEmail, old_id))
+            db.session.commit()
+
+        assert admin_client.get('/admin/api/emails', headers={**admin_auth, 'If-None-Match': etag}).status_code == 200
+
+    def test_empty_list_has_no_last_modified(self, admin_app, admin_auth, admin_client):
+        response = admin_client.get('/admin/api/messages', headers=admin_auth)
+        assert response.json == {'count': 0, 'items': [], 'next_cursor': None}
+        assert 'Last-Modified' not in response.headers
+
+
+class TestAdminDetails:
+    """Full email and message views"""
+
+    def test_unauthenticated_get_is_refused(self, admin_app):
+        add_email(admin_app, 'private', datetime(2024, 1, 1))
+        client = admin_app.test_client()
+        assert client.get('/admin/emails/1').status_code == 401
+        assert client.get('/admin/messages/1').status_code == 401
+
+    def test_served_to_the_admin(self, admin_app, admin_auth):
+        add_email(admin_app, 'private', datetime(2024, 1, 1))
+        response = admin_app.test_client().get('/admin/emails/1', headers=admin_auth)
+        assert response.status_code == 200
+        assert 'private' in response.get_data(as_text=True)
+
+
+class TestAdminSearch:
+    """Full-text search over the inbox"""
+
+    def test_unauthenticated_search_is_refused(self, admin_app):
+        client = admin_app.test_client()
+        assert client.get('/admin/search?q=private').status_code == 401
+        assert client.get('/admin/search?q=private&format=json').status_code == 401
+
+    def test_admin_can_search(self, admin_app, admin_auth):
+        add_email(admin_app, 'private', datetime(2024, 1, 1))
+        response = admin_app.test_client().get('/admin/search?q=hello&format=json', headers=admin_auth)
+        assert [result['id'] for result in response.json['results']] == [1]
+
+
+class TestUndatedRows:
+    """Rows stored without a timestamp, from before the column defaults"""
+
+    def test_migration_backfills_from_neighbours(self, tmp_path):
+        from sqlalchemy import create_engine, text
+
+        from application.database import run_migrations
+        from application.models import MIGRATIONS
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        run_migrations(engine, [migration for migration in MIGRATIONS if migration.version < 6])
+        with engine.begin() as conn:
+            for n, received_at in enumerate([None, '2024-01-01 08:00:00.000000', None, '2024-01-03 08:00:00.000000']):
+                conn.execute(text("INSERT INTO inbound_email (from_email, to_email, subject, received_at, dedup_key) "
+                                  "VALUES ('a', 'b', 'Hi', :received_at, :key)"), {'received_at': received_at, 'key': n})
+        run_migrations(engine, MIGRATIONS)
+
+        with engine.connect() as conn:
+            dates = conn.execute(text('SELECT received_at FROM inbound_email ORDER BY id')).scalars().all()
+        assert [date[:10] for date in dates] == ['2024-01-01', '2024-01-01', '2024-01-01', '2024-01-03']
+
+    def test_lists_tolerate_null_timestamps(self, admin_app, admin_auth):
+        add_email(admin_app, 'undated', None)
+        with admin_app.app_context():
+            db.session.execute(db.update(InboundEmail).values(received_at=None))
+            db.session.commit()
+        client = admin_app.test_client()
+        assert client.get('/admin/dashboard').status_code == 200
+        assert client.get('/admin/api/emails', headers=admin_auth).json['items'][0]['received_at'] is None
+        assert client.get('/admin/emails/1', headers=admin_auth).status_code == 200
+
+
+class TestFreeze:
+    """Pre-rendering the public pages"""
+
+    def test_writes_both_variants_with_compressed_siblings(self, app, tmp_path):
+        output = tmp_path / 'site'
+        result = freeze_site(app, str(output), routes=('/', '/about'))
+
+        assert result['pages'] == ['index.html', 'index.spa.html', 'about/index.html', 'about/index.spa.html']
+        assert '<header>' in (output / 'about' / 'index.html').read_text()
+        assert '<header>' not in (output / 'about' / 'index.spa.html').read_text()
+        assert (output / 'index.html.gz').exists()
+
+    def test_frozen_page_matches_live_response(self, app, client, tmp_path):
+        freeze_site(app, str(tmp_path / 'site'), routes=('/projects',))
+        assert (tmp_path / 'site' / 'projects' / 'index.html').read_bytes() == client.get('/projects').data
+
+    def test_replaces_previous_freeze(self, app, tmp_path):
+        output = tmp_path / 'site'
+        freeze_site(app, str(output), routes=('/about',))
+        freeze_site(app, str(output), routes=('/',))
+        assert not (output / 'about').exists()
+        assert (output / 'index.html').exists()
+
+    def test_refuses_to_overwrite_other_directories(self, app, tmp_path):
+        (tmp_path / 'notes.txt').write_text('keep me')
+        with pytest.raises(RuntimeError):
+            freeze_site(app, str(tmp_path), routes=('/',))
+        assert (tmp_path / 'notes.txt').exists()
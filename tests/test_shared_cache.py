@@ -0,0 +1,128 @@
+"""
+Tests for the cross-worker shared cache
+"""
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from application.utils.shared_cache import SharedCache
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return SharedCache(str(tmp_path / 'cache.sqlite3'), default_ttl=60, clock=clock)
+
+
+def _set_in_child(path):
+    SharedCache(path).set('from-child', {'pid': 'child'})
+
+
+class TestSharedCache:
+    """Tests for get/set/incr, expiry and eviction"""
+
+    def test_get_set_delete(self, cache):
+        assert cache.get('missing', 'default') == 'default'
+        assert cache.set('answer', {'text': 'hello', 'tokens': [1, 2]})
+        assert cache.get('answer') == {'text': 'hello', 'tokens': [1, 2]}
+
+        cache.delete('answer')
+        assert cache.get('answer') is None
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+    def test_entries_expire(self, cache, clock):
+        cache.set('short', 1, ttl=10)
+        cache.set('default', 2)
+        cache.set('forever', 3, ttl=None)
+        cache.default_ttl = None
+        cache.set('forever', 3)
+
+        clock.now += 30
+        assert cache.get('short') is None
+        assert cache.get('default') == 2
+        clock.now += 3600
+        assert cache.get('default') is None
+        assert cache.get('forever') == 3
+
+    def test_incr_keeps_the_window(self, cache, clock):
+        assert cache.incr('failures:admin', ttl=60) == 1
+        clock.now += 30
+        assert cache.incr('failures:admin', ttl=60) == 2
+        clock.now += 31
+        assert cache.incr('failures:admin', ttl=60) == 1
+
+    def test_get_or_set(self, cache):
+        calls = []
+        for _ in range(3):
+            assert cache.get_or_set('page', lambda: calls.append(1) or 'rendered') == 'rendered'
+        assert calls == [1]
+
+    def test_least_recently_used_evicted_at_entry_cap(self, cache, clock):
+        cache.max_entries = 3
+        cache.touch_interval = 0
+        for key in ('a', 'b', 'c'):
+            clock.now += 1
+            cache.set(key, key)
+        clock.now += 1
+        cache.get('a')
+
+        clock.now += 1
+        cache.set('d', 'd')
+        assert cache.get('b') is None
+        assert [cache.get(key) for key in ('a', 'c', 'd')] == ['a', 'c', 'd']
+        assert cache.stats()['entries'] == 3
+
+    def test_expired_evicted_before_live(self, cache, clock):
+        cache.max_entries = 2
+        cache.set('expiring', 1, ttl=1)
+        clock.now += 1
+        cache.set('live', 2)
+        clock.now += 1
+        cache.set('new', 3)
+        assert cache.get('live') == 2 and cache.get('new') == 3
+
+    def test_size_cap(self, cache):
+        cache.max_bytes = 10_000
+        for n in range(10):
+            assert cache.set(f'blob{n}', b'x' * 2000)
+        stats = cache.stats()
+        assert stats['bytes'] <= 10_000 and stats['entries'] < 10
+        assert cache.get('blob9') == b'x' * 2000
+
+        # Larger than the whole cache: refused, nothing evicted for it
+        assert not cache.set('huge', b'x' * 20_000)
+        assert cache.get('blob9') is not None
+
+    def test_visible_across_processes(self, cache):
+        process = multiprocessing.get_context('spawn').Process(target=_set_in_child, args=(cache.path,))
+        process.start()
+        process.join(30)
+        assert process.exitcode == 0
+        assert cache.get('from-child') == {'pid': 'child'}
+
+    def test_errors_are_misses(self, tmp_path):
+        blocker = tmp_path / 'not-a-directory'
+        blocker.write_text('')
+        cache = SharedCache(str(blocker / 'cache.sqlite3'))
+        assert cache.get('key', 'default') == 'default'
+        assert cache.set('key', 'value') is False
+
+        broken = SharedCache(str(tmp_path / 'cache.sqlite3'))
+        broken.set('key', 'value')
+        broken._connection().execute('DROP TABLE entries')
+        assert broken.get('key', 'default') == 'default'
+        assert broken.set('key', 'value') is False
+
+    def test_hit_survives_a_locked_touch(self, tmp_path, clock):
+        cache = SharedCache(str(tmp_path / 'cache.sqlite3'), busy_timeout=0.05, clock=clock)
+        cache.set('key', 'value')
+        clock.now += cache.touch_interval + 1
+
+        # Another worker holds the write lock
+        other = sqlite3.connect(cache.path, isolation_level=None)
+        other.execute('BEGIN IMMEDIATE')
+        try:
+            assert cache.get('key') == 'value'
+        finally:
+            other.execute('ROLLBACK')
+        assert cache.hits == 1 and cache.misses == 0
@@ -1,9 +1,17 @@
 """
 Tests for utility functions
 """
+import io
+import json
+import logging
+import os
+import sys
+from datetime import datetime
 import pytest
 from unittest.mock import Mock, patch, MagicMock
-from application.utils.auth_utils import verify_admin_credentials, requires_auth
+from application.utils import auth_utils
+from application.utils.auth_utils import (verify_admin_credentials, requires_auth, CredentialCache,
+                                          FailureThrottle)
 from application.utils.email_utils import send_contact_notification
 
 
@@ -54,6 +62,141 @@ class TestAuthUtils:
             assert status == 401
 
 
+class TestCredentialCache:
+    """Tests for the verified-credential cache"""
+
+    def test_remembers_until_ttl(self, clock):
+        cache = CredentialCache(ttl=60, clock=clock)
+        cache.add('admin', 'secret')
+
+        assert cache.contains('admin', 'secret')
+        assert not cache.contains('admin', 'other')
+        clock.now += 61
+        assert not cache.contains('admin', 'secret')
+
+    def test_bounded_size_drops_oldest(self):
+        cache = CredentialCache(max_size=2)
+        for password in ('one', 'two', 'three'):
+            cache.add('admin', password)
+        assert not cache.contains('admin', 'one')
+        assert cache.contains('admin', 'two') and cache.contains('admin', 'three')
+
+    def test_stores_no_passwords(self):
+        cache = CredentialCache()
+        cache.add('admin', 'hunter2')
+        assert all(b'hunter2' not in key for key in cache._entries)
+
+
+class TestFailureThrottle:
+    """Tests for the per-username failure throttle"""
+
+    def test_locks_out_after_max_failures_in_window(self, clock):
+        throttle = FailureThrottle(max_failures=3, window=60, clock=clock)
+        for _ in range(2):
+            throttle.record_failure('admin')
+        assert throttle.retry_after('admin') == 0
+
+        throttle.record_failure('admin')
+        assert throttle.retry_after('admin') == 60
+        assert throttle.retry_after('someone-else') == 0
+
+        clock.now += 45
+        assert throttle.retry_after('admin') == 15
+        clock.now += 15
+        assert throttle.retry_after('admin') == 0
+
+    def test_reset_clears_failures(self):
+        throttle = FailureThrottle(max_failures=1)
+        throttle.record_failure('admin')
+        throttle.reset('admin')
+        assert throttle.retry_after('admin') == 0
+
+    def test_tracks_bounded_number_of_usernames(self):
+        throttle = FailureThrottle(max_failures=2, max_tracked=2)
+        for username in ('a', 'b', 'c'):
+            throttle.record_failure(username)
+        assert list(throttle._failures) == ['b', 'c']
+
+    def test_locked_out_username_is_never_evicted(self):
+        throttle = FailureThrottle(max_failures=2, max_tracked=2)
+        for _ in range(2):
+            throttle.record_failure('admin')
+        for n in range(1024):
+            throttle.record_failure(f'junk{n}')
+        assert throttle.retry_after('admin') > 0
+        assert len(throttle._failures) == 2
+
+
+@pytest.fixture
+def basic_auth(app, monkeypatch):
+    """Call a protected view with Basic auth and no session cookie"""
+    from werkzeug.security import generate_password_hash
+
+    monkeypatch.setenv('ADMIN_USERNAME', 'admin')
+    monkeypatch.setenv('ADMIN_PASSWORD_HASH', generate_password_hash('securepass123'))
+    auth_utils.credential_cache.clear()
+    auth_utils.failure_throttle.clear()
+
+    @requires_auth
+    def protected_route():
+        return 'Success'
+
+    def call(password, username='admin'):
+        with app.test_request_context(auth=(username, password)):
+            return protected_route()
+
+    yield call
+    auth_utils.credential_cache.clear()
+    auth_utils.failure_throttle.clear()
+
+
+class TestRequiresAuthCaching:
+    """Basic-auth clients without a session cookie"""
+
+    def test_repeat_calls_skip_password_hash(self, basic_auth):
+        with patch.object(auth_utils, 'check_password_hash', wraps=auth_utils.check_password_hash) as check:
+            assert basic_auth('securepass123') == 'Success'
+            assert basic_auth('securepass123') == 'Success'
+        assert check.call_count == 1
+
+    def test_password_change_invalidates_cache(self, basic_auth, monkeypatch):
+        from werkzeug.security import generate_password_hash
+
+        assert basic_auth('securepass123') == 'Success'
+        monkeypatch.setenv('ADMIN_PASSWORD_HASH', generate_password_hash('newpass456'))
+        assert basic_auth('securepass123')[1] == 401
+
+    def test_failures_are_throttled_without_hashing(self, basic_auth):
+        for _ in range(auth_utils.failure_throttle.max_failures):
+            assert basic_auth('guess')[1] == 401
+
+        with patch.object(auth_utils, 'check_password_hash') as check:
+            body, status, headers = basic_auth('another guess')
+        assert status == 429
+        assert int(headers['Retry-After']) > 0
+        check.assert_not_called()
+
+    def test_recently_verified_client_passes_while_throttled(self, basic_auth):
+        assert basic_auth('securepass123') == 'Success'
+        for _ in range(auth_utils.failure_throttle.max_failures):
+            basic_auth('guess')
+        assert basic_auth('securepass123') == 'Success'
+
+    def test_other_usernames_do_not_clear_admin_lockout(self, basic_auth):
+        for _ in range(auth_utils.failure_throttle.max_failures):
+            basic_auth('guess')
+        for n in range(auth_utils.failure_throttle.max_tracked):
+            assert basic_auth('guess', username=f'junk{n}')[1] == 401
+        assert basic_auth('another guess')[1] == 429
+        assert list(auth_utils.failure_throttle._failures) == ['admin']
+
+    def test_success_resets_failures(self, basic_auth):
+        for _ in range(auth_utils.failure_throttle.max_failures - 1):
+            basic_auth('guess')
+        assert basic_auth('securepass123') == 'Success'
+        assert auth_utils.failure_throttle.retry_after('admin') == 0
+
+
 class TestEmailUtils:
     """Tests for email utilities"""
 
@@ -112,3 +255,365 @@ class TestEmailUtils:
         )
 
         assert result is False
+
+
+class TestWebhookUtils:
+    """Tests for inbound webhook utilities"""
+
+    def test_dedup_key_uses_message_id(self):
+        """Test deliveries with the same Message-ID share a key"""
+        from application.utils.webhook_utils import inbound_email_dedup_key
+
+        headers = "From: a@example.com\nMessage-ID: <abc123@mail.example.com>\nSubject: Hi\n"
+        first = inbound_email_dedup_key({'headers': headers, 'subject': 'Hi', 'text': 'one'})
+        retry = inbound_email_dedup_key({'headers': headers, 'subject': 'Hi', 'text': 'two'})
+
+        assert first == retry
+        assert len(first) == 64
+
+    def test_dedup_key_falls_back_to_content_hash(self):
+        """Test payloads without a Message-ID are keyed by content"""
+        from application.utils.webhook_utils import inbound_email_dedup_key
+
+        email_data = {'from': 'a@example.com', 'to': 'b@example.com', 'subject': 'Hi', 'text': 'Hello'}
+
+        assert inbound_email_dedup_key(email_data) == inbound_email_dedup_key(dict(email_data))
+        assert inbound_email_dedup_key(email_data) != inbound_email_dedup_key({**email_data, 'text': 'Bye'})
+
+    def test_backfilled_row_matches_redelivery(self, client, db):
+        """Test a row keyed from its stored fields is found when SendGrid redelivers it"""
+        from application.database import collapse_duplicate_emails
+        from application.models import InboundEmail
+
+        headers = "From: a@example.com\nMessage-ID: <legacy@mail.example.com>\n"
+        # No subject: stored as 'No Subject', which the key must agree with
+        delivery = {'from': 'a@example.com', 'to': 'b@example.com', 'text': 'Hello', 'headers': headers}
+        email_id = client.post('/webhook/sendgrid', data=delivery).json['email_id']
+        # As if it had been stored before dedup keys existed, then backfilled
+        row = db.session.get(InboundEmail, email_id)
+        row.dedup_key = None
+        row.received_at = datetime(2020, 1, 1)
+        db.session.commit()
+        assert collapse_duplicate_emails(db.session, InboundEmail, InboundEmail.compute_dedup_key) == (1, 0)
+
+        for retry in (delivery, {key: value for key, value in delivery.items() if key != 'headers'}):
+            response = client.post('/webhook/sendgrid', data=retry)
+            assert response.json == {'status': 'duplicate', 'message': 'Email already received',
+                                     'email_id': email_id}
+        assert db.session.query(InboundEmail).count() == 1
+
+    def test_content_match_needs_a_pre_dedup_row(self, client, db):
+        """Test a new Message-ID with the same content as a current email is stored"""
+        from application.models import InboundEmail
+
+        delivery = {'from': 'a@example.com', 'to': 'b@example.com', 'subject': 'Ping', 'text': 'Ping'}
+        # Keyed by content, but received after dedup keys existed
+        first = client.post('/webhook/sendgrid', data=delivery).json
+        second = client.post('/webhook/sendgrid',
+                             data={**delivery, 'headers': 'Message-ID: <ping-2@mail.example.com>\n'}).json
+
+        assert first['status'] == second['status'] == 'success'
+        assert db.session.query(InboundEmail).count() == 2
+
+
+class TestTextUtils:
+    """Tests for text utilities"""
+
+    def test_preview_collapses_whitespace(self):
+        """Test previews are single-line"""
+        from application.utils.text_utils import make_preview
+
+        assert make_preview("Hello\n\n  world\t!") == "Hello world !"
+
+    def test_preview_truncates_long_text(self):
+        """Test long bodies are cut with an ellipsis"""
+        from application.utils.text_utils import make_preview
+
+        preview = make_preview("word " * 100, length=50)
+        assert len(preview) <= 50
+        assert preview.endswith('...')
+
+    def test_preview_of_empty_body(self):
+        """Test missing bodies have no preview"""
+        from application.utils.text_utils import make_preview
+
+        assert make_preview(None) is None
+        assert make_preview('') is None
+
+
+class TestRenderCache:
+    """Tests for the rendered page cache"""
+
+    @pytest.fixture
+    def cache_app(self, app, tmp_path):
+        """App with a cached page whose template lives in tmp_path"""
+        from flask import flash, render_template, request
+        from application.utils.render_cache import RenderCache
+
+        (tmp_path / 'page.html').write_text('v1 {{ counter() }}{% for m in get_flashed_messages() %} {{ m }}{% endfor %}')
+        app.template_folder = str(tmp_path)
+        calls = []
+        app.jinja_env.globals['counter'] = lambda: calls.append(1) or len(calls)
+        cache = RenderCache(variant=lambda: request.headers.get('X-SPA-Request') == 'true',
+                            auto_reload=True)
+
+        @app.route('/page')
+        @cache.cached
+        def page():
+            return render_template('page.html')
+
+        @app.route('/flash')
+        def add_flash():
+            flash('hello')
+            return 'ok'
+
+        app.page_cache = cache
+        return app
+
+    def test_second_request_is_served_from_cache(self, cache_app):
+        """The view only renders once per variant"""
+        client = cache_app.test_client()
+        assert client.get('/page').data == b'v1 1'
+        assert client.get('/page').data == b'v1 1'
+        assert client.get('/page', headers={'X-SPA-Request': 'true'}).data == b'v1 2'
+
+        stats = cache_app.page_cache.stats()
+        assert (stats['hits'], stats['misses'], stats['pages']) == (1, 2, 2)
+        assert stats['hit_rate'] == round(1 / 3, 4)
+
+    def test_cached_response_keeps_content_type(self, cache_app):
+        client = cache_app.test_client()
+        client.get('/page')
+        assert client.get('/page').content_type == 'text/html; charset=utf-8'
+
+    def test_flashes_bypass_cache(self, cache_app):
+        """A page with pending flash messages is rendered, and not stored"""
+        client = cache_app.test_client()
+        client.get('/page')
+        client.get('/flash')
+
+        assert client.get('/page').data == b'v1 2 hello'
+        assert client.get('/page').data == b'v1 1'
+        assert cache_app.page_cache.stats()['bypasses'] == 1
+
+    def test_template_change_invalidates_in_auto_reload_mode(self, cache_app, tmp_path):
+        client = cache_app.test_client()
+        client.get('/page')
+
+        template = tmp_path / 'page.html'
+        template.write_text('v2')
+        os.utime(template, (template.stat().st_mtime + 10,) * 2)
+        assert client.get('/page').data == b'v2'
+
+    def test_no_invalidation_in_production_mode(self, cache_app, tmp_path):
+        cache_app.page_cache.auto_reload = False
+        client = cache_app.test_client()
+        client.get('/page')
+
+        template = tmp_path / 'page.html'
+        template.write_text('v2')
+        os.utime(template, (template.stat().st_mtime + 10,) * 2)
+        assert client.get('/page').data == b'v1 1'
+
+        cache_app.page_cache.clear()
+        assert client.get('/page').data == b'v2'
+
+
+class TestCompression:
+    """Tests for dynamic response compression"""
+
+    @pytest.fixture
+    def compress_app(self, app):
+        """App (compressing responses, as by default) with HTML, JSON, event-stream and precompressed routes"""
+        from flask import Response, jsonify, request
+
+        assert app.config['COMPRESS_RESPONSES']
+
+        @app.route('/page')
+        def page():
+            response = Response('<p>hello</p>' * 500, mimetype='text/html')
+            response.set_etag('abc')
+            return response.make_conditional(request)
+
+        @app.route('/small')
+        def small():
+            return jsonify(ok=True)
+
+        @app.route('/png')
+        def png():
+            return Response(b'\x89PNG' * 1000, mimetype='image/png')
+
+        @app.route('/encoded')
+        def encoded():
+            response = Response(b'x' * 5000, mimetype='text/css')
+            response.headers['Content-Encoding'] = 'br'
+            return response
+
+        @app.route('/events')
+        def events():
+            return Response((f'data: event {n}\n\n' for n in range(3)), mimetype='text/event-stream')
+
+        return app
+
+    def test_html_is_compressed_with_weak_etag(self, compress_app):
+        import gzip
+
+        response = compress_app.test_client().get('/page', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert response.headers['ETag'] == 'W/"abc"'
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert gzip.decompress(response.data) == b'<p>hello</p>' * 500
+
+    def test_weak_etag_still_revalidates(self, compress_app):
+        response = compress_app.test_client().get(
+            '/page', headers={'Accept-Encoding': 'gzip', 'If-None-Match': 'W/"abc"'})
+        assert response.status_code == 304
+
+    def test_prefers_brotli(self, compress_app):
+        from application.utils.compression import BROTLI_AVAILABLE
+
+        if not BROTLI_AVAILABLE:
+            pytest.skip('brotli not installed')
+        response = compress_app.test_client().get('/page', headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+
+    def test_identity_without_accept_encoding(self, compress_app):
+        response = compress_app.test_client().get('/page', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+    @pytest.mark.parametrize('path', ['/small', '/png', '/encoded'])
+    def test_skipped_responses(self, compress_app, path):
+        """Small bodies, binary types and already-encoded bodies are left alone"""
+        response = compress_app.test_client().get(path, headers={'Accept-Encoding': 'gzip'})
+        assert response.headers.get('Content-Encoding') != 'gzip'
+
+    def test_event_stream_flushes_each_event(self, compress_app):
+        """Every chunk decodes on its own, as soon as it arrives"""
+        import zlib
+
+        response = compress_app.test_client().get('/events', headers={'Accept-Encoding': 'gzip'},
+                                                  buffered=False)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        events = [decompressor.decompress(chunk) for chunk in response.response]
+        assert events[:3] == [b'data: event 0\n\n', b'data: event 1\n\n', b'data: event 2\n\n']
+        assert decompressor.eof
+
+    def test_event_stream_prefers_gzip(self, compress_app):
+        response = compress_app.test_client().get('/events', headers={'Accept-Encoding': 'br, gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+
+
+class TestLogging:
+    """Tests for the queued logging pipeline"""
+
+    @staticmethod
+    def record(name='application.views.api', level=logging.INFO, msg='hello', request_id=None, **extra):
+        record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+        record.request_id = request_id
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter_includes_extra_fields(self):
+        from application.utils.logging_utils import JsonFormatter
+
+        line = JsonFormatter().format(self.record(request_id='abc', email_id=7, subject='Hi'))
+        entry = json.loads(line)
+        assert entry['level'] == 'INFO' and entry['logger'] == 'application.views.api'
+        assert entry['message'] == 'hello'
+        assert entry['request_id'] == 'abc' and entry['email_id'] == 7 and entry['subject'] == 'Hi'
+
+    def test_json_formatter_renders_exceptions(self):
+        from application.utils.logging_utils import JsonFormatter
+
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.LogRecord('x', logging.ERROR, __file__, 1, 'failed', None, sys.exc_info())
+        assert 'ValueError: boom' in json.loads(JsonFormatter().format(record))['exception']
+
+    def test_rate_limit_reports_suppressed_count(self):
+        from application.utils.logging_utils import SamplingFilter
+
+        log_filter = SamplingFilter(rate_limits={'application.views': 1})
+        kept = [log_filter.filter(self.record()) for _ in range(5)]
+        assert kept == [True, True, False, False, False]
+
+        # Other loggers are untouched; the next record let through carries the count
+        assert log_filter.filter(self.record(name='career_agent'))
+        log_filter._limits['application.views'].tokens = 1
+        record = self.record(level=logging.ERROR)
+        assert log_filter.filter(record) and record.suppressed == 3
+
+    def test_sampling_keeps_whole_requests_and_all_warnings(self):
+        from application.utils.logging_utils import SamplingFilter
+
+        log_filter = SamplingFilter(sampling={'application.views.api': 0.5})
+        kept = {}
+        for n in range(200):
+            request_id = f'request-{n}'
+            decisions = {log_filter.filter(self.record(request_id=request_id)) for _ in range(3)}
+            assert len(decisions) == 1
+            kept[request_id] = decisions.pop()
+        assert 60 < sum(kept.values()) < 140
+        assert all(log_filter.filter(self.record(level=logging.WARNING, request_id=request_id))
+                   for request_id in kept)
+
+    def test_pipeline_writes_from_listener_thread(self):
+        from application.utils.logging_utils import LogPipeline
+
+        stream = io.StringIO()
+        pipeline = LogPipeline(stream)
+        pipeline.configure(fmt='json', rate_limits={'test.pipeline': 1000})
+        try:
+            payload = {'n': 1}
+            logging.getLogger('test.pipeline').info('payload %s', payload, extra={'step': 'one'})
+            payload['n'] = 2  # Mutated after the call: the queued message must not change
+        finally:
+            pipeline.stop()
+
+        entry = json.loads(stream.getvalue().splitlines()[-1])
+        assert entry['message'] == "payload {'n': 1}"
+        assert entry['step'] == 'one' and entry['request_id'] is None
+        assert pipeline.handler is None
+
+    def test_after_fork_starts_one_listener_per_process(self):
+        from application.utils.logging_utils import LogPipeline
+
+        pipeline = LogPipeline(io.StringIO())
+        pipeline.configure(fmt='text')
+        try:
+            listener = pipeline.listener
+            pipeline.after_fork()
+            assert pipeline.listener is listener
+
+            pipeline._pid = -1  # As seen from a forked worker
+            pipeline.after_fork()
+            child_listener = pipeline.listener
+            assert child_listener is not listener
+            pipeline.after_fork()  # gunicorn's post_fork, after the fork hook
+            assert pipeline.listener is child_listener
+        finally:
+            listener.stop()
+            pipeline.stop()
+
+    def test_request_id_echoed_and_stamped(self, app, client):
+        from application.utils.logging_utils import current_request_id
+
+        seen = []
+
+        @app.route('/request-id')
+        def request_id():
+            seen.append(current_request_id())
+            return 'ok'
+
+        response = client.get('/request-id', headers={'X-Request-ID': 'proxy-123'})
+        assert response.headers['X-Request-ID'] == 'proxy-123' == seen[0]
+
+        # Made up when missing or malformed
+        response = client.get('/request-id', headers={'X-Request-ID': 'bad id; x=1'})
+        assert len(response.headers['X-Request-ID']) == 32 and response.headers['X-Request-ID'] == seen[1]